@@ -9,22 +9,14 @@ done
 echo "Prefect Server está disponível!"
 
 # Cria os work pools necessários
-# prefect work-pool create --type process scheduler-pool
 prefect work-pool create scheduler-pool --type process --overwrite
-# prefect work-pool create --type process worker-pool || true
-# prefect work-pool create --type process bigdata-pool || true
+prefect work-pool create worker-pool --type process --overwrite
+prefect work-pool create bigdata-pool --type process --overwrite
 
-# Implanta os fluxos de trabalho
+# Implanta os fluxos de trabalho dos três cenários (schedulers, workers e bigdata/ETL)
+# em um único processo; para apenas alguns: python deploy_all_flows.py cron worker
 echo "Implantando fluxos de trabalho..."
 cd /app/flows
-
-# Implanta os fluxos do cenário 1 (schedulers)
-python -m cron.deploy_scheduler_flows
-
-# Implanta os fluxos do cenário 2 (workers)
-# python -m worker.deploy_worker_flows
-
-# Implanta os fluxos do cenário 3 (bigdata)
-# python -m bigdata.deploy_bigdata_flows
+python deploy_all_flows.py
 
 echo "Implantação de fluxos concluída com sucesso!"
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark da atualização de preços (cron/precos.py) contra a escrita produto a produto
+
+Grava os preços atuais de N produtos em um SQLite local (substituto do sistema de preços) e
+aplica uma tabela do fornecedor em que ~10% dos preços mudaram, de duas formas:
+  - produto a produto: um upsert e um commit por produto, como o fluxo fazia;
+  - em massa: lê os preços atuais em blocos, compara e grava só os alterados em lotes.
+Depois confere se os dois bancos terminaram com os mesmos preços.
+
+Uso (a partir do diretório flows/):
+    python -m benchmarks.bench_atualizacao_precos --produtos 10000 100000
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from cron.precos import _comando_upsert, aplicar_precos, garantir_tabela, gerar_precos_fornecedor
+
+
+def preparar(caminho, num_produtos):
+    """Banco com os preços atuais (os da tabela do fornecedor sem alterações)"""
+    conexao = sqlite3.connect(caminho)
+    aplicar_precos(conexao, gerar_precos_fornecedor(num_produtos, fracao_alterada=0.0))
+    return conexao
+
+
+def atualizar_produto_a_produto(conexao, precos):
+    inicio = time.perf_counter()
+    garantir_tabela(conexao)
+    comando = _comando_upsert(conexao)
+    agora = time.time()
+    for preco in precos:
+        conexao.execute(comando, (preco["produto_id"], preco["preco"], agora))
+        conexao.commit()
+    return time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da atualização de preços em massa")
+    parser.add_argument("--produtos", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--fracao-alterada", type=float, default=0.1)
+    args = parser.parse_args()
+
+    print(f"{'produtos':>9} {'produto a produto (s)':>21} {'escritas':>9} {'linhas/s':>9} "
+          f"{'em massa (s)':>12} {'escritas':>9} {'linhas/s':>9} {'ganho':>6} {'confere':>7}")
+    for num_produtos in args.produtos:
+        precos = gerar_precos_fornecedor(num_produtos, args.fracao_alterada, random.Random(42))
+        with tempfile.TemporaryDirectory() as diretorio:
+            conexao_linhas = preparar(os.path.join(diretorio, "linhas.db"), num_produtos)
+            segundos_linhas = atualizar_produto_a_produto(conexao_linhas, precos)
+
+            conexao_massa = preparar(os.path.join(diretorio, "massa.db"), num_produtos)
+            resultado = aplicar_precos(conexao_massa, precos)
+
+            consulta = "SELECT produto_id, preco FROM precos_produtos ORDER BY produto_id"
+            confere = conexao_linhas.execute(consulta).fetchall() == conexao_massa.execute(consulta).fetchall()
+            conexao_linhas.close()
+            conexao_massa.close()
+
+        escritas = resultado["novos"] + resultado["alterados"]
+        print(f"{num_produtos:>9,} {segundos_linhas:>21.2f} {num_produtos:>9,} {num_produtos / segundos_linhas:>9,.0f} "
+              f"{resultado['segundos']:>12.3f} {escritas:>9,} {resultado['linhas_por_segundo']:>9,.0f} "
+              f"{segundos_linhas / resultado['segundos']:>5.0f}x {'sim' if confere else 'NÃO':>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Simulação da autoescala dos workers (worker/autoescala.py) com curvas de carga sintéticas
+
+As mensagens são publicadas nas filas do broker em memória seguindo uma curva de chegada
+(mensagens/s ao longo do tempo) e consumidas por consumidores simulados em tempo virtual:
+cada consumidor retira lotes com basic_get e gasta --custo-lote-ms por lote mais
+1/--vazao-consumidor segundos por mensagem; um consumidor novo só começa depois de
+--atraso-partida segundos (o tempo de subir uma execução de fluxo). O controlador vê apenas
+a profundidade das filas e quantas mensagens foram processadas, a cada --intervalo segundos,
+como no worker contínuo com autoescala.
+A autoescala é comparada com números fixos de consumidores: latência (publicação até o fim
+do processamento) e custo em consumidor-minutos.
+
+Uso (a partir do diretório flows/):
+    python -m benchmarks.bench_autoescala --curva degrau pico --latencia-alvo 30 --fixos 2 5 10
+"""
+
+import argparse
+import itertools
+import math
+
+from worker.autoescala import ControladorAutoescala, profundidade_rabbitmq
+from worker.consumidor_rabbitmq import FILAS_PADRAO, BrokerMemoria
+from worker.processamento_lote import percentil
+
+CURVAS = {
+    # Mensagens/s no instante t (segundos) para uma simulação de `duracao` segundos
+    "degrau": lambda t, duracao: 120.0 if duracao * 0.2 <= t < duracao * 0.6 else 20.0,
+    "rampa": lambda t, duracao: 180.0 * (1 - abs(2 * t / duracao - 1)),
+    "pico": lambda t, duracao: 600.0 if duracao * 0.5 <= t < duracao * 0.5 + 30 else 30.0,
+    "senoide": lambda t, duracao: 80.0 + 70.0 * math.sin(2 * math.pi * t / 600),
+}
+
+
+def simular(curva, duracao, args, controlador=None, fixos=None):
+    """Executa a simulação com o controlador (ou com `fixos` consumidores) e retorna as métricas"""
+    broker = BrokerMemoria()
+    conexao = broker.conexao()
+    canal = conexao.channel()
+    filas = itertools.cycle(FILAS_PADRAO)
+    a_publicar = 0.0
+    consumidores = []  # Instante a partir do qual cada consumidor processa; saldo de tempo de cada um
+    saldos = []
+    desejados = fixos or controlador.consumidores
+    tamanho_lote = args.lote_fixo
+    latencias = []
+    consumidor_segundos = 0.0
+    maximo = 0
+    processadas = 0
+
+    for t in range(duracao):
+        a_publicar += CURVAS[curva](t, duracao)
+        while a_publicar >= 1:
+            broker.publicar(next(filas), t + 0.5)  # O corpo é o instante de publicação
+            a_publicar -= 1
+
+        if controlador is not None and t % args.intervalo == 0:
+            profundidade = sum(profundidade_rabbitmq(conexao, FILAS_PADRAO).values())
+            decisao = controlador.observar(t, profundidade, processadas)
+            processadas = 0
+            desejados, tamanho_lote = decisao["consumidores"], decisao["tamanho_lote"]
+        while len(consumidores) < desejados:
+            consumidores.append(t + args.atraso_partida)
+            saldos.append(0.0)
+        del consumidores[desejados:], saldos[desejados:]
+        maximo = max(maximo, len(consumidores))
+        consumidor_segundos += len(consumidores)
+
+        for indice, inicio in enumerate(consumidores):
+            if inicio > t:
+                continue
+            saldos[indice] = min(saldos[indice] + 1.0, 1.0)  # Consumidor ocioso não acumula tempo
+            while saldos[indice] > 0:
+                lote = []
+                for fila in FILAS_PADRAO:
+                    while len(lote) < tamanho_lote:
+                        _, _, corpo = canal.basic_get(fila, auto_ack=True)
+                        if corpo is None:
+                            break
+                        lote.append(corpo)
+                if not lote:
+                    break
+                saldos[indice] -= args.custo_lote_ms / 1000 + len(lote) / args.vazao_consumidor
+                concluido_em = t + 1 - saldos[indice]  # O saldo começa o segundo em 1.0
+                latencias.extend(concluido_em - publicado_em for publicado_em in lote)
+                processadas += len(lote)
+
+    restantes = sum(len(broker.filas[fila]) for fila in FILAS_PADRAO)
+    return {
+        "mensagens": len(latencias),
+        "restantes": restantes,
+        "latencia_p50": percentil(latencias, 0.50),
+        "latencia_p99": percentil(latencias, 0.99),
+        "dentro_do_alvo": sum(latencia <= args.latencia_alvo for latencia in latencias) / max(len(latencias), 1),
+        "consumidor_minutos": consumidor_segundos / 60,
+        "max_consumidores": maximo,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulação da autoescala de workers por profundidade de fila")
+    parser.add_argument("--curva", nargs="+", choices=sorted(CURVAS), default=sorted(CURVAS))
+    parser.add_argument("--duracao", type=int, default=1800, help="Segundos simulados")
+    parser.add_argument("--latencia-alvo", type=float, default=30.0)
+    parser.add_argument("--intervalo", type=int, default=15, help="Segundos entre amostras de profundidade")
+    parser.add_argument("--vazao-consumidor", type=float, default=20.0, help="Mensagens/s de um consumidor")
+    parser.add_argument("--custo-lote-ms", type=float, default=200.0, help="Custo fixo por lote (task, acks)")
+    parser.add_argument("--atraso-partida", type=int, default=10, help="Segundos até um consumidor novo iniciar")
+    parser.add_argument("--max-consumidores", type=int, default=10)
+    parser.add_argument("--fixos", type=int, nargs="+", default=[2, 5, 10], help="Números fixos de consumidores")
+    parser.add_argument("--lote-fixo", type=int, default=25, help="Tamanho de lote dos consumidores fixos")
+    args = parser.parse_args()
+
+    print(f"{'curva':<8} {'estratégia':<11} {'processadas':>11} {'restantes':>9} {'p50 (s)':>8} {'p99 (s)':>8} "
+          f"{'<= alvo':>8} {'consumidor-min':>14} {'máx':>4}")
+    for curva in args.curva:
+        medicoes = [("autoescala", simular(curva, args.duracao, args, controlador=ControladorAutoescala(
+            latencia_alvo=args.latencia_alvo, min_consumidores=1, max_consumidores=args.max_consumidores,
+            vazao_por_consumidor=args.vazao_consumidor)))]
+        medicoes.extend((f"fixo {fixos}", simular(curva, args.duracao, args, fixos=fixos)) for fixos in args.fixos)
+        for estrategia, metricas in medicoes:
+            print(f"{curva:<8} {estrategia:<11} {metricas['mensagens']:>11,} {metricas['restantes']:>9,} "
+                  f"{metricas['latencia_p50']:>8.1f} {metricas['latencia_p99']:>8.1f} "
+                  f"{metricas['dentro_do_alvo']:>8.1%} {metricas['consumidor_minutos']:>14,.0f} "
+                  f"{metricas['max_consumidores']:>4}")
+
+
+if __name__ == "__main__":
+    main()
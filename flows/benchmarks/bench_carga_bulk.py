@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark da carga em massa (etl/carga_bulk.py) contra INSERT linha a linha
+
+Usa um SQLite local como substituto do Redshift e um diretório local como staging.
+
+Uso (a partir do diretório flows/):
+    python -m benchmarks.bench_carga_bulk --registros 100000 1000000 --formato parquet
+"""
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+from etl.carga_bulk import TAMANHO_ALVO_MB_PADRAO, _ddl_tabela, _linhas_para_sqlite, carregar_em_massa, formato_padrao
+from etl.geracao_dados import gerar_dados_sinteticos
+
+
+def carregar_linha_a_linha(df, caminho, tabela):
+    """Um INSERT e um commit por registro, como o comportamento modelado originalmente"""
+    conexao = sqlite3.connect(caminho)
+    conexao.execute(_ddl_tabela(tabela, df))
+    consulta = f"INSERT INTO {tabela} ({', '.join(df.columns)}) VALUES ({', '.join('?' for _ in df.columns)})"
+    inicio = time.perf_counter()
+    for linha in _linhas_para_sqlite(df):
+        conexao.execute(consulta, linha)
+        conexao.commit()
+    conexao.close()
+    return time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da carga em massa com staging + COPY")
+    parser.add_argument("--registros", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--tabela", default="produtos", choices=["produtos", "pedidos"])
+    parser.add_argument("--formato", choices=["parquet", "csv"], default=formato_padrao())
+    parser.add_argument("--tamanho-alvo-mb", type=int, default=TAMANHO_ALVO_MB_PADRAO)
+    parser.add_argument("--sem-linha-a-linha", action="store_true",
+                        help="Mede apenas a carga em massa (a carga linha a linha é muito lenta em volumes grandes)")
+    args = parser.parse_args()
+
+    print(f"{'registros':>10} {'modo':<14} {'arquivos':>8} {'registros/s':>14} {'MB/s':>8}")
+    for num_registros in args.registros:
+        df = gerar_dados_sinteticos(args.tabela, num_registros, seed=42)
+        with tempfile.TemporaryDirectory() as diretorio:
+            destino = os.path.join(diretorio, "destino.db")
+            estatisticas = carregar_em_massa(df, f"{args.tabela}_dw", f"sqlite:{destino}",
+                                             staging=os.path.join(diretorio, "staging"), formato=args.formato,
+                                             tamanho_alvo_mb=args.tamanho_alvo_mb)
+            print(f"{num_registros:>10} {'bulk/' + args.formato:<14} {estatisticas['arquivos']:>8} "
+                  f"{estatisticas['registros_por_segundo']:>14,.0f} {estatisticas['mb_por_segundo']:>8.1f}")
+
+            if not args.sem_linha_a_linha:
+                segundos = carregar_linha_a_linha(df, os.path.join(diretorio, "linha_a_linha.db"), f"{args.tabela}_dw")
+                print(f"{num_registros:>10} {'linha a linha':<14} {'-':>8} {num_registros / segundos:>14,.0f} {'-':>8}")
+
+
+if __name__ == "__main__":
+    main()
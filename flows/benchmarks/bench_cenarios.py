@@ -0,0 +1,441 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Suíte de benchmarks dos três cenários (cron, worker e ETL) com relatório JSON comparável
+
+Executa os fluxos no próprio processo, contra substitutos locais:
+  - cron: criação de produtos (simulada) e atualização de preços em um SQLite;
+  - worker: filas RabbitMQ e assíncrona com mensagens simuladas (as variáveis de filas reais
+    são ignoradas);
+  - ETL: origem em um SQLite criado com dados sintéticos (semente fixa) no lugar do MySQL e
+    destino em outro SQLite no lugar do Redshift, sem o cache de resultados.
+Os sleeps que simulam consultas e processamento seguem um modelo de custo: --custo é o fator
+aplicado a cada sleep (0 mede só o código; 1 reproduz as durações simuladas). As retentativas
+das tasks não esperam, para uma falha simulada não dominar a medição, e o random é semeado
+antes de cada repetição. O heartbeat dos fluxos fica desligado (--heartbeat religa): a thread
+dele dorme em passos de 1s e o fim do fluxo espera por ela, o que arredondaria cada medição
+para o segundo seguinte.
+
+Cada caso varia o tamanho (produtos, mensagens ou linhas) e a concorrência (threads do task
+runner, ou mensagens em voo no fluxo assíncrono). O relatório guarda, por combinação, a mediana
+dos segundos, a dispersão entre as repetições, o tempo de CPU deste processo, o pico de RSS
+durante a execução e a vazão, mais o ambiente (commit, versões, CPUs, duração de um fluxo vazio,
+que é o piso de qualquer medição) e a configuração. A API temporária do Prefect roda em outro
+processo: o tempo de CPU dela não entra na coluna de CPU, mas disputa as CPUs com os fluxos.
+O aumento de RSS é medido a partir do RSS no início de cada repetição; a memória que o
+alocador retém de casos anteriores faz esse aumento ser um limite inferior.
+Com --base, compara com um relatório anterior: uma combinação regride quando a mediana passa do
+limite e nem a repetição mais rápida alcança a mediana da base (evita alarmes por ruído).
+O código de saída é 1 quando há regressão.
+
+Uso (a partir do diretório flows/):
+    python -m benchmarks.bench_cenarios                                # perfil rápido
+    python -m benchmarks.bench_cenarios --perfil completo --saida base.json
+    python -m benchmarks.bench_cenarios --casos etl --base base.json   # compara com a base
+    python -m benchmarks.bench_cenarios --comparar base.json atual.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import importlib
+import inspect
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import types
+
+os.environ.setdefault("PREFECT_LOGGING_LEVEL", "CRITICAL")  # As falhas simuladas logam como ERROR
+
+# Caso -> fluxo, parâmetro de tamanho, tamanhos por perfil e como a concorrência é aplicada
+# ("task_runner": threads do task runner do fluxo; outro nome: parâmetro do fluxo; None: sem variação)
+CASOS = {
+    "cron/criacao_produtos": {
+        "modulo": "cron.deploy_scheduler_flows", "fluxo": "fluxo_criacao_produtos",
+        "tamanho": "num_produtos", "unidade": "produtos",
+        "tamanhos": {"rapido": [10, 100], "completo": [10, 100, 1_000]},
+        "concorrencia": "task_runner", "concorrencias": [1, 5, 20],
+    },
+    "cron/atualizacao_precos": {
+        "modulo": "cron.deploy_scheduler_flows", "fluxo": "fluxo_atualizacao_precos",
+        "tamanho": "num_produtos", "unidade": "preços",
+        "tamanhos": {"rapido": [1_000, 100_000], "completo": [1_000, 10_000, 100_000, 1_000_000]},
+        "concorrencia": None, "concorrencias": [None],
+    },
+    "worker/fila_rabbitmq": {
+        "modulo": "worker.deploy_worker_flows", "fluxo": "processar_fila_rabbitmq",
+        "tamanho": "max_mensagens", "unidade": "mensagens",
+        "tamanhos": {"rapido": [100, 10_000], "completo": [100, 1_000, 10_000, 100_000]},
+        "concorrencia": "task_runner", "concorrencias": [1, 4, 16],
+    },
+    "worker/fila_async": {
+        "modulo": "worker.deploy_worker_flows", "fluxo": "processar_fila_async",
+        "tamanho": "num_mensagens", "unidade": "mensagens",
+        "tamanhos": {"rapido": [100, 10_000], "completo": [100, 1_000, 10_000, 100_000]},
+        "concorrencia": "max_em_voo", "concorrencias": [10, 1_000],
+    },
+    "etl/produtos": {
+        "modulo": "etl.deploy_bigdata_flows", "fluxo": "etl_produtos_mysql_para_redshift",
+        "tamanho": "limite", "unidade": "linhas", "tabela": "produtos",
+        "tamanhos": {"rapido": [1_000, 100_000], "completo": [1_000, 10_000, 100_000, 1_000_000, 10_000_000]},
+        "concorrencia": "task_runner", "concorrencias": [1, 4],
+    },
+    "etl/pedidos": {
+        "modulo": "etl.deploy_bigdata_flows", "fluxo": "etl_pedidos_mysql_para_redshift",
+        "tamanho": "limite", "unidade": "linhas", "tabela": "pedidos",
+        "tamanhos": {"rapido": [1_000, 100_000], "completo": [1_000, 10_000, 100_000, 1_000_000, 10_000_000]},
+        "concorrencia": "task_runner", "concorrencias": [1, 4],
+    },
+}
+
+# Variáveis que apontariam os fluxos para serviços reais
+VARIAVEIS_SERVICOS = ("WORKER_RABBITMQ_URL", "WORKER_SQS", "ETL_FONTE_MYSQL", "ETL_DESTINO_REDSHIFT",
+                      "CRON_DESTINO_PRECOS")
+
+LIMITE_TEMPO_PADRAO = 0.15
+LIMITE_MEMORIA_PADRAO = 0.25
+MINIMO_SEGUNDOS_PADRAO = 0.05  # Diferenças menores são ruído, qualquer que seja a proporção
+MINIMO_MB_PADRAO = 10.0
+
+
+def aplicar_modelo_custo(modulos, fator):
+    """Troca time.sleep/asyncio.sleep dos módulos de fluxos por sleeps multiplicados por `fator`"""
+    def dormir(segundos):
+        if fator:
+            time.sleep(segundos * fator)
+
+    async def dormir_async(segundos, *args, **kwargs):
+        await asyncio.sleep(segundos * fator, *args, **kwargs)
+
+    for modulo in modulos:
+        if getattr(modulo, "time", None) is time:
+            modulo.time = types.SimpleNamespace(**{nome: getattr(time, nome) for nome in dir(time)
+                                                   if not nome.startswith("_")})
+            modulo.time.sleep = dormir
+        if getattr(modulo, "asyncio", None) is asyncio:
+            modulo.asyncio = types.SimpleNamespace(**{nome: getattr(asyncio, nome) for nome in dir(asyncio)
+                                                      if not nome.startswith("_")})
+            modulo.asyncio.sleep = dormir_async
+
+
+def retentativas_sem_espera(modulo):
+    from prefect.tasks import Task
+
+    for nome, objeto in list(vars(modulo).items()):
+        if isinstance(objeto, Task) and objeto.retries:
+            setattr(modulo, nome, objeto.with_options(retry_delay_seconds=0))
+
+
+class MonitorRSS:
+    """Pico de RSS do processo durante um trecho, amostrado em /proc a cada `intervalo` segundos"""
+
+    def __init__(self, intervalo=0.01):
+        self.intervalo = intervalo
+        self.pagina = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+        self._parar = threading.Event()
+
+    def rss(self):
+        try:
+            with open("/proc/self/statm") as arquivo:
+                return int(arquivo.read().split()[1]) * self.pagina
+        except OSError:  # Sem /proc: pico do processo inteiro
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    def _amostrar(self):
+        while not self._parar.wait(self.intervalo):
+            self.pico = max(self.pico, self.rss())
+
+    def __enter__(self):
+        self.inicial = self.pico = self.rss()
+        self._thread = threading.Thread(target=self._amostrar, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *erro):
+        self._parar.set()
+        self._thread.join()
+        self.pico = max(self.pico, self.rss())
+
+
+class Substitutos:
+    """Bancos locais usados no lugar do MySQL, do Redshift e do sistema de preços"""
+
+    def __init__(self, diretorio):
+        self.diretorio = diretorio
+        self.origens = {}  # tabela -> (caminho, registros)
+
+    def origem_etl(self, tabela, registros):
+        """SQLite com pelo menos `registros` linhas da tabela, reaproveitado entre as medições"""
+        from etl.extracao_mysql import criar_base_sqlite
+
+        caminho, existentes = self.origens.get(tabela, (None, 0))
+        if existentes < registros:
+            caminho = os.path.join(self.diretorio, f"origem-{tabela}.db")
+            criar_base_sqlite(caminho, tabelas=[tabela], num_registros=registros, seed=42)
+            self.origens[tabela] = (caminho, registros)
+        return caminho
+
+    def preparar(self, caso, tamanho, maior_tamanho):
+        """Variáveis de ambiente de uma repetição; os destinos são recriados a cada uma"""
+        repeticao = tempfile.mkdtemp(dir=self.diretorio)
+        ambiente = {"INSTRUMENTACAO_DIRETORIO": os.path.join(repeticao, "metricas")}
+        if caso["fluxo"] == "fluxo_atualizacao_precos":
+            from cron.precos import aplicar_precos, conectar_precos, gerar_precos_fornecedor
+
+            # Preços já gravados: a execução compara e grava só os ~10% alterados, como no dia a dia
+            destino = f"sqlite:{os.path.join(repeticao, 'precos.db')}"
+            conexao = conectar_precos(destino)
+            aplicar_precos(conexao, gerar_precos_fornecedor(tamanho, fracao_alterada=0.0))
+            conexao.close()
+            ambiente["CRON_DESTINO_PRECOS"] = destino
+        if "tabela" in caso:
+            ambiente.update({
+                "ETL_FONTE_MYSQL": f"sqlite:{self.origem_etl(caso['tabela'], maior_tamanho)}",
+                "ETL_DESTINO_REDSHIFT": f"sqlite:{os.path.join(repeticao, 'destino.db')}",
+                "ETL_STAGING": os.path.join(repeticao, "staging"),
+                "ETL_DIRETORIO_ESTADO": os.path.join(repeticao, "estado"),
+                "ETL_CACHE": "0",
+            })
+        return repeticao, ambiente
+
+
+def executar_fluxo(fluxo, parametros):
+    with open(os.devnull, "w") as descarte, contextlib.redirect_stdout(descarte):
+        resultado = fluxo(**parametros)
+        if inspect.iscoroutine(resultado):
+            resultado = asyncio.run(resultado)
+    return resultado
+
+
+def medir_combinacao(nome, caso, tamanho, concorrencia, args, substitutos, maior_tamanho):
+    from prefect.task_runners import ThreadPoolTaskRunner
+
+    fluxo = getattr(importlib.import_module(caso["modulo"]), caso["fluxo"])
+    parametros = {caso["tamanho"]: tamanho}
+    if caso["concorrencia"] == "task_runner":
+        fluxo = fluxo.with_options(task_runner=ThreadPoolTaskRunner(max_workers=concorrencia))
+    elif caso["concorrencia"]:
+        parametros[caso["concorrencia"]] = concorrencia
+
+    repeticoes = []
+    for _ in range(args.repeticoes):
+        repeticao, ambiente = substitutos.preparar(caso, tamanho, maior_tamanho)
+        anterior = {chave: os.environ.get(chave) for chave in ambiente}
+        os.environ.update(ambiente)
+        random.seed(args.semente)
+        try:
+            with MonitorRSS() as monitor:
+                cpu = time.process_time()
+                inicio = time.perf_counter()
+                executar_fluxo(fluxo, parametros)
+                segundos = time.perf_counter() - inicio
+                cpu = time.process_time() - cpu
+        finally:
+            for chave, valor in anterior.items():
+                if valor is None:
+                    os.environ.pop(chave, None)
+                else:
+                    os.environ[chave] = valor
+            shutil.rmtree(repeticao, ignore_errors=True)
+        repeticoes.append({"segundos": segundos, "cpu_segundos": cpu, "pico_rss_mb": monitor.pico / 2**20,
+                           "aumento_rss_mb": (monitor.pico - monitor.inicial) / 2**20})
+
+    segundos = statistics.median(repeticao["segundos"] for repeticao in repeticoes)
+    return {
+        "id": f"{nome}/n={tamanho}" + (f"/c={concorrencia}" if concorrencia is not None else ""),
+        "caso": nome,
+        "tamanho": tamanho,
+        "unidade": caso["unidade"],
+        "concorrencia": concorrencia,
+        "segundos": segundos,
+        "segundos_min": min(repeticao["segundos"] for repeticao in repeticoes),
+        "dispersao": (max(repeticao["segundos"] for repeticao in repeticoes)
+                      - min(repeticao["segundos"] for repeticao in repeticoes)) / segundos if segundos else 0.0,
+        "cpu_segundos": statistics.median(repeticao["cpu_segundos"] for repeticao in repeticoes),
+        "pico_rss_mb": max(repeticao["pico_rss_mb"] for repeticao in repeticoes),
+        "aumento_rss_mb": statistics.median(repeticao["aumento_rss_mb"] for repeticao in repeticoes),
+        "vazao": tamanho / segundos if segundos else 0.0,
+        "repeticoes": repeticoes,
+    }
+
+
+def descrever_ambiente(repeticoes):
+    import pandas
+    import prefect
+    from prefect import flow
+
+    vazio = flow(name="fluxo-vazio-benchmark")(lambda: None)
+    duracoes = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        vazio()
+        duracoes.append(time.perf_counter() - inicio)
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "prefect": prefect.__version__,
+        "pandas": pandas.__version__,
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+        "fluxo_vazio_segundos": statistics.median(duracoes),
+    }
+
+
+def comparar(base, atual, limite_tempo, limite_memoria, minimo_segundos=MINIMO_SEGUNDOS_PADRAO,
+             minimo_mb=MINIMO_MB_PADRAO):
+    """Compara as combinações presentes nos dois relatórios; regressões acima dos limites"""
+    anteriores = {resultado["id"]: resultado for resultado in base["resultados"]}
+    comparacoes = []
+    for resultado in atual["resultados"]:
+        anterior = anteriores.get(resultado["id"])
+        if anterior is None:
+            continue
+        variacao_tempo = resultado["segundos"] / anterior["segundos"] - 1 if anterior["segundos"] else 0.0
+        diferenca_mb = resultado["aumento_rss_mb"] - anterior["aumento_rss_mb"]
+        variacao_memoria = diferenca_mb / max(anterior["aumento_rss_mb"], minimo_mb)
+        regressoes = []
+        if (variacao_tempo > limite_tempo and resultado["segundos"] - anterior["segundos"] > minimo_segundos
+                and resultado["segundos_min"] > anterior["segundos"]):
+            regressoes.append("tempo")
+        if variacao_memoria > limite_memoria and diferenca_mb > minimo_mb:
+            regressoes.append("memória")
+        comparacoes.append({
+            "id": resultado["id"],
+            "segundos_base": anterior["segundos"],
+            "segundos": resultado["segundos"],
+            "variacao_tempo": variacao_tempo,
+            "aumento_rss_mb_base": anterior["aumento_rss_mb"],
+            "aumento_rss_mb": resultado["aumento_rss_mb"],
+            "variacao_memoria": variacao_memoria,
+            "regressoes": regressoes,
+            "melhora": variacao_tempo < -limite_tempo and anterior["segundos"] - resultado["segundos"] > minimo_segundos,
+        })
+    return comparacoes
+
+
+def imprimir_comparacao(comparacoes, base, atual):
+    print(f"\nComparação com {base.get('ambiente', {}).get('commit') or 'a base'} "
+          f"(atual: {atual.get('ambiente', {}).get('commit') or '?'})")
+    print(f"{'combinação':<44} {'base (s)':>9} {'atual (s)':>9} {'tempo':>7} {'RSS base':>9} {'RSS':>7} {'situação':>10}")
+    for comparacao in comparacoes:
+        situacao = ("REGRESSÃO " + "+".join(comparacao["regressoes"]) if comparacao["regressoes"]
+                    else "melhora" if comparacao["melhora"] else "ok")
+        print(f"{comparacao['id']:<44} {comparacao['segundos_base']:>9.3f} {comparacao['segundos']:>9.3f} "
+              f"{comparacao['variacao_tempo']:>+6.0%} {comparacao['aumento_rss_mb_base']:>8.0f}M "
+              f"{comparacao['aumento_rss_mb']:>6.0f}M {situacao:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Suíte de benchmarks dos cenários cron, worker e ETL")
+    parser.add_argument("--perfil", choices=["rapido", "completo"], default="rapido",
+                        help="rápido: tamanhos pequenos; completo: até 10M linhas e 100k mensagens")
+    parser.add_argument("--casos", nargs="+", default=[],
+                        help=f"Casos ou cenários (prefixos) a executar: {', '.join(CASOS)} (padrão: todos)")
+    parser.add_argument("--tamanhos", type=int, nargs="+", help="Substitui os tamanhos do perfil")
+    parser.add_argument("--concorrencias", type=int, nargs="+", help="Substitui as concorrências dos casos")
+    parser.add_argument("--custo", type=float, default=0.0, help="Fator aplicado aos sleeps simulados")
+    parser.add_argument("--repeticoes", type=int, default=3, help="Execuções por combinação (mediana)")
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--heartbeat", action="store_true", help="Mantém o heartbeat dos fluxos do Prefect")
+    parser.add_argument("--saida", help="Relatório JSON (padrão: benchmarks/resultados/cenarios-<perfil>-<data>.json)")
+    parser.add_argument("--base", help="Relatório anterior para comparar")
+    parser.add_argument("--comparar", nargs=2, metavar=("BASE", "ATUAL"), help="Só compara dois relatórios")
+    parser.add_argument("--limite-tempo", type=float, default=LIMITE_TEMPO_PADRAO,
+                        help="Aumento relativo de tempo considerado regressão")
+    parser.add_argument("--limite-memoria", type=float, default=LIMITE_MEMORIA_PADRAO,
+                        help="Aumento relativo de memória considerado regressão")
+    args = parser.parse_args()
+
+    if args.comparar:
+        with open(args.comparar[0]) as arquivo:
+            base = json.load(arquivo)
+        with open(args.comparar[1]) as arquivo:
+            atual = json.load(arquivo)
+        comparacoes = comparar(base, atual, args.limite_tempo, args.limite_memoria)
+        imprimir_comparacao(comparacoes, base, atual)
+        sys.exit(1 if any(comparacao["regressoes"] for comparacao in comparacoes) else 0)
+
+    selecionados = [nome for nome in CASOS if not args.casos or any(nome.startswith(prefixo) for prefixo in args.casos)]
+    if not selecionados:
+        parser.error(f"nenhum caso corresponde a {', '.join(args.casos)}")
+
+    for variavel in VARIAVEIS_SERVICOS:
+        os.environ.pop(variavel, None)
+    from prefect import flow
+    from prefect.settings import PREFECT_FLOWS_HEARTBEAT_FREQUENCY, temporary_settings
+
+    if not args.heartbeat:
+        configuracao_prefect = temporary_settings(updates={PREFECT_FLOWS_HEARTBEAT_FREQUENCY: None})
+        configuracao_prefect.__enter__()  # Vale até o fim do processo
+    modulos = [importlib.import_module(CASOS[nome]["modulo"]) for nome in selecionados]
+    aplicar_modelo_custo([modulo for nome, modulo in sys.modules.items()
+                          if nome.split(".")[0] in ("cron", "worker", "etl")], args.custo)
+    for modulo in set(modulos):
+        retentativas_sem_espera(modulo)
+    flow(name="aquecimento-benchmark")(lambda: None)()  # API temporária do Prefect fora das medições
+
+    relatorio = {
+        "versao": 1,
+        "gerado_em": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "ambiente": descrever_ambiente(args.repeticoes),
+        "configuracao": {"perfil": args.perfil, "custo": args.custo, "repeticoes": args.repeticoes,
+                         "semente": args.semente, "heartbeat": args.heartbeat,
+                         "casos": selecionados},
+        "resultados": [],
+    }
+    print(f"Fluxo vazio: {relatorio['ambiente']['fluxo_vazio_segundos']:.3f}s (piso de cada medição)")
+    print(f"{'combinação':<44} {'mediana (s)':>11} {'dispersão':>9} {'CPU (s)':>8} {'pico RSS':>9} {'vazão':>14}")
+    with tempfile.TemporaryDirectory() as diretorio:
+        substitutos = Substitutos(diretorio)
+        for nome in selecionados:
+            caso = CASOS[nome]
+            tamanhos = args.tamanhos or caso["tamanhos"][args.perfil]
+            concorrencias = args.concorrencias if args.concorrencias and caso["concorrencia"] else caso["concorrencias"]
+            # Aquecimento do caso (importações, primeira conexão), fora das medições
+            medir_combinacao(nome, caso, min(tamanhos), concorrencias[0], argparse.Namespace(
+                repeticoes=1, semente=args.semente), substitutos, max(tamanhos))
+            for tamanho in tamanhos:
+                for concorrencia in concorrencias:
+                    resultado = medir_combinacao(nome, caso, tamanho, concorrencia, args, substitutos, max(tamanhos))
+                    relatorio["resultados"].append(resultado)
+                    print(f"{resultado['id']:<44} {resultado['segundos']:>11.3f} {resultado['dispersao']:>9.0%} "
+                          f"{resultado['cpu_segundos']:>8.2f} "
+                          f"{resultado['pico_rss_mb']:>8.0f}M {resultado['vazao']:>10,.0f} {caso['unidade'][:3]}/s")
+
+    saida = args.saida or os.path.join("benchmarks", "resultados",
+                                       f"cenarios-{args.perfil}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    regressao = False
+    if args.base:
+        with open(args.base) as arquivo:
+            base = json.load(arquivo)
+        comparacoes = comparar(base, relatorio, args.limite_tempo, args.limite_memoria)
+        relatorio["comparacao"] = {"base": args.base, "limite_tempo": args.limite_tempo,
+                                   "limite_memoria": args.limite_memoria, "combinacoes": comparacoes}
+        imprimir_comparacao(comparacoes, base, relatorio)
+        regressao = any(comparacao["regressoes"] for comparacao in comparacoes)
+
+    os.makedirs(os.path.dirname(saida) or ".", exist_ok=True)
+    with open(saida, "w") as arquivo:
+        json.dump(relatorio, arquivo, indent=1, ensure_ascii=False)
+    print(f"\nRelatório: {saida}")
+    sys.exit(1 if regressao else 0)
+
+
+if __name__ == "__main__":
+    main()
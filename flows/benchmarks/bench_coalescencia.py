@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark da coalescência e do particionamento por id (worker/particionamento.py)
+
+Gera uma drenagem de --mensagens mensagens concentradas em --entidades ids (distribuição de
+Zipf: poucas entidades recebem a maior parte das atualizações) e processa a janela de duas
+formas, com --paralelismo lotes em paralelo e --custo-ms por mensagem:
+  - lotes consecutivos: todas as mensagens, lotes de --tamanho-lote na ordem de chegada;
+  - particionado: coalescência da janela e uma partição por grupo de ids.
+Mostra as mensagens processadas, o trabalho removido, o tempo e quantas mensagens foram
+aplicadas fora da ordem de chegada do seu id.
+
+Uso (a partir do diretório flows/):
+    python -m benchmarks.bench_coalescencia --mensagens 5000 --entidades 300
+"""
+
+import argparse
+import itertools
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from worker.mensagens import ACOES, gerar_mensagem
+from worker.particionamento import coalescer, particionar, resumir_coalescencia
+from worker.processamento_lote import dividir_em_lotes
+
+
+def gerar_janela(num_mensagens, num_entidades, expoente, seed=42):
+    """Mensagens com ids sorteados por Zipf; a sequência de cada mensagem marca a ordem de chegada"""
+    gerador = random.Random(seed)
+    pesos = [1 / (posicao ** expoente) for posicao in range(1, num_entidades + 1)]
+    ids = [f"PRODUTO-{1000 + indice}" for indice in range(num_entidades)]
+    mensagens = []
+    for sequencia, id_entidade in enumerate(gerador.choices(ids, weights=pesos, k=num_mensagens)):
+        mensagem = gerar_mensagem(gerador)
+        mensagem.update(tipo="produto", id=id_entidade, sequencia=sequencia)
+        mensagem["dados"]["acao"] = gerador.choices(ACOES, weights=[1, 8, 1])[0]
+        mensagens.append(mensagem)
+    return mensagens
+
+
+def processar_lotes(lotes, paralelismo, custo):
+    """Processa os lotes em paralelo; conta as mensagens aplicadas depois de uma posterior do mesmo id"""
+    ultima_aplicada = {}
+    fora_de_ordem = itertools.count()
+    trava = threading.Lock()
+
+    def processar_lote(lote):
+        for mensagem in lote:
+            time.sleep(custo)
+            with trava:
+                if ultima_aplicada.get(mensagem["id"], -1) > mensagem["sequencia"]:
+                    next(fora_de_ordem)
+                ultima_aplicada[mensagem["id"]] = max(ultima_aplicada.get(mensagem["id"], -1), mensagem["sequencia"])
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=paralelismo) as pool:
+        list(pool.map(processar_lote, lotes))
+    return time.perf_counter() - inicio, next(fora_de_ordem)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da coalescência e do particionamento por id")
+    parser.add_argument("--mensagens", type=int, default=5000)
+    parser.add_argument("--entidades", type=int, default=300)
+    parser.add_argument("--expoente", type=float, default=1.1, help="Expoente da distribuição de Zipf dos ids")
+    parser.add_argument("--tamanho-lote", type=int, default=25)
+    parser.add_argument("--paralelismo", type=int, default=16)
+    parser.add_argument("--custo-ms", type=float, default=1.0, help="Tempo de processamento por mensagem")
+    args = parser.parse_args()
+
+    mensagens = gerar_janela(args.mensagens, args.entidades, args.expoente)
+    custo = args.custo_ms / 1000
+
+    print(f"{'modo':<18} {'processadas':>11} {'removido':>9} {'tempo (s)':>10} {'fora de ordem':>14}")
+    segundos, fora_de_ordem = processar_lotes(dividir_em_lotes(mensagens, args.tamanho_lote), args.paralelismo, custo)
+    print(f"{'lotes consecutivos':<18} {len(mensagens):>11,} {0:>9.1%} {segundos:>10.2f} {fora_de_ordem:>14,}")
+
+    inicio = time.perf_counter()
+    restantes, descartadas = coalescer(mensagens)
+    particoes = particionar(restantes, args.tamanho_lote)
+    preparo = time.perf_counter() - inicio
+    segundos, fora_de_ordem = processar_lotes(particoes, args.paralelismo, custo)
+    resumo = resumir_coalescencia(len(mensagens), descartadas)
+    print(f"{'particionado':<18} {resumo['processadas']:>11,} {resumo['trabalho_removido']:>9.1%} "
+          f"{preparo + segundos:>10.2f} {fora_de_ordem:>14,}")
+    print(f"Removidas: {resumo['atualizacoes_substituidas']:,} atualizações substituídas, "
+          f"{resumo['criadas_e_deletadas']:,} mensagens de entidades criadas e deletadas; "
+          f"coalescência e particionamento em {preparo * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
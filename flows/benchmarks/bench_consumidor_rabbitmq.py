@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark do consumidor RabbitMQ (worker/consumidor_rabbitmq.py) com diferentes prefetch/lotes de ack
+
+Usa o broker em memória, com uma latência de rede simulada por comando enviado ao broker
+(ack, nack, publish), e um processamento de custo fixo por mensagem.
+`--lote-ack 1` corresponde a um ack por mensagem.
+
+Uso (a partir do diretório flows/):
+    python -m benchmarks.bench_consumidor_rabbitmq --mensagens 3000 --prefetch 1 50 --lote-ack 1 25
+"""
+
+import argparse
+import json
+import random
+import time
+
+from worker.consumidor_rabbitmq import FILAS_PADRAO, SUFIXO_DLQ, BrokerMemoria, consumir_com_ack
+from worker.mensagens import FILAS_POR_TIPO, gerar_mensagem
+
+
+def preencher(broker, num_mensagens, seed=42):
+    gerador = random.Random(seed)
+    for _ in range(num_mensagens):
+        mensagem = gerar_mensagem(gerador)
+        broker.publicar(FILAS_POR_TIPO[mensagem["tipo"]], json.dumps(mensagem))
+
+
+def criar_processador(custo, taxa_falha, seed=42):
+    gerador = random.Random(seed)
+
+    def processar(mensagem):
+        if gerador.random() < taxa_falha:
+            raise Exception(f"Erro ao processar mensagem {mensagem['id']}")
+        if custo:
+            time.sleep(custo)
+        return {"mensagem_id": mensagem["id"], "status": "sucesso"}
+    return processar
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do consumidor RabbitMQ com acks em lote")
+    parser.add_argument("--mensagens", type=int, default=3000)
+    parser.add_argument("--prefetch", type=int, nargs="+", default=[1, 50])
+    parser.add_argument("--lote-ack", type=int, nargs="+", default=[1, 25])
+    parser.add_argument("--latencia-rede-ms", type=float, default=0.5)
+    parser.add_argument("--custo-ms", type=float, default=0.2, help="Tempo de processamento por mensagem")
+    parser.add_argument("--taxa-falha", type=float, default=0.01, help="Falhas por tentativa (3 tentativas)")
+    args = parser.parse_args()
+
+    print(f"{'prefetch':>8} {'lote ack':>8} {'msgs/s':>10} {'acks':>6} {'dlq':>5} "
+          f"{'ack médio (ms)':>15} {'ack p99 (ms)':>13}")
+    for prefetch in args.prefetch:
+        for lote_ack in args.lote_ack:
+            broker = BrokerMemoria(latencia_rede=args.latencia_rede_ms / 1000)
+            preencher(broker, args.mensagens)
+            _, estatisticas = consumir_com_ack(
+                broker.conexao(), FILAS_PADRAO, criar_processador(args.custo_ms / 1000, args.taxa_falha),
+                prefetch=prefetch, lote_ack=lote_ack, inatividade=0.1)
+            restantes = sum(len(broker.filas[fila]) for fila in FILAS_PADRAO)
+            assert restantes == 0 and estatisticas["mensagens"] == args.mensagens
+            assert estatisticas["dlq"] == sum(len(broker.filas[fila + SUFIXO_DLQ]) for fila in FILAS_PADRAO)
+            print(f"{prefetch:>8} {min(lote_ack, prefetch):>8} {estatisticas['mensagens_por_segundo']:>10,.0f} "
+                  f"{estatisticas['acks']:>6} {estatisticas['dlq']:>5} "
+                  f"{estatisticas['latencia_ack_media'] * 1000:>15.2f} {estatisticas['latencia_ack_p99'] * 1000:>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark de chamadas à API do SQS por 1.000 mensagens: consumo unitário x long polling em lotes
+
+Compara um consumidor ingênuo (ReceiveMessage de 1 mensagem sem long polling e um
+DeleteMessage por mensagem) com worker/consumidor_sqs.py (até 10 mensagens por
+ReceiveMessage com long polling e DeleteMessageBatch). O SQS no LocalStack é usado quando
+AWS_ENDPOINT_URL está definida; caso contrário, o moto simula o SQS no próprio processo.
+Com --custo-ms maior que --visibilidade, as mensagens lentas precisam da extensão de visibilidade.
+
+Uso (a partir do diretório flows/):
+    python -m benchmarks.bench_consumidor_sqs --mensagens 1000
+    python -m benchmarks.bench_consumidor_sqs --mensagens 30 --custo-ms 400 --visibilidade 1
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import random
+import time
+
+from worker.consumidor_sqs import (
+    FILAS_SQS_PADRAO,
+    MAX_MENSAGENS_POR_RECEBIMENTO,
+    consumir_sqs,
+    contar_chamadas,
+    criar_cliente_sqs,
+)
+from worker.mensagens import FILAS_POR_TIPO, gerar_mensagem
+
+
+def preparar_filas(cliente, num_mensagens, seed=42):
+    """Cria as filas (se necessário) e publica as mensagens com SendMessageBatch"""
+    gerador = random.Random(seed)
+    urls = {}
+    for fila in FILAS_SQS_PADRAO:
+        urls[fila] = cliente.create_queue(QueueName=fila)["QueueUrl"]
+    por_fila = {fila: [] for fila in FILAS_SQS_PADRAO}
+    for _ in range(num_mensagens):
+        mensagem = gerar_mensagem(gerador)
+        por_fila[FILAS_POR_TIPO[mensagem["tipo"]]].append(json.dumps(mensagem))
+    for fila, corpos in por_fila.items():
+        for inicio in range(0, len(corpos), MAX_MENSAGENS_POR_RECEBIMENTO):
+            cliente.send_message_batch(QueueUrl=urls[fila], Entries=[
+                {"Id": str(indice), "MessageBody": corpo}
+                for indice, corpo in enumerate(corpos[inicio:inicio + MAX_MENSAGENS_POR_RECEBIMENTO])
+            ])
+
+
+def consumir_uma_por_vez(cliente, processar):
+    """Consumidor ingênuo: uma mensagem por ReceiveMessage e um DeleteMessage por mensagem"""
+    chamadas = contar_chamadas(cliente)
+    mensagens = 0
+    inicio = time.perf_counter()
+    for fila in FILAS_SQS_PADRAO:
+        url = cliente.get_queue_url(QueueName=fila)["QueueUrl"]
+        while True:
+            recebidas = cliente.receive_message(QueueUrl=url, MaxNumberOfMessages=1).get("Messages", [])
+            if not recebidas:
+                break
+            processar(json.loads(recebidas[0]["Body"]))
+            cliente.delete_message(QueueUrl=url, ReceiptHandle=recebidas[0]["ReceiptHandle"])
+            mensagens += 1
+    segundos = time.perf_counter() - inicio
+    return {"mensagens": mensagens, "mensagens_por_segundo": mensagens / segundos,
+            "chamadas_por_mil_mensagens": sum(chamadas.values()) * 1000 / max(mensagens, 1),
+            "extensoes_visibilidade": 0}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de chamadas à API do consumidor SQS")
+    parser.add_argument("--mensagens", type=int, default=1000)
+    parser.add_argument("--custo-ms", type=float, default=0.0, help="Tempo de processamento por mensagem")
+    parser.add_argument("--visibilidade", type=int, default=30)
+    parser.add_argument("--espera-polling", type=int, default=1, help="WaitTimeSeconds do long polling")
+    args = parser.parse_args()
+
+    def processar(mensagem):
+        if args.custo_ms:
+            time.sleep(args.custo_ms / 1000)
+        return {"mensagem_id": mensagem["id"], "status": "sucesso"}
+
+    simulador = contextlib.nullcontext()
+    if not os.environ.get("AWS_ENDPOINT_URL"):
+        from moto import mock_aws
+
+        os.environ.setdefault("AWS_ACCESS_KEY_ID", "test")
+        os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "test")
+        simulador = mock_aws()
+
+    with simulador:
+        print(f"{'consumidor':<14} {'mensagens':>9} {'msgs/s':>9} {'chamadas/1.000 msgs':>20} {'extensões':>10}")
+        preparar_filas(criar_cliente_sqs(), args.mensagens)
+        estatisticas = consumir_uma_por_vez(criar_cliente_sqs(), processar)
+        medicoes = [("uma por vez", estatisticas)]
+
+        preparar_filas(criar_cliente_sqs(), args.mensagens)
+        _, estatisticas = consumir_sqs(criar_cliente_sqs(), FILAS_SQS_PADRAO, processar,
+                                       espera_polling=args.espera_polling, visibilidade=args.visibilidade)
+        medicoes.append(("lotes de 10", estatisticas))
+
+        for nome, estatisticas in medicoes:
+            print(f"{nome:<14} {estatisticas['mensagens']:>9} {estatisticas['mensagens_por_segundo']:>9,.0f} "
+                  f"{estatisticas['chamadas_por_mil_mensagens']:>20,.0f} {estatisticas['extensoes_visibilidade']:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark do fluxo de criação de produtos: etapas em sequência contra produtos em paralelo
+
+Executa o fluxo_criacao_produtos (produtos independentes, até CRON_MAX_CONCORRENCIA tasks ao
+mesmo tempo) e o laço anterior, em que cada produto passa pelas três etapas antes do próximo.
+Os sleeps que simulam o processamento (2s + 1s + 1,5s por produto) são multiplicados por
+--escala, e as falhas simuladas são desligadas (a retentativa espera 60s).
+O intervalo do agendamento (60s) aparece na mesma escala, para comparar com a duração da execução.
+
+Uso (a partir do diretório flows/):
+    python -m benchmarks.bench_criacao_produtos --produtos 5 20 --escala 0.2
+"""
+
+import argparse
+import os
+import random
+import time
+import types
+
+os.environ.setdefault("PREFECT_LOGGING_LEVEL", "WARNING")
+
+from prefect import flow
+
+import cron.deploy_scheduler_flows as modulo
+
+
+@flow(name="Fluxo de Criação de Produtos (sequencial)")
+def fluxo_sequencial(num_produtos=5):
+    for _ in range(num_produtos):
+        produto_id = f"PROD-{modulo.random.randint(1000, 9999)}"
+        resultado = modulo.processar_criacao_produto(produto_id)
+        if resultado:
+            estoque = modulo.validar_estoque(resultado)
+            modulo.atualizar_catalogo(estoque)
+    return num_produtos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do fluxo de criação de produtos")
+    parser.add_argument("--produtos", type=int, nargs="+", default=[5, 20])
+    parser.add_argument("--escala", type=float, default=0.2, help="Fator aplicado aos sleeps simulados")
+    args = parser.parse_args()
+
+    modulo.time = types.SimpleNamespace(sleep=lambda segundos: time.sleep(segundos * args.escala))
+    gerador = random.Random(0)
+    modulo.random = types.SimpleNamespace(randint=gerador.randint, random=lambda: 1.0)  # Sem falhas simuladas
+    flow(name="aquecimento-benchmark")(lambda: None)()
+
+    print(f"concorrência: {modulo.MAX_CONCORRENCIA_CRON}, intervalo do agendamento na escala: {60 * args.escala:.1f}s")
+    print(f"{'produtos':>8} {'sequencial (s)':>14} {'paralelo (s)':>12} {'ganho':>6}")
+    for num_produtos in args.produtos:
+        inicio = time.perf_counter()
+        fluxo_sequencial(num_produtos)
+        segundos_sequencial = time.perf_counter() - inicio
+        inicio = time.perf_counter()
+        modulo.fluxo_criacao_produtos(num_produtos)
+        segundos_paralelo = time.perf_counter() - inicio
+        print(f"{num_produtos:>8} {segundos_sequencial:>14.2f} {segundos_paralelo:>12.2f} "
+              f"{segundos_sequencial / segundos_paralelo:>5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark da extração com paginação por chave (etl/extracao_mysql.py)
+
+Cria um banco SQLite local com dados sintéticos (substituto do MySQL) e mede
+registros/s e bytes lidos para diferentes tamanhos de fetch.
+
+Uso (a partir do diretório flows/):
+    python -m benchmarks.bench_extracao_mysql --registros 1000000 --fetch 1000 5000 20000
+"""
+
+import argparse
+import os
+import tempfile
+
+from etl.extracao_mysql import conectar_sqlite, criar_base_sqlite, ler_paginas_keyset
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da extração MySQL com keyset (SQLite local)")
+    parser.add_argument("--registros", type=int, default=200_000)
+    parser.add_argument("--tabela", default="produtos", choices=["produtos", "pedidos"])
+    parser.add_argument("--linhas-por-pagina", type=int, default=50_000)
+    parser.add_argument("--fetch", type=int, nargs="+", default=[500, 5000, 20000],
+                        help="Tamanhos de lote do fetchmany a testar")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        caminho = os.path.join(diretorio, "origem.db")
+        criar_base_sqlite(caminho, tabelas=[args.tabela], num_registros=args.registros)
+
+        print(f"{'fetch':>8} {'registros':>10} {'registros/s':>14} {'MB lidos':>10} {'MB/s':>8}")
+        for tamanho_fetch in args.fetch:
+            conexao = conectar_sqlite(caminho)
+            estatisticas = {}
+            for _ in ler_paginas_keyset(conexao, args.tabela, linhas_por_pagina=args.linhas_por_pagina,
+                                        tamanho_fetch=tamanho_fetch, estatisticas=estatisticas):
+                pass
+            conexao.close()
+            megabytes = estatisticas["bytes"] / 1024 ** 2
+            print(f"{tamanho_fetch:>8} {estatisticas['linhas']:>10} {estatisticas['linhas_por_segundo']:>14,.0f} "
+                  f"{megabytes:>10.1f} {megabytes / estatisticas['segundos']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
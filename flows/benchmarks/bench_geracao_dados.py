@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark da geração de dados sintéticos usada por extrair_dados_mysql
+
+Compara o caminho antigo (list comprehensions com random por linha) com o
+gerador vetorizado de etl/geracao_dados.py, medindo registros/s e pico de memória.
+
+Uso (a partir do diretório flows/):
+    python -m benchmarks.bench_geracao_dados --registros 10000 100000 1000000
+"""
+
+import argparse
+import random
+import time
+import tracemalloc
+
+import pandas as pd
+
+from etl.geracao_dados import gerar_dados_sinteticos
+
+
+def gerar_dados_legado(tabela, num_registros):
+    """Cópia do caminho original de extrair_dados_mysql, mantida apenas para comparação"""
+    if tabela == "produtos":
+        return pd.DataFrame({
+            "produto_id": [f"PROD-{i}" for i in range(1, num_registros + 1)],
+            "nome": [f"Produto {i}" for i in range(1, num_registros + 1)],
+            "categoria": [random.choice(["Roupas", "Eletrônicos", "Alimentos", "Móveis"]) for _ in range(num_registros)],
+            "preco": [round(random.uniform(10.0, 1000.0), 2) for _ in range(num_registros)],
+            "estoque": [random.randint(0, 100) for _ in range(num_registros)]
+        })
+    return pd.DataFrame({
+        "pedido_id": [f"PED-{i}" for i in range(1, num_registros + 1)],
+        "cliente_id": [f"CLI-{random.randint(1, 1000)}" for _ in range(num_registros)],
+        "data": [f"2023-{random.randint(1, 12)}-{random.randint(1, 28)}" for _ in range(num_registros)],
+        "valor_total": [round(random.uniform(50.0, 5000.0), 2) for _ in range(num_registros)],
+        "status": [random.choice(["Novo", "Processando", "Enviado", "Entregue", "Cancelado"]) for _ in range(num_registros)]
+    })
+
+
+def medir(gerador, tabela, num_registros):
+    """
+    Retorna (registros/s, pico de memória em MB, memória do DataFrame em MB)
+
+    O tempo é medido numa execução sem tracemalloc, que distorce bastante
+    o caminho com muitos objetos Python; o pico vem de uma segunda execução.
+    """
+    inicio = time.perf_counter()
+    df = gerador(tabela, num_registros)
+    duracao = time.perf_counter() - inicio
+    memoria_df = df.memory_usage(deep=True).sum()
+    del df
+
+    tracemalloc.start()
+    gerador(tabela, num_registros)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return num_registros / duracao, pico / 1024 ** 2, memoria_df / 1024 ** 2
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da geração de dados sintéticos do ETL")
+    parser.add_argument("--registros", type=int, nargs="+", default=[10_000, 100_000, 1_000_000],
+                        help="Quantidades de registros a testar")
+    parser.add_argument("--tabelas", nargs="+", default=["produtos", "pedidos"])
+    parser.add_argument("--sem-legado", action="store_true",
+                        help="Mede apenas o gerador vetorizado (útil para dezenas de milhões de linhas)")
+    args = parser.parse_args()
+
+    geradores = {"vetorizado": lambda t, n: gerar_dados_sinteticos(t, n, seed=42)}
+    if not args.sem_legado:
+        geradores["legado"] = gerar_dados_legado
+
+    print(f"{'tabela':<10} {'registros':>12} {'gerador':<11} {'registros/s':>14} {'pico MB':>10} {'df MB':>10}")
+    for tabela in args.tabelas:
+        for num_registros in args.registros:
+            for nome, gerador in geradores.items():
+                taxa, pico, memoria_df = medir(gerador, tabela, num_registros)
+                print(f"{tabela:<10} {num_registros:>12} {nome:<11} {taxa:>14,.0f} {pico:>10.1f} {memoria_df:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark da inicialização de cada entrypoint de fluxos (cron, worker e etl)
+
+Cada entrypoint roda em um processo novo (importação a frio), que mede:
+  - prefect (s): importação do Prefect, paga por qualquer execução;
+  - módulo (s): importação do módulo de fluxos depois do Prefect, e se pandas foi carregado;
+  - primeira task (s): da chamada do fluxo até o início da primeira task;
+  - fim da primeira (s): até o fim da primeira task, que inclui as importações adiadas para
+    dentro dela (ex.: pandas no ETL);
+  - total (s): a execução inteira do fluxo.
+A API temporária do Prefect é iniciada antes da chamada do fluxo e fica fora das medições
+(com um servidor, ela já está no ar). Os sleeps que simulam consultas e processamento são
+removidos, e o random é semeado para o fluxo de cron não cair nas falhas simuladas.
+
+Uso (a partir do diretório flows/):
+    python -m benchmarks.bench_inicializacao --repeticoes 3
+"""
+
+import argparse
+import functools
+import importlib
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import types
+
+# Entrypoint -> (módulo, fluxo executado, parâmetros)
+ENTRYPOINTS = {
+    "cron": ("cron.deploy_scheduler_flows", "fluxo_criacao_produtos", {}),
+    "worker": ("worker.deploy_worker_flows", "processar_fila_rabbitmq", {"max_mensagens": 50}),
+    "etl": ("etl.deploy_bigdata_flows", "etl_pedidos_mysql_para_redshift", {"limite": 1000}),
+}
+
+
+def medir(entrypoint):
+    """Executa no processo atual (novo) e retorna as medições do entrypoint"""
+    nome_modulo, nome_fluxo, parametros = ENTRYPOINTS[entrypoint]
+    inicio = time.perf_counter()
+    from prefect import flow
+    from prefect.tasks import Task
+
+    importacao_prefect = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    modulo = importlib.import_module(nome_modulo)
+    importacao_modulo = time.perf_counter() - inicio
+    pandas_na_importacao = "pandas" in sys.modules
+
+    flow(name="aquecimento-benchmark")(lambda: None)()
+
+    modulo.time = types.SimpleNamespace(**{nome: getattr(time, nome) for nome in dir(time) if not nome.startswith("_")})
+    modulo.time.sleep = lambda segundos: None
+    modulo.random.seed(0)  # Sem falhas simuladas no fluxo de cron (retentativas esperam 60s)
+    primeira_task = []
+
+    def marcar(fn):
+        @functools.wraps(fn)
+        def executar(*args, **kwargs):
+            if primeira_task:
+                return fn(*args, **kwargs)
+            primeira_task.append(time.perf_counter())
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                primeira_task.append(time.perf_counter())
+        return executar
+
+    for objeto in vars(modulo).values():
+        if isinstance(objeto, Task):
+            objeto.fn = marcar(objeto.fn)
+
+    inicio = time.perf_counter()
+    getattr(modulo, nome_fluxo)(**parametros)
+    fim = time.perf_counter()
+    return {
+        "prefect": importacao_prefect,
+        "modulo": importacao_modulo,
+        "pandas": pandas_na_importacao,
+        "primeira_task": primeira_task[0] - inicio,
+        "fim_primeira_task": primeira_task[1] - inicio,
+        "total": fim - inicio,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da inicialização dos entrypoints de fluxos")
+    parser.add_argument("--entrypoints", nargs="+", choices=list(ENTRYPOINTS), default=list(ENTRYPOINTS))
+    parser.add_argument("--repeticoes", type=int, default=3, help="Processos por entrypoint (mediana)")
+    parser.add_argument("--interno", choices=list(ENTRYPOINTS), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.interno:
+        print(json.dumps(medir(args.interno)))
+        return
+
+    ambiente = dict(os.environ, PREFECT_LOGGING_LEVEL="WARNING")
+    print(f"{'entrypoint':<10} {'prefect (s)':>11} {'módulo (s)':>10} {'pandas':>6} "
+          f"{'primeira task (s)':>17} {'fim da primeira (s)':>19} {'total (s)':>9}")
+    for entrypoint in args.entrypoints:
+        medicoes = []
+        for _ in range(args.repeticoes):
+            saida = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_inicializacao", "--interno", entrypoint],
+                env=ambiente, capture_output=True, text=True, check=True,
+            ).stdout
+            medicoes.append(json.loads(saida.strip().splitlines()[-1]))
+        mediana = {chave: statistics.median(medicao[chave] for medicao in medicoes)
+                   for chave in ("prefect", "modulo", "primeira_task", "fim_primeira_task", "total")}
+        print(f"{entrypoint:<10} {mediana['prefect']:>11.2f} {mediana['modulo']:>10.3f} "
+              f"{'sim' if medicoes[0]['pandas'] else 'não':>6} {mediana['primeira_task']:>17.3f} "
+              f"{mediana['fim_primeira_task']:>19.3f} {mediana['total']:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark de memória e vazão: drenagem em dicts x LoteMensagens com resultados em contadores
+
+Para cada tamanho de drenagem, executa o caminho do fluxo (coalescência, partições por id,
+processamento de cada partição e contagem dos resultados) com um processamento sem custo,
+nas duas representações:
+  - dicts: lista de mensagens de gerar_mensagem e lista com um dict de resultado por mensagem;
+  - compacto: LoteMensagens (colunas com os campos categóricos em códigos de 1 byte) e
+    ResultadosAcumulados (contadores).
+A memória é medida com tracemalloc (a drenagem retida e o pico do processamento); a vazão,
+em uma segunda execução sem tracemalloc.
+
+Uso (a partir do diretório flows/):
+    python -m benchmarks.bench_mensagens_compactas --mensagens 100000 500000
+"""
+
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+
+from worker.mensagens import gerar_lote, gerar_mensagem
+from worker.particionamento import coalescer, particionar
+from worker.processamento_lote import ResultadosAcumulados, processar_em_lote
+
+
+def processar(mensagem):
+    return {"mensagem_id": mensagem["id"], "processado_em": time.time(), "duracao": 0.0, "status": "sucesso"}
+
+
+def drenar(modo, num_mensagens):
+    gerador = random.Random(42)
+    if modo == "compacto":
+        return gerar_lote(num_mensagens, gerador)
+    return [gerar_mensagem(gerador) for _ in range(num_mensagens)]
+
+
+def processar_drenagem(modo, mensagens, tamanho_lote):
+    """Mesmo caminho de processar_mensagens, sem o task runner; retorna (sucessos, coalescidas)"""
+    if modo == "compacto":
+        restantes, acumulados = coalescer(mensagens, ResultadosAcumulados())
+        for particao in particionar(restantes, tamanho_lote):
+            acumulados.mesclar(ResultadosAcumulados(processar_em_lote(particao, processar)))
+        return acumulados.por_status["sucesso"], acumulados.por_status["coalescida"]
+
+    restantes, descartadas = coalescer(mensagens)
+    resultados = []
+    for particao in particionar(restantes, tamanho_lote):
+        resultados.extend(processar_em_lote(particao, processar))
+    resultados.extend(descartadas)
+    sucessos = len([resultado for resultado in resultados if resultado.get("status") == "sucesso"])
+    return sucessos, len(resultados) - sucessos
+
+
+def medir_memoria(modo, num_mensagens, tamanho_lote):
+    gc.collect()
+    tracemalloc.start()
+    mensagens = drenar(modo, num_mensagens)
+    drenagem, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    processar_drenagem(modo, mensagens, tamanho_lote)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return drenagem, pico
+
+
+def medir_vazao(modo, num_mensagens, tamanho_lote):
+    gc.collect()
+    inicio = time.perf_counter()
+    mensagens = drenar(modo, num_mensagens)
+    geracao = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    sucessos, coalescidas = processar_drenagem(modo, mensagens, tamanho_lote)
+    return geracao, time.perf_counter() - inicio, sucessos + coalescidas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de memória da representação compacta de mensagens")
+    parser.add_argument("--mensagens", type=int, nargs="+", default=[100_000, 500_000])
+    parser.add_argument("--tamanho-lote", type=int, default=1000)
+    args = parser.parse_args()
+
+    print(f"{'mensagens':>9} {'modo':<9} {'drenagem (MB)':>13} {'bytes/msg':>9} {'pico (MB)':>9} "
+          f"{'geração msgs/s':>14} {'pipeline msgs/s':>15}")
+    for num_mensagens in args.mensagens:
+        for modo in ("dicts", "compacto"):
+            drenagem, pico = medir_memoria(modo, num_mensagens, args.tamanho_lote)
+            geracao, processamento, total = medir_vazao(modo, num_mensagens, args.tamanho_lote)
+            assert total == num_mensagens
+            print(f"{num_mensagens:>9,} {modo:<9} {drenagem / 2 ** 20:>13.1f} {drenagem / num_mensagens:>9.0f} "
+                  f"{pico / 2 ** 20:>9.1f} {num_mensagens / geracao:>14,.0f} {num_mensagens / processamento:>15,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark do tempo total (wall clock) de migracao_completa_mysql_redshift
+
+Executa a migração semanal com diferentes limites de concorrência (ETL_MAX_CONCORRENCIA);
+com 1 os ramos rodam em sequência, como antes. Os sleeps que simulam consultas e cargas
+são multiplicados por --escala para a medição caber em poucos segundos.
+Cada configuração roda em um processo separado, pois o limite é lido na importação dos fluxos.
+
+Uso (a partir do diretório flows/):
+    python -m benchmarks.bench_migracao_paralela --concorrencia 1 2 4 --escala 0.1
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import types
+
+
+def executar_migracao(escala):
+    """Roda uma migração no processo atual e retorna o tempo total em segundos"""
+    from prefect import flow
+
+    import etl.deploy_bigdata_flows as fluxos
+
+    # A primeira execução de fluxo inicia a API/servidor temporário; fica fora da medição
+    flow(name="aquecimento-benchmark")(lambda: None)()
+
+    relogio = types.SimpleNamespace(time=time.time, sleep=lambda segundos: time.sleep(segundos * escala))
+    fluxos.time = relogio
+    fluxos.random.seed(42)
+    inicio = time.perf_counter()
+    fluxos.migracao_completa_mysql_redshift()
+    return time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do paralelismo da migração completa")
+    parser.add_argument("--concorrencia", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--escala", type=float, default=0.1, help="Fator aplicado aos sleeps simulados")
+    parser.add_argument("--interno", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.interno:
+        print(json.dumps({"segundos": executar_migracao(args.escala)}))
+        return
+
+    print(f"{'concorrência':>12} {'segundos':>10}")
+    for concorrencia in args.concorrencia:
+        ambiente = dict(os.environ, ETL_MAX_CONCORRENCIA=str(concorrencia), PREFECT_LOGGING_LEVEL="WARNING")
+        saida = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_migracao_paralela", "--interno", "--escala", str(args.escala)],
+            env=ambiente, capture_output=True, text=True, check=True,
+        ).stdout
+        resultado = json.loads(saida.strip().splitlines()[-1])
+        print(f"{concorrencia:>12} {resultado['segundos']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark do agendamento por prioridade no worker contínuo (worker/prioridade.py)
+
+Uma fonte sintética gera mensagens alta/media/baixa com taxas fixas cuja soma passa da
+capacidade dos processadores (--processadores / --custo-ms), então o acúmulo de baixa cresce
+no buffer durante toda a execução. A cada --janela segundos são medidos o acúmulo de baixa e
+a latência p99 (geração até o fim do processamento) de cada prioridade. Compara a ordem FIFO
+(pesos iguais, sem reserva) com o agendamento por prioridade: a p99 de alta deve ficar estável
+enquanto o acúmulo de baixa cresce.
+
+Uso (a partir do diretório flows/):
+    python -m benchmarks.bench_prioridades --duracao 20 --taxas 80 200 760
+"""
+
+import argparse
+import random
+import time
+
+from worker.mensagens import PRIORIDADES, gerar_mensagem
+from worker.prioridade import PESOS_PADRAO, RESERVA_ALTA_PADRAO
+from worker.streaming import WorkerStreaming
+
+
+class FonteCarga:
+    """Gera mensagens de cada prioridade a uma taxa fixa (mensagens/s), sem limite de buffer"""
+
+    def __init__(self, taxas, seed=42):
+        self.taxas = taxas
+        self.gerador = random.Random(seed)
+        self.inicio = time.monotonic()
+        self.geradas = dict.fromkeys(taxas, 0)
+
+    def receber(self, maximo, espera):
+        time.sleep(0.005)
+        decorrido = time.monotonic() - self.inicio
+        recebidas = []
+        for nome, taxa in self.taxas.items():
+            for _ in range(int(decorrido * taxa) - self.geradas[nome]):
+                mensagem = gerar_mensagem(self.gerador)
+                mensagem["dados"]["metadados"]["prioridade"] = nome
+                recebidas.append((mensagem, None))
+            self.geradas[nome] = int(decorrido * taxa)
+        self.gerador.shuffle(recebidas)
+        return recebidas
+
+    def confirmar(self, recibos):
+        pass
+
+    def rejeitar(self, recibos):
+        pass
+
+    def fechar(self):
+        pass
+
+
+def executar(modo, args):
+    taxas = dict(zip(PRIORIDADES, args.taxas))
+    custo = {"segundos": args.custo_ms / 1000}
+
+    def processar(mensagem):
+        time.sleep(custo["segundos"])
+        return {"mensagem_id": mensagem["id"], "status": "sucesso"}
+
+    if modo == "fifo":
+        reserva, pesos = 0.0, dict.fromkeys(PRIORIDADES, 1)
+    else:
+        reserva, pesos = args.reserva_alta, PESOS_PADRAO
+    # Buffer sem limite prático: o acúmulo fica no worker, onde a prioridade pode agir
+    worker = WorkerStreaming(FonteCarga(taxas), processar, num_processadores=args.processadores,
+                             tamanho_buffer=10 ** 9, reserva_alta=reserva, pesos=pesos)
+    worker.iniciar()
+    try:
+        for janela in range(1, int(args.duracao / args.janela) + 1):
+            time.sleep(args.janela)
+            _, latencias = worker.coletar()
+            p99 = latencias["latencia_p99_por_prioridade"]
+            print(f"{modo:<10} {janela * args.janela:>5.0f} {worker.aguardando()['baixa']:>12,} "
+                  + " ".join(f"{p99[nome] * 1000:>13,.0f}" for nome in PRIORIDADES))
+    finally:
+        custo["segundos"] = 0  # Esvazia o acúmulo rapidamente na parada
+        worker.parar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do agendamento por prioridade no worker contínuo")
+    parser.add_argument("--duracao", type=float, default=20.0, help="Segundos por modo")
+    parser.add_argument("--janela", type=float, default=2.0, help="Segundos entre medições")
+    parser.add_argument("--processadores", type=int, default=8)
+    parser.add_argument("--custo-ms", type=float, default=10.0, help="Tempo de processamento por mensagem")
+    parser.add_argument("--taxas", type=float, nargs=3, default=[80, 200, 760],
+                        help="Mensagens/s de alta, media e baixa")
+    parser.add_argument("--reserva-alta", type=float, default=RESERVA_ALTA_PADRAO)
+    parser.add_argument("--modo", nargs="+", choices=["fifo", "prioridade"], default=["fifo", "prioridade"])
+    args = parser.parse_args()
+
+    capacidade = args.processadores * 1000 / args.custo_ms
+    print(f"Chegada de {sum(args.taxas):,.0f} msgs/s para capacidade de {capacidade:,.0f} msgs/s")
+    print(f"{'modo':<10} {'t (s)':>5} {'acúmulo baixa':>12} "
+          + " ".join(f"{'p99 ' + nome + ' (ms)':>13}" for nome in PRIORIDADES))
+    for modo in args.modo:
+        executar(modo, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark de mensagens/s e latência p99: threads (como o ConcurrentTaskRunner) x asyncio com semáforo
+
+Processa o mesmo conjunto de mensagens com executar_processamento em um pool de threads e com
+executar_processamento_async em um único event loop, variando a concorrência. Os sleeps que
+simulam o processamento são multiplicados por --escala. A latência vai do início do
+processamento até a conclusão de cada mensagem (todas as mensagens chegam juntas).
+
+Uso (a partir do diretório flows/):
+    python -m benchmarks.bench_processamento_async --mensagens 5000 --threads 16 64 256 --em-voo 64 256 5000
+"""
+
+import argparse
+import asyncio
+import random
+import threading
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+
+from worker.mensagens import gerar_mensagem
+from worker.processamento_async import processar_concorrente, resumir_latencias
+from worker.processamento_lote import processar_com_tentativas
+
+
+def processar_em_threads(mensagens, processar, threads):
+    """Uma thread ocupada por mensagem em processamento, como as tasks no ConcurrentTaskRunner"""
+    latencias = []
+    inicio = time.perf_counter()
+
+    def processar_uma(mensagem):
+        resultado = processar_com_tentativas(processar, mensagem)
+        latencias.append(time.perf_counter() - inicio)
+        return resultado
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(processar_uma, mensagens))
+        pico_threads = threading.active_count()
+    return resumir_latencias(latencias, time.perf_counter() - inicio), pico_threads
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark threads x asyncio no processamento de mensagens")
+    parser.add_argument("--mensagens", type=int, default=2000)
+    parser.add_argument("--threads", type=int, nargs="+", default=[16, 64, 256])
+    parser.add_argument("--em-voo", type=int, nargs="+", default=[16, 64, 256, 2000])
+    parser.add_argument("--escala", type=float, default=0.1, help="Fator aplicado aos sleeps simulados")
+    args = parser.parse_args()
+
+    import worker.deploy_worker_flows as fluxos
+
+    escala = args.escala
+    fluxos.time = types.SimpleNamespace(time=time.time, sleep=lambda segundos: time.sleep(segundos * escala))
+    fluxos.asyncio = types.SimpleNamespace(sleep=lambda segundos: asyncio.sleep(segundos * escala))
+    mensagens = [gerar_mensagem(random.Random(indice)) for indice in range(args.mensagens)]
+
+    print(f"{'modo':<8} {'concorrência':>12} {'threads':>8} {'msgs/s':>10} {'p50 (ms)':>9} {'p99 (ms)':>9}")
+    for threads in args.threads:
+        fluxos.random.seed(42)
+        estatisticas, pico_threads = processar_em_threads(mensagens, fluxos.executar_processamento, threads)
+        print(f"{'threads':<8} {threads:>12} {pico_threads:>8} {estatisticas['mensagens_por_segundo']:>10,.0f} "
+              f"{estatisticas['latencia_p50'] * 1000:>9.0f} {estatisticas['latencia_p99'] * 1000:>9.0f}")
+
+    for em_voo in args.em_voo:
+        fluxos.random.seed(42)
+        _, estatisticas = asyncio.run(processar_concorrente(mensagens, fluxos.executar_processamento_async, em_voo))
+        print(f"{'asyncio':<8} {em_voo:>12} {threading.active_count():>8} {estatisticas['mensagens_por_segundo']:>10,.0f} "
+              f"{estatisticas['latencia_p50'] * 1000:>9.0f} {estatisticas['latencia_p99'] * 1000:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark de mensagens/s do fluxo processar_fila_rabbitmq: uma task por mensagem x lotes por task
+
+Executa o fluxo simulado no processo atual (servidor temporário do Prefect) com diferentes
+tamanhos de lote; `--tamanho-lote 1` é o mapeamento original de uma task por mensagem.
+Os sleeps que simulam o processamento são multiplicados por --escala, deixando em evidência
+o custo de orquestração. O intervalo entre retries da task por mensagem é zerado para que
+as falhas simuladas custem o mesmo nos dois modos.
+
+Uso (a partir do diretório flows/):
+    python -m benchmarks.bench_processamento_lote --mensagens 500 --tamanho-lote 1 25 100 --escala 0.01
+"""
+
+import argparse
+import random
+import time
+import types
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de processamento em lotes de mensagens")
+    parser.add_argument("--mensagens", type=int, default=300)
+    parser.add_argument("--tamanho-lote", type=int, nargs="+", default=[1, 25, 100])
+    parser.add_argument("--escala", type=float, default=0.01, help="Fator aplicado aos sleeps simulados")
+    args = parser.parse_args()
+
+    from prefect import flow
+
+    import worker.deploy_worker_flows as fluxos
+
+    # A primeira execução de fluxo inicia a API/servidor temporário; fica fora da medição
+    flow(name="aquecimento-benchmark")(lambda: None)()
+
+    fluxos.time = types.SimpleNamespace(time=time.time, sleep=lambda segundos: time.sleep(segundos * args.escala))
+    fluxos.processar_mensagem = fluxos.processar_mensagem.with_options(retry_delay_seconds=0)
+
+    medicoes = []
+    for tamanho_lote in args.tamanho_lote:
+        fluxos.random.seed(42)
+        inicio = time.perf_counter()
+        metricas = fluxos.processar_fila_rabbitmq(max_mensagens=args.mensagens, tamanho_lote=tamanho_lote)
+        segundos = time.perf_counter() - inicio
+        medicoes.append((tamanho_lote, segundos, metricas))
+
+    print(f"{'tamanho do lote':>15} {'segundos':>9} {'msgs/s':>9} {'sucessos':>9} {'falhas':>7}")
+    for tamanho_lote, segundos, metricas in medicoes:
+        print(f"{tamanho_lote:>15} {segundos:>9.2f} {args.mensagens / segundos:>9.1f} "
+              f"{metricas['sucessos']:>9} {metricas['falhas']:>7}")
+
+
+if __name__ == "__main__":
+    main()
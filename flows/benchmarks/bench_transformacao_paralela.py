@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark da transformação particionada em pool de processos (etl/transformacao_paralela.py)
+
+Executa as mesmas etapas com 1, 2, 4... processos, mostra o ganho em relação a um
+processo e confere se o agregado é igual ao da execução em um único processo.
+
+Uso (a partir do diretório flows/):
+    python -m benchmarks.bench_transformacao_paralela --registros 5000000 --processos 1 2 4 8
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import time
+
+import numpy as np
+
+from etl.geracao_dados import gerar_dados_sinteticos
+from etl.transformacao_paralela import executar_pipeline_paralelo
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da transformação em pool de processos")
+    parser.add_argument("--registros", type=int, default=5_000_000)
+    parser.add_argument("--processos", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--etapas", default="enriquecimento+projecao_precos+agregacao")
+    args = parser.parse_args()
+
+    df_base = gerar_dados_sinteticos("produtos", args.registros, seed=42)
+    print(f"{args.registros} registros, etapas '{args.etapas}', {os.cpu_count()} CPUs disponíveis")
+    print(f"{'processos':>9} {'segundos':>9} {'ganho':>7} {'agregado igual':>15}")
+
+    referencia = None
+    tempo_base = None
+    for processos in args.processos:
+        with contextlib.redirect_stdout(io.StringIO()):
+            # Aquecimento: inicia os processos do pool fora da medição
+            executar_pipeline_paralelo(df_base.head(10_000).copy(), args.etapas, processos=processos)
+            inicio = time.perf_counter()
+            resultado = executar_pipeline_paralelo(df_base.copy(), args.etapas, processos=processos)
+            segundos = time.perf_counter() - inicio
+
+        agregado = resultado["agregado"].sort_values("categoria").reset_index(drop=True)
+        if referencia is None:
+            referencia, tempo_base = agregado, segundos
+        igual = (np.allclose(agregado["preco_medio"], referencia["preco_medio"])
+                 and (agregado["estoque_total"].to_numpy() == referencia["estoque_total"].to_numpy()).all())
+        print(f"{processos:>9} {segundos:>9.2f} {tempo_base / segundos:>6.2f}x {str(igual):>15}")
+
+
+if __name__ == "__main__":
+    main()
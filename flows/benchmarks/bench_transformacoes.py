@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark de transformar_dados: duas chamadas separadas (enriquecimento e depois
+agregacao, como o fluxo fazia) contra a passada única do pipeline de etl/transformacoes.py
+
+Mede tempo de execução e memória alocada (pico do tracemalloc) sem o sleep simulado da task.
+
+Uso (a partir do diretório flows/):
+    python -m benchmarks.bench_transformacoes --registros 100000 1000000 5000000
+"""
+
+import argparse
+import contextlib
+import io
+import time
+import tracemalloc
+
+from etl.geracao_dados import gerar_dados_sinteticos
+from etl.transformacoes import executar_pipeline
+
+
+def transformar_legado(df, tipo_transformacao):
+    """Cópia da lógica original de transformar_dados (sem o sleep), mantida apenas para comparação"""
+    if tipo_transformacao == "enriquecimento":
+        if "preco" in df.columns and "estoque" in df.columns:
+            df["valor_estoque"] = df["preco"] * df["estoque"]
+        if "categoria" in df.columns:
+            df["categoria_id"] = df["categoria"].map({
+                "Roupas": "CAT-001",
+                "Eletrônicos": "CAT-002",
+                "Alimentos": "CAT-003",
+                "Móveis": "CAT-004"
+            })
+    elif tipo_transformacao == "agregacao":
+        if "categoria" in df.columns:
+            df = df.groupby("categoria").agg({
+                "preco": "mean",
+                "estoque": "sum"
+            }).reset_index()
+            df = df.rename(columns={"preco": "preco_medio", "estoque": "estoque_total"})
+    return df
+
+
+def caminho_legado(df):
+    df_enriquecido = transformar_legado(df, "enriquecimento")
+    return df_enriquecido, transformar_legado(df_enriquecido, "agregacao")
+
+
+def caminho_pipeline(df):
+    resultado = executar_pipeline(df, "enriquecimento+agregacao")
+    return resultado["dados"], resultado["agregado"]
+
+
+def medir(caminho, df_base):
+    """Retorna (segundos, MB no pico de alocação) para uma execução sobre uma cópia do DataFrame"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        df = df_base.copy()
+        inicio = time.perf_counter()
+        caminho(df)
+        segundos = time.perf_counter() - inicio
+
+        df = df_base.copy()
+        tracemalloc.start()
+        caminho(df)
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return segundos, pico / 1024 ** 2
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do pipeline de transformações do ETL")
+    parser.add_argument("--registros", type=int, nargs="+", default=[100_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"{'registros':>10} {'caminho':<10} {'segundos':>9} {'registros/s':>14} {'alocado MB':>11}")
+    for num_registros in args.registros:
+        df_base = gerar_dados_sinteticos("produtos", num_registros, seed=42)
+        for nome, caminho in (("legado", caminho_legado), ("pipeline", caminho_pipeline)):
+            segundos, pico = medir(caminho, df_base)
+            print(f"{num_registros:>10} {nome:<10} {segundos:>9.3f} {num_registros / segundos:>14,.0f} {pico:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
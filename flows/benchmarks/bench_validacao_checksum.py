@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark da validação da carga por checksums (etl/validacao_checksum.py) contra a releitura linha a linha
+
+Carrega a tabela em um SQLite local (substituto do Redshift) com a carga em massa e valida de
+duas formas:
+  - linha a linha: relê a tabela inteira do destino e compara cada linha com o DataFrame;
+  - checksum: checksum do DataFrame (calculado durante a carga) e uma consulta de agregação.
+As linhas lidas mostram o que trafega do destino: a tabela inteira contra uma linha. No SQLite
+o md5 dos textos roda em uma função Python registrada na conexão, então a consulta de agregação
+fica limitada pela CPU; no PostgreSQL/Redshift MD5 e SUM são nativos e paralelos no banco.
+Depois soma um centavo a um único valor no destino e confere se a validação por checksum detecta.
+
+Uso (a partir do diretório flows/):
+    python -m benchmarks.bench_validacao_checksum --registros 10000 100000 1000000
+"""
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+from etl.carga_bulk import _linhas_para_sqlite, carregar_em_massa
+from etl.geracao_dados import gerar_dados_sinteticos
+from etl.validacao_checksum import calcular_checksum, checksum_destino, comparar_checksums
+
+
+def validar_linha_a_linha(df, conexao, tabela, chave):
+    """Relê o destino ordenado pela chave e compara cada linha; retorna (segundos, divergências)"""
+    inicio = time.perf_counter()
+    esperado = sorted(_linhas_para_sqlite(df), key=lambda linha: linha[0])
+    cursor = conexao.execute(f"SELECT {', '.join(df.columns)} FROM {tabela} ORDER BY {chave}")
+    divergencias = sum(linha != tuple(lida) for linha, lida in zip(esperado, cursor))
+    return time.perf_counter() - inicio, divergencias
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da validação da carga por checksums")
+    parser.add_argument("--registros", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--tabela", default="produtos", choices=["produtos", "pedidos"])
+    args = parser.parse_args()
+
+    tabela = f"{args.tabela}_dw"
+    chave = "produto_id" if args.tabela == "produtos" else "pedido_id"
+    print(f"{'registros':>10} {'linha a linha (s)':>17} {'linhas lidas':>12} {'checksum df (s)':>15} "
+          f"{'consulta (s)':>12} {'linhas lidas':>12} {'confere':>7} {'detecta alteração':>17}")
+    for num_registros in args.registros:
+        df = gerar_dados_sinteticos(args.tabela, num_registros, seed=42)
+        with tempfile.TemporaryDirectory() as diretorio:
+            caminho = os.path.join(diretorio, "destino.db")
+            carregar_em_massa(df, tabela, f"sqlite:{caminho}", staging=os.path.join(diretorio, "staging"),
+                              substituir=True)
+            conexao = sqlite3.connect(caminho)
+            segundos_linhas, _ = validar_linha_a_linha(df, conexao, tabela, chave)
+
+            inicio = time.perf_counter()
+            esperado = calcular_checksum(df)
+            segundos_checksum = time.perf_counter() - inicio
+            inicio = time.perf_counter()
+            confere = not comparar_checksums(esperado, checksum_destino(conexao, tabela, esperado, "sqlite"))
+            segundos_consulta = time.perf_counter() - inicio
+
+            # Um centavo a mais em uma única linha
+            coluna = "preco" if args.tabela == "produtos" else "valor_total"
+            conexao.execute(f"UPDATE {tabela} SET {coluna} = {coluna} + 0.01 WHERE rowid = {num_registros // 2}")
+            detecta = bool(comparar_checksums(esperado, checksum_destino(conexao, tabela, esperado, "sqlite")))
+            conexao.close()
+
+        print(f"{num_registros:>10,} {segundos_linhas:>17.2f} {num_registros:>12,} {segundos_checksum:>15.3f} "
+              f"{segundos_consulta:>12.3f} {1:>12} {'sim' if confere else 'NÃO':>7} {'sim' if detecta else 'NÃO':>17}")
+
+
+if __name__ == "__main__":
+    main()
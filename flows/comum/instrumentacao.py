@@ -0,0 +1,404 @@
+import functools
+import inspect
+import json
+import os
+import re
+import resource
+import sys
+import tempfile
+import threading
+import time
+import unicodedata
+from collections import Counter
+
+# Instrumentação comum às tasks e fluxos de todos os cenários.
+#
+# As tasks são decoradas com @instrumentar_task (abaixo do @task) e os fluxos com
+# @instrumentar_fluxo (abaixo do @flow). Cada execução de task registra:
+#   - segundos: tempo de parede;
+#   - cpu_segundos: tempo de CPU da thread que executou a task (nas tasks assíncronas é o do
+#     event loop, então inclui as corrotinas que rodaram ao mesmo tempo);
+#   - pico_rss_bytes: pico de memória residente do processo ao fim da task, e quanto a task
+#     (ou as que rodavam junto) aumentou esse pico;
+#   - linhas: tamanho do resultado (DataFrame, lista, lote de mensagens...) ou, se o resultado
+#     não tiver tamanho, da maior entrada;
+#   - bytes_entrada/bytes_saida: memória dos DataFrames/arrays/bytes recebidos e retornados.
+# As medições ficam agrupadas pela execução do fluxo (flow_run_id), então tasks em threads e
+# subfluxos são atribuídos ao fluxo certo. Ao fim do fluxo, mesmo quando ele falha:
+#   - um artefato de tabela "metricas-<fluxo>" no Prefect, com os totais por task;
+#   - <INSTRUMENTACAO_DIRETORIO>/<fluxo>.prom, no formato texto do Prometheus (lido pelo
+#     textfile collector do node_exporter), e <fluxo>.json com cada execução de task.
+#
+# Perfil opcional das tasks listadas em INSTRUMENTACAO_PERFIL (nomes separados por vírgula):
+#   INSTRUMENTACAO_PERFIL_MODO=cprofile   -> cProfile (determinístico), salvo em .prof
+#   INSTRUMENTACAO_PERFIL_MODO=amostragem -> pilhas da thread da task coletadas a cada
+#       INSTRUMENTACAO_INTERVALO_AMOSTRAGEM segundos, como o py-spy, salvas em .folded
+#       (formato do flamegraph.pl/speedscope); custo baixo o bastante para produção
+# As execuções da mesma task são somadas em um único perfil por fluxo, publicado também como
+# artefato markdown "perfil-<fluxo>-<task>" com as funções mais custosas.
+#
+# INSTRUMENTACAO_ATIVA=0 desliga tudo; tasks chamadas fora de um fluxo (ex.: task.fn nos
+# benchmarks) não são medidas.
+
+DIRETORIO_PADRAO = os.path.join(os.path.expanduser("~"), ".prefect", "metricas")
+FUNCOES_NO_PERFIL = 25
+
+_medicoes = {}  # flow_run_id -> {"execucoes": [...], "perfis": {task: Stats/Counter}}
+_trava = threading.Lock()
+
+
+def _ativa():
+    return os.environ.get("INSTRUMENTACAO_ATIVA", "1") != "0"
+
+
+def _diretorio():
+    return os.environ.get("INSTRUMENTACAO_DIRETORIO", DIRETORIO_PADRAO)
+
+
+def _tasks_com_perfil():
+    return {nome.strip() for nome in os.environ.get("INSTRUMENTACAO_PERFIL", "").split(",") if nome.strip()}
+
+
+def _slug(nome):
+    ascii_ = unicodedata.normalize("NFKD", nome).encode("ascii", "ignore").decode()
+    return re.sub(r"[^a-z0-9]+", "-", ascii_.lower()).strip("-")
+
+
+def _pico_rss_bytes():
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico if sys.platform == "darwin" else pico * 1024  # Linux informa em KB
+
+
+def _bytes(valor):
+    if isinstance(valor, (bytes, bytearray, memoryview)):
+        return len(valor)
+    if hasattr(valor, "memory_usage"):  # DataFrame/Series (sem deep: não percorre os objetos)
+        uso = valor.memory_usage(index=True)
+        return int(uso.sum() if hasattr(uso, "sum") else uso)
+    return int(getattr(valor, "nbytes", 0) or 0)  # numpy/pyarrow
+
+
+def _linhas(valor):
+    if isinstance(valor, (str, bytes, dict)) or not hasattr(valor, "__len__"):
+        return None
+    return len(valor)
+
+
+def _contar(args, kwargs, resultado):
+    entradas = list(args) + list(kwargs.values())
+    linhas = _linhas(resultado)
+    if linhas is None:
+        linhas = max((tamanho for tamanho in map(_linhas, entradas) if tamanho is not None), default=0)
+    return linhas, sum(map(_bytes, entradas)), _bytes(resultado)
+
+
+def _contexto_task():
+    """(flow_run_id, nome da task) da task em execução, ou None fora de um fluxo"""
+    from prefect.context import TaskRunContext
+
+    contexto = TaskRunContext.get()
+    if contexto is None or contexto.task_run.flow_run_id is None:
+        return None
+    return str(contexto.task_run.flow_run_id), contexto.task.name
+
+
+class _Amostrador:
+    """Coleta a pilha de uma thread a intervalos fixos (perfil por amostragem)"""
+
+    def __init__(self, intervalo):
+        self.intervalo = intervalo
+        self.alvo = threading.get_ident()
+        self.pilhas = Counter()
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._amostrar, name="amostrador-perfil", daemon=True)
+
+    def _amostrar(self):
+        while not self._parar.wait(self.intervalo):
+            quadro = sys._current_frames().get(self.alvo)
+            pilha = []
+            while quadro is not None:
+                codigo = quadro.f_code
+                pilha.append(f"{codigo.co_name} ({os.path.basename(codigo.co_filename)}:{codigo.co_firstlineno})")
+                quadro = quadro.f_back
+            if pilha:
+                self.pilhas[";".join(reversed(pilha))] += 1
+
+    def iniciar(self):
+        self._thread.start()
+
+    def parar(self):
+        self._parar.set()
+        self._thread.join()
+        return self.pilhas
+
+
+def _iniciar_perfil():
+    if os.environ.get("INSTRUMENTACAO_PERFIL_MODO", "cprofile") == "amostragem":
+        perfil = _Amostrador(float(os.environ.get("INSTRUMENTACAO_INTERVALO_AMOSTRAGEM", "0.005")))
+        perfil.iniciar()
+        return perfil
+    import cProfile
+
+    perfil = cProfile.Profile()
+    perfil.enable()
+    return perfil
+
+
+def _encerrar_perfil(perfil, flow_run_id, nome_task):
+    if isinstance(perfil, _Amostrador):
+        coletado = perfil.parar()
+    else:
+        import pstats
+
+        perfil.disable()
+        coletado = pstats.Stats(perfil)
+    with _trava:
+        perfis = _medicoes.setdefault(flow_run_id, {"execucoes": [], "perfis": {}})["perfis"]
+        if nome_task not in perfis:
+            perfis[nome_task] = coletado
+        elif isinstance(coletado, Counter):
+            perfis[nome_task].update(coletado)
+        else:
+            perfis[nome_task].add(coletado)
+
+
+class _Medicao:
+    """Medição de uma execução de task; inerte fora de um fluxo ou com a instrumentação desligada"""
+
+    def __init__(self, args, kwargs):
+        self.args, self.kwargs = args, kwargs
+        self.contexto = _contexto_task() if _ativa() else None
+        self.perfil = None
+        if self.contexto is None:
+            return
+        if self.contexto[1] in _tasks_com_perfil():
+            self.perfil = _iniciar_perfil()
+        self.pico_inicial = _pico_rss_bytes()
+        self.cpu_inicial = time.thread_time()
+        self.inicio = time.perf_counter()
+
+    def registrar(self, resultado, erro=None):
+        if self.contexto is None:
+            return
+        segundos = time.perf_counter() - self.inicio
+        cpu_segundos = time.thread_time() - self.cpu_inicial
+        flow_run_id, nome_task = self.contexto
+        if self.perfil is not None:
+            _encerrar_perfil(self.perfil, flow_run_id, nome_task)
+        linhas, bytes_entrada, bytes_saida = _contar(self.args, self.kwargs, resultado)
+        pico = _pico_rss_bytes()
+        execucao = {
+            "task": nome_task,
+            "inicio": time.time() - segundos,
+            "segundos": segundos,
+            "cpu_segundos": cpu_segundos,
+            "pico_rss_bytes": pico,
+            "aumento_pico_rss_bytes": pico - self.pico_inicial,
+            "linhas": linhas,
+            "bytes_entrada": bytes_entrada,
+            "bytes_saida": bytes_saida,
+            "erro": None if erro is None else f"{type(erro).__name__}: {erro}",
+        }
+        with _trava:
+            _medicoes.setdefault(flow_run_id, {"execucoes": [], "perfis": {}})["execucoes"].append(execucao)
+
+
+def instrumentar_task(fn):
+    """Mede cada execução da task (usar abaixo do @task)"""
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def executar_async(*args, **kwargs):
+            medicao = _Medicao(args, kwargs)
+            try:
+                resultado = await fn(*args, **kwargs)
+            except BaseException as erro:
+                medicao.registrar(None, erro)
+                raise
+            medicao.registrar(resultado)
+            return resultado
+        return executar_async
+
+    @functools.wraps(fn)
+    def executar(*args, **kwargs):
+        medicao = _Medicao(args, kwargs)
+        try:
+            resultado = fn(*args, **kwargs)
+        except BaseException as erro:
+            medicao.registrar(None, erro)
+            raise
+        medicao.registrar(resultado)
+        return resultado
+    return executar
+
+
+def resumir_execucoes(execucoes):
+    """Totais por task: execuções, falhas, tempos, linhas, bytes e o maior pico de RSS"""
+    resumo = {}
+    for execucao in execucoes:
+        total = resumo.setdefault(execucao["task"], {
+            "task": execucao["task"], "execucoes": 0, "falhas": 0, "segundos": 0.0, "cpu_segundos": 0.0,
+            "linhas": 0, "bytes_entrada": 0, "bytes_saida": 0, "pico_rss_bytes": 0,
+        })
+        total["execucoes"] += 1
+        total["falhas"] += execucao["erro"] is not None
+        for chave in ("segundos", "cpu_segundos", "linhas", "bytes_entrada", "bytes_saida"):
+            total[chave] += execucao[chave]
+        total["pico_rss_bytes"] = max(total["pico_rss_bytes"], execucao["pico_rss_bytes"])
+    for total in resumo.values():
+        total["linhas_por_segundo"] = total["linhas"] / total["segundos"] if total["segundos"] else 0.0
+    return sorted(resumo.values(), key=lambda total: total["segundos"], reverse=True)
+
+
+def formatar_prometheus(nome_fluxo, resumo, duracao, estado):
+    """Métricas no formato texto do Prometheus (valores da última execução do fluxo)"""
+    fluxo = nome_fluxo.replace("\\", "\\\\").replace('"', '\\"')
+    metricas = [
+        ("fluxo_task_execucoes", "Execuções da task", "execucoes"),
+        ("fluxo_task_falhas", "Execuções da task que terminaram em erro", "falhas"),
+        ("fluxo_task_segundos", "Tempo de parede somado das execuções da task", "segundos"),
+        ("fluxo_task_cpu_segundos", "Tempo de CPU somado das execuções da task", "cpu_segundos"),
+        ("fluxo_task_linhas", "Linhas/mensagens processadas pela task", "linhas"),
+        ("fluxo_task_bytes_entrada", "Bytes recebidos pela task", "bytes_entrada"),
+        ("fluxo_task_bytes_saida", "Bytes retornados pela task", "bytes_saida"),
+        ("fluxo_task_pico_rss_bytes", "Pico de RSS do processo ao fim da task", "pico_rss_bytes"),
+    ]
+    linhas = []
+    for nome, ajuda, chave in metricas:
+        linhas += [f"# HELP {nome} {ajuda}", f"# TYPE {nome} gauge"]
+        linhas += [f'{nome}{{fluxo="{fluxo}",task="{total["task"]}"}} {total[chave]}' for total in resumo]
+    linhas += [
+        "# HELP fluxo_duracao_segundos Duração da última execução do fluxo",
+        "# TYPE fluxo_duracao_segundos gauge",
+        f'fluxo_duracao_segundos{{fluxo="{fluxo}",estado="{estado}"}} {duracao}',
+        "# HELP fluxo_ultima_execucao_timestamp Fim da última execução do fluxo (segundos desde 1970)",
+        "# TYPE fluxo_ultima_execucao_timestamp gauge",
+        f'fluxo_ultima_execucao_timestamp{{fluxo="{fluxo}"}} {time.time()}',
+    ]
+    return "\n".join(linhas) + "\n"
+
+
+def _gravar_atomico(caminho, conteudo):
+    diretorio = os.path.dirname(caminho)
+    os.makedirs(diretorio, exist_ok=True)
+    descritor, temporario = tempfile.mkstemp(dir=diretorio, prefix=".metricas-")
+    with os.fdopen(descritor, "w") as arquivo:
+        arquivo.write(conteudo)
+    os.chmod(temporario, 0o644)  # mkstemp cria com 0600; o coletor costuma rodar com outro usuário
+    os.replace(temporario, caminho)
+
+
+def _texto_perfil(coletado):
+    if isinstance(coletado, Counter):
+        # Amostras em que cada função aparece na pilha (tempo inclusivo aproximado)
+        total = sum(coletado.values())
+        inclusivo = Counter()
+        for pilha, amostras in coletado.items():
+            for funcao in set(pilha.split(";")):
+                inclusivo[funcao] += amostras
+        return "\n".join([f"{'amostras':>8} {'%':>6}  função"] + [
+            f"{amostras:>8} {100 * amostras / total:>5.1f}%  {funcao}"
+            for funcao, amostras in inclusivo.most_common(FUNCOES_NO_PERFIL)
+        ])
+    import io
+
+    saida = io.StringIO()
+    coletado.stream = saida
+    coletado.sort_stats("cumulative").print_stats(FUNCOES_NO_PERFIL)
+    return saida.getvalue()
+
+
+def _publicar_perfis(slug, perfis):
+    from prefect.artifacts import create_markdown_artifact
+
+    for nome_task, coletado in perfis.items():
+        base = os.path.join(_diretorio(), f"{slug}-{_slug(nome_task)}-{time.strftime('%Y%m%d-%H%M%S')}")
+        if isinstance(coletado, Counter):
+            caminho = base + ".folded"
+            _gravar_atomico(caminho, "".join(f"{pilha} {amostras}\n" for pilha, amostras in coletado.items()))
+        else:
+            caminho = base + ".prof"
+            os.makedirs(_diretorio(), exist_ok=True)
+            coletado.dump_stats(caminho)
+        create_markdown_artifact(
+            markdown=f"Perfil da task `{nome_task}` ({caminho})\n\n```\n{_texto_perfil(coletado)}\n```",
+            key=f"perfil-{slug}-{_slug(nome_task)}",
+            description=f"Perfil da task {nome_task}",
+            _sync=True,
+        )
+
+
+def publicar_metricas(flow_run_id, nome_fluxo, duracao, estado):
+    """Grava os arquivos de métricas e os artefatos da execução do fluxo; retorna o resumo por task"""
+    from prefect.artifacts import create_table_artifact
+
+    with _trava:
+        medicoes = _medicoes.pop(flow_run_id, {"execucoes": [], "perfis": {}})
+    slug = _slug(nome_fluxo)
+    resumo = resumir_execucoes(medicoes["execucoes"])
+    _gravar_atomico(os.path.join(_diretorio(), f"{slug}.prom"), formatar_prometheus(nome_fluxo, resumo, duracao, estado))
+    _gravar_atomico(os.path.join(_diretorio(), f"{slug}.json"), json.dumps({
+        "fluxo": nome_fluxo, "flow_run_id": flow_run_id, "estado": estado, "segundos": duracao,
+        "pico_rss_bytes": _pico_rss_bytes(), "tasks": resumo, "execucoes": medicoes["execucoes"],
+    }, indent=1))
+    if resumo:
+        create_table_artifact(
+            table=[{chave: round(valor, 3) if isinstance(valor, float) else valor for chave, valor in total.items()}
+                   for total in resumo],
+            key=f"metricas-{slug}",
+            description=f"Métricas por task de {nome_fluxo} ({estado}, {duracao:.2f}s)",
+            _sync=True,
+        )
+    _publicar_perfis(slug, medicoes["perfis"])
+    return resumo
+
+
+def _encerrar_fluxo(contexto, inicio, estado):
+    if contexto is None:
+        return
+    from prefect import get_run_logger
+
+    logger = get_run_logger()
+    try:
+        resumo = publicar_metricas(contexto[0], contexto[1], time.perf_counter() - inicio, estado)
+    except Exception as erro:  # As métricas nunca devem derrubar o fluxo
+        logger.warning(f"Falha ao publicar as métricas do fluxo: {erro}")
+        return
+    for total in resumo[:5]:
+        logger.info(f"{total['task']}: {total['execucoes']} execução(ões), {total['segundos']:.2f}s "
+                    f"(CPU {total['cpu_segundos']:.2f}s), {total['linhas']:,} linhas, "
+                    f"pico RSS {total['pico_rss_bytes'] / 2**20:.0f} MB")
+
+
+def _contexto_fluxo():
+    from prefect.context import FlowRunContext
+
+    contexto = FlowRunContext.get()
+    if not _ativa() or contexto is None or contexto.flow_run is None:
+        return None
+    return str(contexto.flow_run.id), contexto.flow.name
+
+
+def instrumentar_fluxo(fn):
+    """Publica as métricas das tasks ao fim de cada execução do fluxo (usar abaixo do @flow)"""
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def executar_async(*args, **kwargs):
+            contexto, inicio, estado = _contexto_fluxo(), time.perf_counter(), "falha"
+            try:
+                resultado = await fn(*args, **kwargs)
+                estado = "sucesso"
+                return resultado
+            finally:
+                _encerrar_fluxo(contexto, inicio, estado)
+        return executar_async
+
+    @functools.wraps(fn)
+    def executar(*args, **kwargs):
+        contexto, inicio, estado = _contexto_fluxo(), time.perf_counter(), "falha"
+        try:
+            resultado = fn(*args, **kwargs)
+            estado = "sucesso"
+            return resultado
+        finally:
+            _encerrar_fluxo(contexto, inicio, estado)
+    return executar
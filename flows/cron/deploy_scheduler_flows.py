@@ -1,18 +1,27 @@
 from prefect import flow, task, get_run_logger
-from prefect.schedules import Cron
-from prefect.filesystems import LocalFileSystem
-from prefect.client.schemas.schedules import CronSchedule
+from prefect.task_runners import ThreadPoolTaskRunner
 
 import time
 import random
 import os
+import queue
 
+from comum.instrumentacao import instrumentar_fluxo, instrumentar_task
+
+# Os produtos são independentes: cada um passa pelas três etapas (criação -> estoque -> catálogo)
+# em paralelo com os outros, limitado a CRON_MAX_CONCORRENCIA tasks ao mesmo tempo.
+# A etapa seguinte de um produto só é submetida quando a anterior termina, então nenhuma task
+# ocupa uma thread do pool esperando outra: durante a retentativa de um produto (60s), as
+# threads livres continuam atendendo os demais. A falha de um produto não impede os outros de
+# chegarem ao catálogo; o fluxo falha no fim, listando-os.
+MAX_CONCORRENCIA_CRON = int(os.environ.get("CRON_MAX_CONCORRENCIA", "5"))
 
 
 @task(name="processar_criacao_produto", 
       description="Processa a criação de produtos e notifica sistemas downstream",
       retries=3, 
       retry_delay_seconds=60)
+@instrumentar_task
 def processar_criacao_produto(produto_id):
     """
     Simula o processamento de criação de produto e envio para outras filas
@@ -31,6 +40,7 @@ def processar_criacao_produto(produto_id):
     return produto_id
 
 @task(name="validar_estoque", retries=2)
+@instrumentar_task
 def validar_estoque(produto_id):
     """Valida o estoque de um produto"""
     logger = get_run_logger()
@@ -39,6 +49,7 @@ def validar_estoque(produto_id):
     return {"produto_id": produto_id, "estoque_disponivel": random.randint(5, 100)}
 
 @task(name="atualizar_catalogo")
+@instrumentar_task
 def atualizar_catalogo(estoque_info):
     """Atualiza o catálogo de produtos"""
     logger = get_run_logger()
@@ -47,55 +58,89 @@ def atualizar_catalogo(estoque_info):
     return True
 
 @flow(name="Fluxo de Criação de Produtos", 
-      description="Fluxo que gerencia todo o ciclo de criação de produtos")
-def fluxo_criacao_produtos():
+      description="Fluxo que gerencia todo o ciclo de criação de produtos",
+      task_runner=ThreadPoolTaskRunner(max_workers=MAX_CONCORRENCIA_CRON))
+@instrumentar_fluxo
+def fluxo_criacao_produtos(num_produtos=5):
     # Simula a criação de múltiplos produtos
-    for i in range(1, 6):
-        produto_id = f"PROD-{random.randint(1000, 9999)}"
-        resultado = processar_criacao_produto(produto_id)
-        if resultado:
-            estoque = validar_estoque(resultado)
-            atualizar_catalogo(estoque)
+    produtos = [f"PROD-{random.randint(1000, 9999)}" for _ in range(num_produtos)]
+    etapas = [processar_criacao_produto, validar_estoque, atualizar_catalogo]
+    concluidas = queue.Queue()  # (produto, índice da etapa, futuro) na ordem em que terminam
+
+    def submeter(produto_id, indice, entrada):
+        futuro = etapas[indice].submit(entrada)
+        futuro.add_done_callback(lambda futuro: concluidas.put((produto_id, indice, futuro)))
+
+    for produto_id in produtos:
+        submeter(produto_id, 0, produto_id)
+
+    falhas = []
+    em_andamento = len(produtos)
+    while em_andamento:
+        produto_id, indice, futuro = concluidas.get()
+        futuro.wait()
+        if not futuro.state.is_completed():
+            falhas.append(produto_id)
+        elif indice + 1 < len(etapas):
+            submeter(produto_id, indice + 1, futuro)  # O futuro concluído mantém a dependência entre as tasks
+            continue
+        em_andamento -= 1
+    if falhas:
+        raise RuntimeError(f"{len(falhas)} de {len(produtos)} produtos não chegaram ao catálogo: {', '.join(falhas)}")
+    return len(produtos)
 
 # Fluxo para atualização diária de preços (equivalente a uma tarefa de cron)
+# Os preços são comparados com os gravados e só os alterados são escritos, em lote (ver cron/precos.py)
 @task(name="obter_precos_atualizados")
-def obter_precos_atualizados():
+@instrumentar_task
+def obter_precos_atualizados(num_produtos=10):
+    from cron.precos import gerar_precos_fornecedor
+
     print("Obtendo preços atualizados de fornecedores...")
     time.sleep(3)
-    return [
-        {"produto_id": f"PROD-{i}", "preco": round(random.uniform(10.0, 1000.0), 2)}
-        for i in range(1000, 1010)
-    ]
+    return gerar_precos_fornecedor(num_produtos)
 
 @task(name="atualizar_precos_sistema")
+@instrumentar_task
 def atualizar_precos_sistema(precos):
+    from cron.precos import aplicar_precos, conectar_precos, destino_precos
+
     print(f"Atualizando {len(precos)} preços no sistema...")
-    for preco in precos:
-        print(f"Produto {preco['produto_id']} com novo preço: R$ {preco['preco']}")
-        time.sleep(0.2)
-    return True
+    conexao = conectar_precos(destino_precos())
+    try:
+        resultado = aplicar_precos(conexao, precos)
+    finally:
+        conexao.close()
+    print(f"{resultado['novos'] + resultado['alterados']} preços gravados em {resultado['lotes']} lote(s) "
+          f"({resultado['novos']} novos, {resultado['alterados']} alterados), {resultado['inalterados']} "
+          f"inalterados ignorados; {resultado['linhas_por_segundo']:,.0f} linhas/s")
+    return resultado
 
 @flow(name="Atualização Diária de Preços")
-def fluxo_atualizacao_precos():
-    precos = obter_precos_atualizados()
-    atualizar_precos_sistema(precos)
+@instrumentar_fluxo
+def fluxo_atualizacao_precos(num_produtos=10):
+    precos = obter_precos_atualizados(num_produtos)
+    resultado = atualizar_precos_sistema(precos)
     print("Atualização de preços concluída com sucesso!")
+    return resultado
 
-# Script que cria deployments para os fluxos
-if __name__ == "__main__":
-    local_storage = LocalFileSystem(basepath="/app/flows")
-    local_storage.save(name="app-flows-storage", overwrite=True)
+def registrar_deployments(armazenamento):
+    """Cria os deployments do cenário 1 a partir do código em `armazenamento` (ver deploy_all_flows.py)"""
+    from prefect.client.schemas.objects import ConcurrencyLimitConfig
 
     entrypoint_path = "cron/deploy_scheduler_flows.py"
 
     fluxo_criacao_produtos.from_source(
-        source=local_storage,
+        source=armazenamento,
         entrypoint=f"{entrypoint_path}:fluxo_criacao_produtos"
     ).deploy(
         name="criacao-produtos-scheduled",
         work_pool_name="scheduler-pool",
         work_queue_name="cron", 
         cron="*/1 * * * *",
+        # Uma execução por vez: se a anterior ainda estiver ativa, a nova é cancelada em vez de
+        # empilhar execuções atrasadas
+        concurrency_limit=ConcurrencyLimitConfig(limit=1, collision_strategy="CANCEL_NEW"),
     )
 
     # fluxo_atualizacao_precos.deploy(
@@ -106,3 +151,9 @@ if __name__ == "__main__":
     # )
 
     print("Cenário 1: Deployments de scheduler criados com sucesso!")
+
+# Script que cria deployments para os fluxos (todos os cenários de uma vez: deploy_all_flows.py)
+if __name__ == "__main__":
+    from deploy_all_flows import armazenamento_local
+
+    registrar_deployments(armazenamento_local())
@@ -0,0 +1,138 @@
+import os
+import random
+import sqlite3
+import time
+
+# Atualização em massa dos preços de produtos a partir da tabela dos fornecedores.
+#
+# Em vez de uma escrita por produto, os preços recebidos são comparados com os gravados
+# (lidos em blocos de ids com SELECT ... WHERE produto_id IN (...)) e só os novos ou
+# alterados são escritos, em upserts em lote (executemany) numa única transação.
+# Os preços são comparados em centavos, então diferenças de arredondamento não geram escrita.
+#
+# O sistema de preços é escolhido pela variável CRON_DESTINO_PRECOS:
+#   (não definida)       -> SQLite local em ~/.prefect/precos.db (substituto do sistema)
+#   sqlite:/caminho.db   -> SQLite informado
+#   mysql                -> MySQL, configurado por MYSQL_HOST/PORT/USER/PASSWORD/DATABASE
+
+TABELA_PRECOS = "precos_produtos"
+TAMANHO_LOTE_PADRAO = int(os.environ.get("CRON_LOTE_PRECOS", "1000"))
+CAMINHO_PADRAO = os.path.join(os.path.expanduser("~"), ".prefect", "precos.db")
+
+
+def destino_precos():
+    """Retorna o sistema de preços configurado em CRON_DESTINO_PRECOS"""
+    return os.environ.get("CRON_DESTINO_PRECOS") or f"sqlite:{CAMINHO_PADRAO}"
+
+
+def conectar_precos(destino):
+    """Abre a conexão correspondente ao valor de CRON_DESTINO_PRECOS"""
+    if destino.startswith("sqlite:"):
+        caminho = destino[len("sqlite:"):]
+        os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+        return sqlite3.connect(caminho)
+    if destino == "mysql":
+        import pymysql
+
+        return pymysql.connect(
+            host=os.environ.get("MYSQL_HOST", "mysql"),
+            port=int(os.environ.get("MYSQL_PORT", "3306")),
+            user=os.environ.get("MYSQL_USER", "root"),
+            password=os.environ.get("MYSQL_PASSWORD", ""),
+            database=os.environ.get("MYSQL_DATABASE", "loja"),
+        )
+    raise ValueError(f"Sistema de preços desconhecido: {destino}")
+
+
+def _placeholder(conexao):
+    return "?" if isinstance(conexao, sqlite3.Connection) else "%s"
+
+
+def _comando_upsert(conexao):
+    marcadores = ", ".join([_placeholder(conexao)] * 3)
+    comando = f"INSERT INTO {TABELA_PRECOS} (produto_id, preco, atualizado_em) VALUES ({marcadores}) "
+    if isinstance(conexao, sqlite3.Connection):
+        return comando + ("ON CONFLICT (produto_id) DO UPDATE SET "
+                          "preco = excluded.preco, atualizado_em = excluded.atualizado_em")
+    return comando + "ON DUPLICATE KEY UPDATE preco = VALUES(preco), atualizado_em = VALUES(atualizado_em)"
+
+
+def garantir_tabela(conexao):
+    cursor = conexao.cursor()
+    cursor.execute(f"CREATE TABLE IF NOT EXISTS {TABELA_PRECOS} "
+                   f"(produto_id VARCHAR(64) PRIMARY KEY, preco DECIMAL(12, 2), atualizado_em DOUBLE)")
+    cursor.close()
+
+
+def _centavos(preco):
+    """Preço em centavos inteiros; um preço gravado como NULL fica None e é sempre reescrito"""
+    return None if preco is None else round(float(preco) * 100)
+
+
+def ler_precos_atuais(conexao, produto_ids, tamanho_lote=TAMANHO_LOTE_PADRAO):
+    """Preços gravados (em centavos) dos produtos informados, lidos em blocos de ids"""
+    atuais = {}
+    cursor = conexao.cursor()
+    try:
+        for inicio in range(0, len(produto_ids), tamanho_lote):
+            bloco = produto_ids[inicio:inicio + tamanho_lote]
+            marcadores = ", ".join([_placeholder(conexao)] * len(bloco))
+            cursor.execute(f"SELECT produto_id, preco FROM {TABELA_PRECOS} WHERE produto_id IN ({marcadores})", bloco)
+            atuais.update((produto_id, _centavos(preco)) for produto_id, preco in cursor.fetchall())
+    finally:
+        cursor.close()
+    return atuais
+
+
+def aplicar_precos(conexao, precos, tamanho_lote=TAMANHO_LOTE_PADRAO):
+    """
+    Grava só os preços novos ou alterados, em upserts de `tamanho_lote` linhas numa transação
+    `precos`: lista de {"produto_id", "preco"}; um produto repetido fica com o último preço.
+    Retorna recebidos, novos, alterados, inalterados, lotes, segundos e linhas/s
+    """
+    inicio = time.perf_counter()
+    recebidos = {preco["produto_id"]: round(float(preco["preco"]), 2) for preco in precos}
+    garantir_tabela(conexao)
+    atuais = ler_precos_atuais(conexao, list(recebidos), tamanho_lote)
+
+    agora = time.time()
+    escrever = [(produto_id, preco, agora) for produto_id, preco in recebidos.items()
+                if atuais.get(produto_id) != _centavos(preco)]
+    novos = sum(produto_id not in atuais for produto_id, _, _ in escrever)
+
+    cursor = conexao.cursor()
+    try:
+        comando = _comando_upsert(conexao)
+        for lote in range(0, len(escrever), tamanho_lote):
+            cursor.executemany(comando, escrever[lote:lote + tamanho_lote])
+        conexao.commit()
+    except Exception:
+        conexao.rollback()
+        raise
+    finally:
+        cursor.close()
+
+    segundos = time.perf_counter() - inicio
+    return {
+        "recebidos": len(recebidos),
+        "novos": novos,
+        "alterados": len(escrever) - novos,
+        "inalterados": len(recebidos) - len(escrever),
+        "lotes": -(-len(escrever) // tamanho_lote),
+        "segundos": segundos,
+        "linhas_por_segundo": len(recebidos) / segundos if segundos else 0.0,
+    }
+
+
+def gerar_precos_fornecedor(num_produtos, fracao_alterada=0.1, gerador=random):
+    """
+    Simula a tabela de preços dos fornecedores: o preço de cada produto é estável entre
+    execuções (semeado pelo produto) e só uma fração `fracao_alterada` muda a cada consulta
+    """
+    precos = []
+    for indice in range(num_produtos):
+        preco = random.Random(indice).uniform(10.0, 1000.0)
+        if gerador.random() < fracao_alterada:
+            preco = gerador.uniform(10.0, 1000.0)
+        precos.append({"produto_id": f"PROD-{1000 + indice}", "preco": round(preco, 2)})
+    return precos
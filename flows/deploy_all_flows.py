@@ -0,0 +1,62 @@
+import argparse
+import importlib
+import os
+import time
+
+# Registra os deployments de todos os cenários em um único processo.
+#
+# Cada módulo de fluxos expõe registrar_deployments(armazenamento); aqui o bloco de
+# armazenamento é salvo uma vez e os módulos são importados um a um, no mesmo processo:
+# o Prefect é importado e a conexão com a API é aberta uma única vez para todos os cenários.
+# Os módulos não importam pandas/numpy no topo (ver etl/deploy_bigdata_flows.py), então
+# registrar não paga o custo das dependências usadas só durante as execuções.
+#
+# Uso (a partir do diretório flows/):
+#     python deploy_all_flows.py              # todos os cenários
+#     python deploy_all_flows.py cron worker  # apenas os informados
+
+CENARIOS = {
+    "cron": "cron.deploy_scheduler_flows",
+    "worker": "worker.deploy_worker_flows",
+    "etl": "etl.deploy_bigdata_flows",
+}
+DIRETORIO_FLUXOS = os.environ.get("DIRETORIO_FLUXOS", "/app/flows")
+
+
+def armazenamento_local():
+    """Bloco com o código dos fluxos, usado pelos workers para carregar cada execução"""
+    from prefect.filesystems import LocalFileSystem
+
+    armazenamento = LocalFileSystem(basepath=DIRETORIO_FLUXOS)
+    armazenamento.save(name="app-flows-storage", overwrite=True)
+    return armazenamento
+
+
+def registrar(cenarios):
+    """Registra os deployments dos cenários informados; retorna os segundos gastos em cada um"""
+    armazenamento = armazenamento_local()
+    tempos = {}
+    for cenario in cenarios:
+        inicio = time.perf_counter()
+        importlib.import_module(CENARIOS[cenario]).registrar_deployments(armazenamento)
+        tempos[cenario] = time.perf_counter() - inicio
+    return tempos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Registra os deployments de todos os cenários")
+    parser.add_argument("cenarios", nargs="*", metavar="cenario",
+                        help=f"Cenários a registrar: {', '.join(CENARIOS)} (padrão: todos)")
+    args = parser.parse_args()
+    desconhecidos = sorted(set(args.cenarios) - set(CENARIOS))
+    if desconhecidos:
+        parser.error(f"cenário(s) desconhecido(s): {', '.join(desconhecidos)}")
+
+    inicio = time.perf_counter()
+    tempos = registrar(args.cenarios or list(CENARIOS))
+    print(f"Deployments registrados em {time.perf_counter() - inicio:.1f}s ("
+          + ", ".join(f"{cenario}: {segundos:.1f}s" for cenario, segundos in tempos.items()) + ")")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+
+# Agregação por categoria calculada bloco a bloco.
+# Cada bloco produz somas e contagens parciais (poucas linhas, uma por categoria);
+# as parciais são somadas e a média só é calculada no final, o que dá o mesmo
+# resultado da agregação 'agregacao' aplicada à tabela inteira.
+
+COLUNAS_PARCIAIS = ["preco_soma", "preco_contagem", "estoque_total"]
+TAMANHO_FATIA = 1 << 16
+
+
+def agregar_parcial(df):
+    """
+    Calcula as somas parciais de um bloco, indexadas por categoria
+    Com `categoria` categórica, as somas saem direto dos códigos com np.bincount,
+    numa única passada e sem a ordenação/fatoração do groupby
+    """
+    if "categoria" not in df.columns:
+        return pd.DataFrame(columns=COLUNAS_PARCIAIS)
+
+    categoria = df["categoria"]
+    if isinstance(categoria.dtype, pd.CategoricalDtype) and not df["preco"].hasnans and not df["estoque"].hasnans:
+        codigos = categoria.cat.codes.to_numpy()
+        if (codigos >= 0).all():
+            return _agregar_por_codigos(codigos, categoria.cat.categories,
+                                        df["preco"].to_numpy(), df["estoque"].to_numpy())
+
+    grupos = df.groupby("categoria", observed=True)
+    return pd.DataFrame({
+        "preco_soma": grupos["preco"].sum(),
+        "preco_contagem": grupos["preco"].count(),
+        "estoque_total": grupos["estoque"].sum(),
+    })
+
+
+def _agregar_por_codigos(codigos, categorias, precos, estoques):
+    """
+    Somas por código de categoria com np.bincount, em fatias de TAMANHO_FATIA linhas
+    As fatias limitam as conversões temporárias (códigos para intp, estoque para float)
+    a alguns MB, independentemente do tamanho do bloco
+    """
+    num_categorias = len(categorias)
+    contagem = np.zeros(num_categorias, dtype=np.int64)
+    soma_preco = np.zeros(num_categorias)
+    soma_estoque = np.zeros(num_categorias)
+    for inicio in range(0, len(codigos), TAMANHO_FATIA):
+        fatia = codigos[inicio:inicio + TAMANHO_FATIA].astype(np.intp)
+        contagem += np.bincount(fatia, minlength=num_categorias)
+        soma_preco += np.bincount(fatia, weights=precos[inicio:inicio + TAMANHO_FATIA], minlength=num_categorias)
+        soma_estoque += np.bincount(fatia, weights=estoques[inicio:inicio + TAMANHO_FATIA], minlength=num_categorias)
+
+    presentes = contagem > 0
+    return pd.DataFrame({
+        "preco_soma": soma_preco[presentes],
+        "preco_contagem": contagem[presentes],
+        "estoque_total": soma_estoque[presentes],
+    }, index=pd.CategoricalIndex(categorias[presentes], name="categoria"))
+
+
+def combinar_parciais(acumulado, parcial):
+    """Soma duas parciais; categorias ausentes em uma delas contam como zero"""
+    if acumulado is None:
+        return parcial
+    return acumulado.add(parcial, fill_value=0)
+
+
+def finalizar_agregacao(acumulado):
+    """Converte as parciais no mesmo formato da transformação 'agregacao'"""
+    if acumulado is None or acumulado.empty:
+        return pd.DataFrame(columns=["categoria", "preco_medio", "estoque_total"])
+    resultado = pd.DataFrame({
+        "preco_medio": acumulado["preco_soma"] / acumulado["preco_contagem"],
+        "estoque_total": acumulado["estoque_total"].round().astype("int64"),
+    })
+    resultado.index.name = "categoria"
+    return resultado.reset_index()
@@ -0,0 +1,166 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import pandas as pd
+
+# Cache persistente dos resultados de extração e transformação do ETL.
+#
+# Cada entrada é um diretório com um arquivo Parquet por DataFrame e um meta.json
+# (criação, tamanho e df.attrs). A chave combina tabela, limite, transformação e uma
+# impressão digital barata da fonte (contagem de linhas + maior id/timestamp), então
+# uma fonte alterada gera uma chave nova e a entrada antiga expira sozinha. A chave das
+# transformações inclui também um hash do código das etapas (ver versao_etapas em
+# etl/transformacoes.py), então uma etapa alterada não reaproveita resultados antigos.
+#
+# Limites configuráveis por variáveis de ambiente:
+#   ETL_CACHE=0                  desativa o cache
+#   ETL_DIRETORIO_CACHE          diretório das entradas
+#   ETL_CACHE_MAX_MB             tamanho máximo total (remove as menos usadas recentemente)
+#   ETL_CACHE_TTL_SEGUNDOS       idade máxima de uma entrada
+
+DIRETORIO_CACHE_PADRAO = os.path.join(os.path.expanduser("~"), ".prefect", "etl_cache")
+
+METRICAS_CACHE = {"acertos": 0, "faltas": 0, "gravacoes": 0, "remocoes": 0}
+_trava_metricas = threading.Lock()  # As tasks do ETL usam o cache em threads paralelas
+
+
+def _contar(metrica):
+    with _trava_metricas:
+        METRICAS_CACHE[metrica] += 1
+
+
+def cache_ativo():
+    if os.environ.get("ETL_CACHE", "1") == "0":
+        return False
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _diretorio_cache():
+    return os.environ.get("ETL_DIRETORIO_CACHE", DIRETORIO_CACHE_PADRAO)
+
+
+def _tamanho_maximo():
+    return float(os.environ.get("ETL_CACHE_MAX_MB", "2048")) * 1024 ** 2
+
+
+def _ttl():
+    return float(os.environ.get("ETL_CACHE_TTL_SEGUNDOS", str(7 * 24 * 3600)))
+
+
+def chave_cache(**partes):
+    """Gera a chave da entrada a partir de valores serializáveis em JSON"""
+    conteudo = json.dumps(partes, sort_keys=True, default=str)
+    return hashlib.sha256(conteudo.encode("utf-8")).hexdigest()[:32]
+
+
+def metricas_cache():
+    """Contadores do processo atual, com a taxa de acerto"""
+    with _trava_metricas:
+        metricas = dict(METRICAS_CACHE)
+    consultas = metricas["acertos"] + metricas["faltas"]
+    return dict(metricas, taxa_acerto=metricas["acertos"] / consultas if consultas else 0.0)
+
+
+def buscar_cache(chave, descricao):
+    """ler_cache com o registro de acerto/falta e dos contadores acumulados no log"""
+    quadros = ler_cache(chave)
+    metricas = metricas_cache()
+    situacao = "acerto" if quadros is not None else "falta"
+    print(f"Cache de resultados ({descricao}): {situacao} - {metricas['acertos']} acertos, "
+          f"{metricas['faltas']} faltas, taxa de acerto {metricas['taxa_acerto']:.0%}")
+    return quadros
+
+
+def _remover_entrada(caminho):
+    shutil.rmtree(caminho, ignore_errors=True)
+    _contar("remocoes")
+
+
+def ler_cache(chave):
+    """Retorna o dict de DataFrames guardado na chave, ou None (falta ou entrada expirada)"""
+    caminho = os.path.join(_diretorio_cache(), chave)
+    try:
+        with open(os.path.join(caminho, "meta.json")) as arquivo:
+            meta = json.load(arquivo)
+    except (FileNotFoundError, json.JSONDecodeError):
+        _contar("faltas")
+        return None
+
+    if time.time() - meta["criado_em"] > _ttl():
+        _remover_entrada(caminho)
+        _contar("faltas")
+        return None
+
+    quadros = {}
+    for nome, attrs in meta["quadros"].items():
+        df = pd.read_parquet(os.path.join(caminho, f"{nome}.parquet"))
+        df.attrs = attrs
+        quadros[nome] = df
+    os.utime(os.path.join(caminho, "meta.json"))  # Marca o último uso, para a remoção por tamanho
+    _contar("acertos")
+    return quadros
+
+
+def gravar_cache(chave, quadros):
+    """Grava os DataFrames (dict nome -> DataFrame; valores None são ignorados) e aplica os limites"""
+    diretorio = _diretorio_cache()
+    os.makedirs(diretorio, exist_ok=True)
+    temporario = tempfile.mkdtemp(dir=diretorio, prefix=".gravando-")
+    meta = {"criado_em": time.time(), "bytes": 0, "quadros": {}}
+    try:
+        for nome, df in quadros.items():
+            if df is None:
+                continue
+            arquivo = os.path.join(temporario, f"{nome}.parquet")
+            df.to_parquet(arquivo)
+            meta["bytes"] += os.path.getsize(arquivo)
+            meta["quadros"][nome] = json.loads(json.dumps(df.attrs, default=str))
+        with open(os.path.join(temporario, "meta.json"), "w") as arquivo:
+            json.dump(meta, arquivo)
+
+        destino = os.path.join(diretorio, chave)
+        shutil.rmtree(destino, ignore_errors=True)
+        os.replace(temporario, destino)
+    except Exception:
+        shutil.rmtree(temporario, ignore_errors=True)
+        raise
+    _contar("gravacoes")
+    aplicar_limites()
+
+
+def aplicar_limites():
+    """Remove entradas expiradas e, se o total passar do limite, as usadas há mais tempo"""
+    diretorio = _diretorio_cache()
+    agora = time.time()
+    entradas = []
+    for nome in os.listdir(diretorio):
+        caminho = os.path.join(diretorio, nome)
+        meta_caminho = os.path.join(caminho, "meta.json")
+        if nome.startswith(".") or not os.path.exists(meta_caminho):
+            continue
+        try:
+            with open(meta_caminho) as arquivo:
+                meta = json.load(arquivo)
+        except (FileNotFoundError, json.JSONDecodeError):
+            continue
+        if agora - meta["criado_em"] > _ttl():
+            _remover_entrada(caminho)
+            continue
+        entradas.append((os.path.getmtime(meta_caminho), meta["bytes"], caminho))
+
+    total = sum(tamanho for _, tamanho, _ in entradas)
+    limite = _tamanho_maximo()
+    for _, tamanho, caminho in sorted(entradas):
+        if total <= limite:
+            break
+        _remover_entrada(caminho)
+        total -= tamanho
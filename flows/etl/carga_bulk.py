@@ -0,0 +1,338 @@
+import gzip
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+import uuid
+
+import pandas as pd
+
+from etl.validacao_checksum import checksum_destino, dialeto
+
+# Carga em massa no estilo COPY do Redshift.
+#
+# Em vez de um INSERT por linha, o DataFrame é gravado em arquivos de staging
+# comprimidos (Parquet ou CSV gzip) de tamanho alvo configurável e cada tabela
+# recebe um único comando de carga:
+#   - Redshift: COPY ... FROM 's3://...' (staging no S3/LocalStack)
+#   - PostgreSQL (substituto local): COPY ... FROM STDIN para cada arquivo, numa transação
+#   - SQLite (substituto local): leitura dos arquivos e um executemany, numa transação
+#
+# O destino é escolhido pela variável ETL_DESTINO_REDSHIFT:
+#   (não definida)                 -> carga simulada
+#   sqlite:/caminho.db             -> SQLite local
+#   postgresql://usuario@host/db   -> PostgreSQL/Redshift via psycopg2
+#   redshift://usuario@host/db     -> Redshift via psycopg2 (exige staging no S3)
+# e o staging por ETL_STAGING (diretório local ou s3://bucket/prefixo). Com staging local,
+# o PostgreSQL recebe os arquivos por COPY FROM STDIN, que só aceita CSV gzip.
+# Os arquivos de staging (locais ou no S3) são removidos ao fim de cada carga, com ou sem sucesso.
+
+STAGING_PADRAO = os.path.join(tempfile.gettempdir(), "etl_staging")
+TAMANHO_ALVO_MB_PADRAO = 64
+
+_TIPOS_SQL = {"i": "BIGINT", "u": "BIGINT", "f": "DOUBLE PRECISION", "b": "BOOLEAN", "M": "TIMESTAMP"}
+
+
+def destino_configurado():
+    """Retorna o destino configurado em ETL_DESTINO_REDSHIFT, ou None para a carga simulada"""
+    return os.environ.get("ETL_DESTINO_REDSHIFT") or None
+
+
+def staging_configurado():
+    return os.environ.get("ETL_STAGING", STAGING_PADRAO)
+
+
+def conectar_destino(destino):
+    """Abre a conexão correspondente ao valor de ETL_DESTINO_REDSHIFT"""
+    if destino.startswith("sqlite:"):
+        return sqlite3.connect(destino[len("sqlite:"):])
+    if destino.startswith(("postgresql://", "postgres://", "redshift://")):
+        import psycopg2
+
+        return psycopg2.connect(destino.replace("redshift://", "postgresql://", 1))
+    raise ValueError(f"Destino de carga desconhecido: {destino}")
+
+
+def formato_padrao():
+    """Parquet quando pyarrow estiver disponível; CSV gzip caso contrário"""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return "csv"
+    return "parquet"
+
+
+def _escrever_arquivo(df, caminho, formato):
+    if formato == "parquet":
+        df.to_parquet(caminho, index=False, compression="snappy")
+    else:
+        df.to_csv(caminho, index=False, compression="gzip")
+
+
+def escrever_staging(df, diretorio, prefixo, formato="csv", tamanho_alvo_mb=TAMANHO_ALVO_MB_PADRAO):
+    """
+    Grava o DataFrame em arquivos comprimidos de aproximadamente `tamanho_alvo_mb` cada
+
+    O número de linhas por arquivo começa estimado pela memória do DataFrame e é
+    reajustado pelo tamanho real (já comprimido) de cada arquivo gravado.
+    Retorna a lista de caminhos gravados.
+    """
+    os.makedirs(diretorio, exist_ok=True)
+    extensao = "parquet" if formato == "parquet" else "csv.gz"
+    tamanho_alvo = tamanho_alvo_mb * 1024 ** 2
+    bytes_por_linha = max(df.memory_usage(deep=True).sum() / max(len(df), 1), 1)
+    linhas_por_arquivo = max(int(tamanho_alvo / bytes_por_linha), 1)
+
+    arquivos = []
+    inicio = 0
+    while inicio < len(df) or not arquivos:
+        parte = df.iloc[inicio:inicio + linhas_por_arquivo]
+        caminho = os.path.join(diretorio, f"{prefixo}-{len(arquivos):05d}.{extensao}")
+        _escrever_arquivo(parte, caminho, formato)
+        arquivos.append(caminho)
+        inicio += len(parte)
+        if len(parte):
+            linhas_por_arquivo = max(int(tamanho_alvo / max(os.path.getsize(caminho) / len(parte), 1)), 1)
+    return arquivos
+
+
+def enviar_para_s3(arquivos, url_s3):
+    """Envia os arquivos de staging para s3://bucket/prefixo (LocalStack via AWS_ENDPOINT_URL)"""
+    import boto3
+
+    bucket, _, prefixo = url_s3[len("s3://"):].partition("/")
+    cliente = boto3.client("s3", endpoint_url=os.environ.get("AWS_ENDPOINT_URL"))
+    chaves = []
+    for caminho in arquivos:
+        chave = f"{prefixo.rstrip('/')}/{os.path.basename(caminho)}".lstrip("/")
+        cliente.upload_file(caminho, bucket, chave)
+        chaves.append(f"s3://{bucket}/{chave}")
+    return chaves
+
+
+def remover_do_s3(url_s3):
+    """Apaga os objetos de staging sob s3://bucket/prefixo depois do COPY"""
+    import boto3
+
+    bucket, _, prefixo = url_s3[len("s3://"):].partition("/")
+    cliente = boto3.client("s3", endpoint_url=os.environ.get("AWS_ENDPOINT_URL"))
+    for pagina in cliente.get_paginator("list_objects_v2").paginate(Bucket=bucket, Prefix=prefixo):
+        objetos = [{"Key": objeto["Key"]} for objeto in pagina.get("Contents", [])]
+        if objetos:  # Até 1.000 por página, o limite do DeleteObjects
+            cliente.delete_objects(Bucket=bucket, Delete={"Objects": objetos, "Quiet": True})
+
+
+def _ddl_tabela(tabela, df):
+    colunas = ", ".join(f"{coluna} {_TIPOS_SQL.get(df[coluna].dtype.kind, 'TEXT')}" for coluna in df.columns)
+    return f"CREATE TABLE IF NOT EXISTS {tabela} ({colunas})"
+
+
+def _ler_arquivo(caminho, formato):
+    if formato == "parquet":
+        return pd.read_parquet(caminho)
+    return pd.read_csv(caminho, compression="gzip")
+
+
+def _linhas_para_sqlite(df):
+    """Converte o DataFrame em tuplas com tipos nativos aceitos pelo sqlite3"""
+    df = df.copy()
+    for coluna in df.columns:
+        if df[coluna].dtype.kind == "M":
+            df[coluna] = df[coluna].dt.strftime("%Y-%m-%d %H:%M:%S")
+    valores = df.astype(object).where(df.notna(), None)
+    return list(map(tuple, valores.to_numpy().tolist()))
+
+
+def _copiar_sqlite(conexao, tabela, colunas, arquivos, formato):
+    marcadores = ", ".join("?" for _ in colunas)
+    consulta = f"INSERT INTO {tabela} ({', '.join(colunas)}) VALUES ({marcadores})"
+    for caminho in arquivos:
+        conexao.executemany(consulta, _linhas_para_sqlite(_ler_arquivo(caminho, formato)))
+
+
+def _copiar_postgres(conexao, tabela, colunas, arquivos, formato, origem_s3=None):
+    cursor = conexao.cursor()
+    try:
+        if origem_s3:
+            # Redshift: um único COPY lê todos os arquivos do prefixo em paralelo
+            opcoes = "FORMAT AS PARQUET" if formato == "parquet" else "CSV GZIP IGNOREHEADER 1"
+            cursor.execute(f"COPY {tabela} ({', '.join(colunas)}) FROM '{origem_s3}' "
+                           f"IAM_ROLE '{os.environ['ETL_REDSHIFT_IAM_ROLE']}' {opcoes}")
+            return
+        comando = f"COPY {tabela} ({', '.join(colunas)}) FROM STDIN WITH (FORMAT csv, HEADER true)"
+        for caminho in arquivos:
+            with gzip.open(caminho, "rt") as arquivo:
+                cursor.copy_expert(comando, arquivo)
+    finally:
+        cursor.close()
+
+
+def _validar_combinacao(destino, usa_s3, formato):
+    """
+    Recusa combinações que o COPY não suporta: sem staging no S3, o PostgreSQL só recebe
+    CSV gzip por COPY FROM STDIN, e o Redshift não aceita COPY FROM STDIN
+    """
+    if destino.startswith("redshift://") and not usa_s3:
+        raise ValueError("Carga no Redshift exige staging no S3 (ETL_STAGING=s3://bucket/prefixo)")
+    if destino.startswith(("postgresql://", "postgres://")) and not usa_s3 and formato != "csv":
+        raise ValueError(f"COPY FROM STDIN no PostgreSQL só aceita CSV gzip, não {formato}")
+
+
+def _tabela_existe(cursor, tabela, eh_sqlite):
+    if eh_sqlite:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (tabela,))
+    else:
+        cursor.execute("SELECT 1 FROM information_schema.tables WHERE table_name = %s", (tabela,))
+    return cursor.fetchone() is not None
+
+
+def _esvaziar_tabela(df, tabela, destino):
+    """Substituição por um DataFrame vazio: apaga o conteúdo atual (ou cria a tabela, se houver colunas)"""
+    conexao = conectar_destino(destino)
+    try:
+        cursor = conexao.cursor()
+        if _tabela_existe(cursor, tabela, destino.startswith("sqlite:")):
+            cursor.execute(f"DELETE FROM {tabela}")
+        elif len(df.columns):
+            cursor.execute(_ddl_tabela(tabela, df))
+        cursor.close()
+        conexao.commit()
+    except Exception:
+        conexao.rollback()
+        raise
+    finally:
+        conexao.close()
+
+
+def _remover_tabela_copia(conexao, tabela_copia):
+    """
+    Remove a tabela temporária do upsert após uma falha: no SQLite o CREATE TABLE não entra na
+    transação desfeita pelo rollback (no PostgreSQL, o DROP não encontra nada)
+    """
+    try:
+        cursor = conexao.cursor()
+        cursor.execute(f"DROP TABLE IF EXISTS {tabela_copia}")
+        cursor.close()
+        conexao.commit()
+    except Exception as excecao:
+        print(f"Falha ao remover a tabela temporária {tabela_copia}: {excecao!r}")
+
+
+def carregar_em_massa(df, tabela, destino, staging=None, formato=None, tamanho_alvo_mb=TAMANHO_ALVO_MB_PADRAO,
+                      chave=None, substituir=False, checksum=None):
+    """
+    Carrega o DataFrame na tabela de destino via arquivos de staging e um único COPY
+
+    Com `chave`, as linhas são copiadas para uma tabela temporária e aplicadas como
+    upsert (DELETE das chaves existentes + INSERT) na mesma transação; com `checksum`
+    (ver etl/validacao_checksum.py), o checksum das linhas dessas chaves no destino é calculado
+    antes do commit e retornado em "checksum_destino", já que o restante da tabela não muda.
+    Com `substituir`, o conteúdo atual da tabela é descartado na mesma transação do COPY
+    (também quando o DataFrame está vazio: a tabela fica vazia).
+    Retorna as estatísticas da carga: arquivos, bytes, segundos, registros/s e MB/s.
+    """
+    staging = staging or staging_configurado()
+    eh_sqlite = destino.startswith("sqlite:")
+    usa_s3 = staging.startswith("s3://")
+    if formato is None:
+        formato = formato_padrao() if (eh_sqlite or usa_s3) else "csv"
+    _validar_combinacao(destino, usa_s3, formato)
+
+    if df.empty:
+        if substituir and not chave:
+            _esvaziar_tabela(df, tabela, destino)
+        return {"arquivos": 0, "formato": None, "bytes": 0, "segundos": 0.0,
+                "registros_por_segundo": 0.0, "mb_por_segundo": 0.0}
+
+    inicio = time.perf_counter()
+    lote = uuid.uuid4().hex[:12]
+    diretorio_local = tempfile.mkdtemp(prefix="etl-staging-") if usa_s3 else os.path.join(staging, tabela, lote)
+    arquivos = escrever_staging(df, diretorio_local, tabela, formato, tamanho_alvo_mb)
+    bytes_staging = sum(os.path.getsize(caminho) for caminho in arquivos)
+    origem_s3 = None
+    if usa_s3:
+        enviar_para_s3(arquivos, f"{staging.rstrip('/')}/{tabela}/{lote}/")
+        origem_s3 = f"{staging.rstrip('/')}/{tabela}/{lote}/"
+
+    colunas = list(df.columns)
+    estatisticas_checksum = {}
+    tabela_copia = f"{tabela}_staging_{lote}" if chave else tabela
+    conexao = conectar_destino(destino)
+    try:
+        cursor = conexao.cursor()
+        cursor.execute(_ddl_tabela(tabela, df))
+        if chave:
+            cursor.execute(_ddl_tabela(tabela_copia, df))
+        elif substituir:
+            cursor.execute(f"DELETE FROM {tabela}")
+        cursor.close()
+
+        if eh_sqlite:
+            _copiar_sqlite(conexao, tabela_copia, colunas, arquivos, formato)
+        else:
+            _copiar_postgres(conexao, tabela_copia, colunas, arquivos, formato, origem_s3)
+
+        if chave:
+            cursor = conexao.cursor()
+            cursor.execute(f"DELETE FROM {tabela} WHERE {chave} IN (SELECT {chave} FROM {tabela_copia})")
+            cursor.execute(f"INSERT INTO {tabela} ({', '.join(colunas)}) "
+                           f"SELECT {', '.join(colunas)} FROM {tabela_copia}")
+            if checksum:
+                estatisticas_checksum["checksum_destino"] = checksum_destino(
+                    conexao, tabela, checksum, dialeto(destino),
+                    filtro=f"{chave} IN (SELECT {chave} FROM {tabela_copia})")
+            cursor.execute(f"DROP TABLE {tabela_copia}")
+            cursor.close()
+        conexao.commit()
+    except Exception:
+        conexao.rollback()
+        if chave:
+            _remover_tabela_copia(conexao, tabela_copia)
+        raise
+    finally:
+        conexao.close()
+        shutil.rmtree(diretorio_local, ignore_errors=True)
+        if origem_s3:
+            try:
+                remover_do_s3(origem_s3)
+            except Exception as excecao:  # Não mascara o resultado da carga
+                print(f"Falha ao remover o staging {origem_s3}: {excecao!r}")
+
+    segundos = time.perf_counter() - inicio
+    return {
+        "arquivos": len(arquivos),
+        "formato": formato,
+        "bytes": bytes_staging,
+        "segundos": segundos,
+        "registros_por_segundo": len(df) / segundos if segundos else 0.0,
+        "mb_por_segundo": bytes_staging / 1024 ** 2 / segundos if segundos else 0.0,
+        **estatisticas_checksum,
+    }
+
+
+def recalcular_agregado(destino, tabela_origem, tabela_destino):
+    """
+    Recria o agregado por categoria (mesmo formato da transformação 'agregacao') a partir da
+    tabela já carregada, com INSERT ... SELECT ... GROUP BY no próprio destino
+    O DELETE e o INSERT rodam na mesma transação: leitores veem o agregado antigo até o commit.
+    Retorna o número de categorias gravadas
+    """
+    conexao = conectar_destino(destino)
+    try:
+        cursor = conexao.cursor()
+        cursor.execute(f"CREATE TABLE IF NOT EXISTS {tabela_destino} "
+                       f"(categoria TEXT, preco_medio DOUBLE PRECISION, estoque_total BIGINT)")
+        cursor.execute(f"DELETE FROM {tabela_destino}")
+        cursor.execute(f"INSERT INTO {tabela_destino} (categoria, preco_medio, estoque_total) "
+                       f"SELECT categoria, AVG(preco), CAST(SUM(estoque) AS BIGINT) FROM {tabela_origem} "
+                       f"WHERE categoria IS NOT NULL GROUP BY categoria")
+        registros = cursor.rowcount
+        cursor.close()
+        conexao.commit()
+    except Exception:
+        conexao.rollback()
+        raise
+    finally:
+        conexao.close()
+    return registros
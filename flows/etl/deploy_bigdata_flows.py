@@ -1,100 +1,304 @@
 from prefect import flow, task
-from prefect.deployments import Deployment
-from prefect.server.schemas.schedules import CronSchedule
-import pandas as pd
+from prefect.concurrency.sync import concurrency
+from prefect.task_runners import ThreadPoolTaskRunner
+from contextlib import contextmanager
+import threading
 import time
 import random
 import os
 
+from comum.instrumentacao import instrumentar_fluxo, instrumentar_task
+from etl.estado_incremental import ler_marca_dagua, salvar_marca_dagua
+
+# Os módulos de etl/ que usam pandas/numpy são importados dentro das tasks e funções que os
+# usam: carregar este módulo (registro dos deployments, início de cada execução agendada)
+# custa só a importação do Prefect; pandas é importado quando a primeira task precisa dele.
+
+# Número máximo de tasks/ramos independentes executados ao mesmo tempo em cada fluxo de ETL
+MAX_CONCORRENCIA_ETL = int(os.environ.get("ETL_MAX_CONCORRENCIA", "4"))
+
+# O limite acima vale por fluxo: a migração completa executa os dois ETLs como subfluxos, cada um
+# com o próprio pool, e chegaria a 3x esse número de tasks. Extrações e cargas (as tasks que abrem
+# conexões com o MySQL e o Redshift) ocupam também uma vaga de _vagas_etl, compartilhado por todos
+# os fluxos do processo, então ficam em no máximo MAX_CONCORRENCIA_ETL ao mesmo tempo.
+# Para limitar também execuções em processos/workers diferentes, ETL_LIMITE_GLOBAL indica um limite
+# global de concorrência do Prefect (criado com ETL_MAX_CONCORRENCIA_GLOBAL vagas se ainda não
+# existir; depois pode ser ajustado com `prefect gcl update`). Fica desligado por padrão porque cada
+# vaga custa uma ida ao servidor do Prefect, o que pesa nos blocos pequenos.
+_vagas_etl = threading.BoundedSemaphore(MAX_CONCORRENCIA_ETL)
+LIMITE_GLOBAL_ETL = os.environ.get("ETL_LIMITE_GLOBAL") or None
+MAX_CONCORRENCIA_GLOBAL_ETL = int(os.environ.get("ETL_MAX_CONCORRENCIA_GLOBAL", str(MAX_CONCORRENCIA_ETL)))
+_trava_limite_global = threading.Lock()
+_limite_global_verificado = False
+
+
+def garantir_limite_global():
+    """Cria o limite global de extrações/cargas, se configurado e ainda não existir (uma consulta por processo)"""
+    global _limite_global_verificado
+    if LIMITE_GLOBAL_ETL is None:
+        return
+    from prefect.client.orchestration import get_client
+    from prefect.client.schemas.actions import GlobalConcurrencyLimitCreate
+    from prefect.exceptions import ObjectAlreadyExists, ObjectNotFound
+
+    with _trava_limite_global:
+        if _limite_global_verificado:
+            return
+        with get_client(sync_client=True) as cliente:
+            try:
+                cliente.read_global_concurrency_limit_by_name(LIMITE_GLOBAL_ETL)
+            except ObjectNotFound:
+                try:
+                    cliente.create_global_concurrency_limit(
+                        GlobalConcurrencyLimitCreate(name=LIMITE_GLOBAL_ETL, limit=MAX_CONCORRENCIA_GLOBAL_ETL))
+                except ObjectAlreadyExists:
+                    pass  # Criado ao mesmo tempo por outro processo
+        _limite_global_verificado = True
+
+
+@contextmanager
+def vaga_etl():
+    """Ocupa uma vaga de extração/carga do processo (e do limite global, se configurado) enquanto o bloco executa"""
+    with _vagas_etl:
+        if LIMITE_GLOBAL_ETL is None:
+            yield
+            return
+        garantir_limite_global()
+        with concurrency(LIMITE_GLOBAL_ETL, occupy=1):
+            yield
+
 # Tarefas de ETL/Big Data - semelhantes ao que você já usa no Airflow
 
 @task(name="extrair_dados_mysql", retries=3, log_prints=True)
-def extrair_dados_mysql(tabela, limite=None):
+@instrumentar_task
+@vaga_etl()
+def extrair_dados_mysql(tabela, limite=None, seed=None, apos_id=0, tamanho_fetch=None, impressao=None):
     """
-    Simula a extração de dados de um banco MySQL
-    Em um caso real, usaríamos pymysql ou SQLAlchemy
+    Extrai dados de um banco MySQL
+    Com ETL_FONTE_MYSQL definida, lê a tabela real (ver etl/extracao_mysql.py);
+    caso contrário, simula a extração com dados gerados de forma vetorizada.
+    Informe `seed` para obter sempre o mesmo conjunto de dados simulado
+    `apos_id` retorna apenas registros com id maior que o informado (leitura em blocos)
+    O resultado fica no cache local (ver etl/cache_resultados.py) enquanto a fonte não mudar;
+    `impressao` reaproveita a impressão digital da fonte já lida (ex.: uma vez por extração em blocos)
+    `tamanho_fetch` padrão: ETL_TAMANHO_FETCH (ver etl/extracao_mysql.py)
     """
+    from etl.cache_resultados import buscar_cache, chave_cache, gravar_cache
+    from etl.extracao_mysql import TAMANHO_FETCH_PADRAO, conectar_fonte, extrair_tabela, fonte_configurada
+    from etl.geracao_dados import gerar_dados_sinteticos
+
     print(f"Extraindo dados da tabela {tabela} do MySQL...")
-    time.sleep(5)  # Simula uma consulta longa
-    
-    # Simula dados retornados do banco
-    num_registros = limite or random.randint(1000, 10000)
-    print(f"Extraídos {num_registros} registros da tabela {tabela}")
-    
-    # Gera um DataFrame simulado
-    if tabela == "produtos":
-        df = pd.DataFrame({
-            "produto_id": [f"PROD-{i}" for i in range(1, num_registros + 1)],
-            "nome": [f"Produto {i}" for i in range(1, num_registros + 1)],
-            "categoria": [random.choice(["Roupas", "Eletrônicos", "Alimentos", "Móveis"]) for _ in range(num_registros)],
-            "preco": [round(random.uniform(10.0, 1000.0), 2) for _ in range(num_registros)],
-            "estoque": [random.randint(0, 100) for _ in range(num_registros)]
-        })
-    elif tabela == "pedidos":
-        df = pd.DataFrame({
-            "pedido_id": [f"PED-{i}" for i in range(1, num_registros + 1)],
-            "cliente_id": [f"CLI-{random.randint(1, 1000)}" for _ in range(num_registros)],
-            "data": [f"2023-{random.randint(1, 12)}-{random.randint(1, 28)}" for _ in range(num_registros)],
-            "valor_total": [round(random.uniform(50.0, 5000.0), 2) for _ in range(num_registros)],
-            "status": [random.choice(["Novo", "Processando", "Enviado", "Entregue", "Cancelado"]) for _ in range(num_registros)]
-        })
+
+    fonte = fonte_configurada()
+    origem = _origem_extracao(fonte, tabela, limite, seed, apos_id, impressao)
+    chave = chave_cache(etapa="extracao", **origem) if origem else None
+    if chave:
+        em_cache = buscar_cache(chave, f"extração de {tabela}")
+        if em_cache:
+            return em_cache["dados"]
+
+    if fonte:
+        conexao = conectar_fonte(fonte)
+        try:
+            df = extrair_tabela(conexao, tabela, apos_id=apos_id, limite=limite,
+                                tamanho_fetch=tamanho_fetch or TAMANHO_FETCH_PADRAO)
+        finally:
+            conexao.close()
+        estatisticas = df.attrs["extracao"]
+        print(f"Extraídos {estatisticas['linhas']} registros da tabela {tabela} "
+              f"({estatisticas['linhas_por_segundo']:.0f} registros/s, {estatisticas['bytes'] / 1024 ** 2:.2f} MB lidos)")
     else:
-        df = pd.DataFrame({"dummy": list(range(num_registros))})
-    
+        time.sleep(5)  # Simula uma consulta longa
+
+        # Simula dados retornados do banco
+        num_registros = limite or _sorteador(seed).randint(1000, 10000)
+        print(f"Extraídos {num_registros} registros da tabela {tabela}")
+
+        # Gera um DataFrame simulado
+        df = gerar_dados_sinteticos(tabela, num_registros, seed=seed, id_inicial=apos_id + 1)
+        df.attrs["ultimo_id"] = apos_id + num_registros
+
+    if chave:
+        df.attrs["origem"] = origem
+        gravar_cache(chave, {"dados": df})
     return df
 
-@task(name="transformar_dados", log_prints=True)
-def transformar_dados(df, tipo_transformacao):
+def _sorteador(seed):
+    """Gerador para os sorteios da simulação: reprodutível com seed, o módulo random sem ela"""
+    return random.Random(seed) if seed is not None else random
+
+def _impressao_fonte(fonte, tabela):
+    """Impressão digital da tabela na fonte real, ou None com o cache desativado"""
+    from etl.cache_resultados import cache_ativo
+    from etl.extracao_mysql import conectar_fonte, impressao_digital
+
+    if not cache_ativo():
+        return None
+    conexao = conectar_fonte(fonte)
+    try:
+        return impressao_digital(conexao, tabela)
+    finally:
+        conexao.close()
+
+def _origem_extracao(fonte, tabela, limite, seed, apos_id, impressao=None):
     """
-    Aplica transformações nos dados
+    Identifica o snapshot da fonte lido por uma extração, ou None quando o resultado não pode ir para o cache
+    A impressão digital é lida antes da extração: se a tabela mudar no meio, a próxima execução
+    vê outra impressão e extrai de novo, nunca o contrário
+    """
+    from etl.cache_resultados import cache_ativo
+
+    if not cache_ativo():
+        return None
+    if fonte:
+        impressao = impressao or _impressao_fonte(fonte, tabela)
+    elif seed is not None:
+        impressao = {"simulado": seed}  # Com seed, os dados simulados (e a quantidade sorteada) se repetem
+    else:
+        return None
+    return {"tabela": tabela, "limite": limite, "apos_id": apos_id, "impressao": impressao}
+
+@task(name="extrair_alteracoes_mysql", retries=3, log_prints=True)
+@instrumentar_task
+@vaga_etl()
+def extrair_alteracoes_mysql(tabela, marca=None, limite=None, seed=None):
     """
+    Extrai apenas os registros alterados desde a marca d'água informada
+    Sem marca (primeira execução ou recarga completa), extrai a tabela inteira.
+    A nova marca d'água fica em df.attrs["marca_dagua"]
+    """
+    from etl.extracao_mysql import (
+        COLUNA_CHAVE_PADRAO,
+        COLUNA_MARCA_PADRAO,
+        conectar_fonte,
+        extrair_alteracoes,
+        fonte_configurada,
+    )
+    from etl.geracao_dados import gerar_dados_sinteticos
+
+    print(f"Extraindo alterações da tabela {tabela} desde {marca or 'o início'}...")
+
+    fonte = fonte_configurada()
+    if fonte:
+        conexao = conectar_fonte(fonte)
+        try:
+            df = extrair_alteracoes(conexao, tabela, marca)
+        finally:
+            conexao.close()
+        estatisticas = df.attrs["extracao"]
+        print(f"Extraídos {estatisticas['linhas']} registros alterados da tabela {tabela} "
+              f"({estatisticas['linhas_por_segundo']:.0f} registros/s, {estatisticas['bytes'] / 1024 ** 2:.2f} MB lidos)")
+        return df
+
+    # Simula novos registros a partir do último id conhecido; consulta indexada, bem mais curta que a completa
+    ultimo_id = marca[COLUNA_CHAVE_PADRAO] if marca else 0
+    if marca is None:
+        time.sleep(5)
+        num_registros = limite or random.randint(1000, 10000)
+    else:
+        time.sleep(1)
+        num_registros = limite or random.randint(10, 500)
+    print(f"Extraídos {num_registros} registros alterados da tabela {tabela}")
+
+    df = gerar_dados_sinteticos(tabela, num_registros, seed=seed, id_inicial=ultimo_id + 1)
+    df.attrs["marca_dagua"] = {COLUNA_MARCA_PADRAO: None, COLUNA_CHAVE_PADRAO: ultimo_id + num_registros}
+    return df
+
+def _executar_transformacoes(df, tipo_transformacao, processos=None):
+    from etl.cache_resultados import buscar_cache, cache_ativo, chave_cache, gravar_cache
+    from etl.transformacao_paralela import PROCESSOS_PADRAO, executar_pipeline_paralelo, pode_particionar
+    from etl.transformacoes import executar_pipeline, normalizar_etapas, versao_etapas
+
     print(f"Aplicando transformação '{tipo_transformacao}' em {len(df)} registros...")
-    
-    # Simula uma transformação pesada
+
+    # Dados vindos de uma extração cacheável carregam a origem; o mesmo snapshot com as
+    # mesmas etapas, no mesmo código, reaproveita o resultado anterior
+    origem = df.attrs.get("origem") if cache_ativo() else None
+    chave = None
+    if origem:
+        etapas = normalizar_etapas(tipo_transformacao)
+        chave = chave_cache(etapa="transformacao", origem=origem, etapas=etapas, versao=versao_etapas(etapas))
+    if chave:
+        em_cache = buscar_cache(chave, f"transformação '{tipo_transformacao}'")
+        if em_cache:
+            return {"dados": em_cache["dados"], "agregado": em_cache.get("agregado")}
+
+    # Simula uma transformação pesada (uma única vez, mesmo com várias etapas fundidas)
     time.sleep(8)
-    
-    if tipo_transformacao == "enriquecimento":
-        # Simula adição de novas colunas calculadas
-        print("Adicionando colunas calculadas...")
-        if "preco" in df.columns and "estoque" in df.columns:
-            df["valor_estoque"] = df["preco"] * df["estoque"]
-        
-        if "categoria" in df.columns:
-            # Simula enriquecimento com dados externos
-            df["categoria_id"] = df["categoria"].map({
-                "Roupas": "CAT-001",
-                "Eletrônicos": "CAT-002",
-                "Alimentos": "CAT-003",
-                "Móveis": "CAT-004"
-            })
-    
-    elif tipo_transformacao == "agregacao":
-        # Simula agregação de dados
-        print("Agregando dados...")
-        if "categoria" in df.columns:
-            df = df.groupby("categoria").agg({
-                "preco": "mean",
-                "estoque": "sum"
-            }).reset_index()
-            df = df.rename(columns={"preco": "preco_medio", "estoque": "estoque_total"})
-            print(f"Dados agregados: {len(df)} registros após agregação")
-    
-    elif tipo_transformacao == "limpeza":
-        # Simula limpeza de dados
-        print("Limpando dados...")
-        # Remove registros duplicados (simulado)
-        registros_antes = len(df)
-        df = df.iloc[0:int(len(df) * 0.9)]  # Simula remoção de 10% dos registros
-        print(f"Limpeza: {registros_antes - len(df)} registros removidos")
-    
-    return df
+
+    processos = processos or PROCESSOS_PADRAO
+    if processos > 1 and pode_particionar(tipo_transformacao):
+        print(f"Executando em {processos} processos, com os dados particionados")
+        resultado = executar_pipeline_paralelo(df, tipo_transformacao, processos=processos)
+    else:
+        resultado = executar_pipeline(df, tipo_transformacao)
+
+    if chave:
+        gravar_cache(chave, resultado)
+    return resultado
+
+@task(name="transformar_dados", log_prints=True)
+@instrumentar_task
+def transformar_dados(df, tipo_transformacao, processos=None):
+    """
+    Aplica transformações nos dados
+    `tipo_transformacao` é uma etapa registrada em etl/transformacoes.py ou várias
+    ("enriquecimento+agregacao"), executadas numa única passada.
+    Com `processos` > 1 (ou ETL_PROCESSOS_TRANSFORMACAO), as etapas particionáveis
+    rodam em um pool de processos (ver etl/transformacao_paralela.py).
+    Retorna o agregado quando a última etapa é de agregação; caso contrário, os dados
+    """
+    from etl.transformacoes import TRANSFORMACOES, normalizar_etapas
+
+    resultado = _executar_transformacoes(df, tipo_transformacao, processos)
+    etapas = normalizar_etapas(tipo_transformacao)
+    if etapas and TRANSFORMACOES.get(etapas[-1], {}).get("agregacao"):
+        return resultado["agregado"]
+    return resultado["dados"]
+
+@task(name="transformar_dados_pipeline", log_prints=True)
+@instrumentar_task
+def transformar_dados_pipeline(df, tipo_transformacao, processos=None):
+    """
+    Igual a transformar_dados, mas retorna os dois resultados da passada:
+    {"dados": DataFrame transformado, "agregado": resultado da etapa de agregação}
+    """
+    return _executar_transformacoes(df, tipo_transformacao, processos)
 
 @task(name="carregar_dados_redshift", retries=2, log_prints=True)
-def carregar_dados_redshift(df, tabela_destino):
+@instrumentar_task
+@vaga_etl()
+def carregar_dados_redshift(df, tabela_destino, chave=None, substituir=False):
     """
-    Simula o carregamento de dados no Redshift
+    Carrega os dados no Redshift
+    Com ETL_DESTINO_REDSHIFT definida, grava arquivos de staging comprimidos e faz um único
+    COPY por tabela (ver etl/carga_bulk.py); caso contrário, simula a carga.
+    Com `chave`, faz upsert (MERGE) pelos valores dessa coluna em vez de apenas inserir;
+    com `substituir`, o conteúdo atual da tabela é trocado pelos novos dados.
+    O resultado leva o checksum dos dados carregados, usado por validar_dados_redshift
     """
-    print(f"Carregando {len(df)} registros na tabela {tabela_destino} do Redshift...")
+    from etl.carga_bulk import carregar_em_massa, destino_configurado
+    from etl.validacao_checksum import calcular_checksum
+
+    modo = f"upsert por {chave}" if chave else ("substituicao" if substituir else "insert")
+    print(f"Carregando {len(df)} registros na tabela {tabela_destino} do Redshift ({modo})...")
+    checksum = calcular_checksum(df)
+
+    destino = destino_configurado()
+    if destino:
+        estatisticas = carregar_em_massa(df, tabela_destino, destino, chave=chave, substituir=substituir,
+                                         checksum=checksum)
+        print(f"Carga concluída! {len(df)} registros em {tabela_destino} via COPY de "
+              f"{estatisticas['arquivos']} arquivo(s) {estatisticas['formato']} "
+              f"({estatisticas['registros_por_segundo']:.0f} registros/s, {estatisticas['mb_por_segundo']:.1f} MB/s)")
+        return {
+            "tabela": tabela_destino,
+            "registros_inseridos": len(df),
+            "modo": modo,
+            "timestamp": time.time(),
+            "checksum": checksum,
+            "carga": estatisticas
+        }
     
     # Simula o tempo de carregamento (proporcional ao volume de dados)
     tempo_carga = len(df) * 0.001  # 1ms por registro (simulado)
@@ -104,64 +308,228 @@ def carregar_dados_redshift(df, tabela_destino):
     return {
         "tabela": tabela_destino,
         "registros_inseridos": len(df),
+        "modo": modo,
+        "timestamp": time.time(),
+        "checksum": checksum
+    }
+
+@task(name="recalcular_agregado_redshift", retries=2, log_prints=True)
+@instrumentar_task
+@vaga_etl()
+def recalcular_agregado_redshift(tabela_origem, tabela_destino):
+    """
+    Recria a tabela agregada diretamente no Redshift
+    No modo incremental só as alterações são extraídas, então o agregado é recalculado
+    no destino (INSERT ... SELECT ... GROUP BY), sem trazer a tabela inteira de volta.
+    Sem ETL_DESTINO_REDSHIFT, o recálculo é simulado
+    """
+    from etl.carga_bulk import destino_configurado, recalcular_agregado
+    from etl.geracao_dados import CATEGORIAS
+
+    print(f"Recalculando {tabela_destino} a partir de {tabela_origem} no Redshift...")
+    destino = destino_configurado()
+    if destino:
+        registros = recalcular_agregado(destino, tabela_origem, tabela_destino)
+    else:
+        time.sleep(2)
+        registros = len(CATEGORIAS)
+    return {
+        "tabela": tabela_destino,
+        "registros_inseridos": registros,
+        "modo": "recalculo",
         "timestamp": time.time()
     }
 
 @task(name="validar_dados_redshift", log_prints=True)
+@instrumentar_task
 def validar_dados_redshift(resultado_carga):
     """
-    Simula uma validação dos dados carregados
+    Valida os dados carregados comparando o checksum da carga com o do destino
+    O checksum do destino vem de uma única consulta de agregação (ver etl/validacao_checksum.py),
+    sem reler a tabela linha a linha; no upsert, ele é calculado na própria transação da carga,
+    só sobre as chaves carregadas. Na carga simulada, a consulta também é simulada
     """
-    print(f"Validando dados carregados na tabela {resultado_carga['tabela']}...")
-    time.sleep(3)
-    
-    # Simula validação bem-sucedida na maioria dos casos
-    sucesso = random.random() > 0.1
-    
-    if sucesso:
-        print(f"Validação bem-sucedida! Dados carregados corretamente em {resultado_carga['tabela']}")
+    from etl.carga_bulk import conectar_destino, destino_configurado
+    from etl.validacao_checksum import checksum_destino, comparar_checksums, dialeto
+
+    tabela = resultado_carga["tabela"]
+    print(f"Validando dados carregados na tabela {tabela}...")
+    esperado = resultado_carga.get("checksum")
+    if esperado is None:
+        # Ex.: agregado recalculado no próprio destino, sem DataFrame carregado para comparar
+        print(f"Carga de {tabela} sem checksum; nada a comparar")
         return True
-    else:
-        print(f"FALHA NA VALIDAÇÃO! Encontrados problemas nos dados de {resultado_carga['tabela']}")
-        return False
+
+    destino = destino_configurado()
+    obtido = resultado_carga.get("carga", {}).get("checksum_destino")
+    if obtido is None and destino and not resultado_carga.get("modo", "").startswith("upsert"):
+        conexao = conectar_destino(destino)
+        try:
+            obtido = checksum_destino(conexao, tabela, esperado, dialeto(destino))
+        finally:
+            conexao.close()
+    elif obtido is None:
+        time.sleep(0.2)  # Simula a consulta de agregação (carga simulada ou upsert vazio)
+        obtido = esperado
+
+    divergencias = comparar_checksums(esperado, obtido)
+    if not divergencias:
+        print(f"Validação bem-sucedida! {esperado['linhas']} registros e checksums de "
+              f"{len(esperado['colunas'])} colunas conferem em {tabela}")
+        return True
+    print(f"FALHA NA VALIDAÇÃO! Checksums divergentes em {tabela}: {'; '.join(divergencias)}")
+    return False
+
+def extrair_em_blocos(tabela, limite=None, linhas_por_bloco=100_000, seed=None):
+    """
+    Extrai a tabela em blocos consecutivos de até `linhas_por_bloco` registros
+    Cada bloco é uma execução de extrair_dados_mysql que continua a partir do último id
+    do bloco anterior; apenas um bloco fica em memória por vez. A impressão digital da fonte
+    (chave do cache) é lida uma única vez, no início da extração
+    """
+    from etl.extracao_mysql import fonte_configurada
+
+    fonte = fonte_configurada()
+    impressao = _impressao_fonte(fonte, tabela) if fonte else None
+    restante = limite
+    if restante is None and not fonte:
+        restante = _sorteador(seed).randint(1000, 10000)
+    apos_id = 0
+    while restante is None or restante > 0:
+        tamanho = linhas_por_bloco if restante is None else min(linhas_por_bloco, restante)
+        bloco = extrair_dados_mysql(tabela, tamanho, seed=seed, apos_id=apos_id, impressao=impressao)
+        if bloco.empty:
+            break
+        apos_id = bloco.attrs["ultimo_id"]
+        if restante is not None:
+            restante -= len(bloco)
+        yield bloco
+        if len(bloco) < tamanho:
+            break
+
+def resumir_cargas(tabela_destino, resultados):
+    """Combina os resultados de carga dos blocos em um único resultado por tabela"""
+    from etl.validacao_checksum import combinar_checksums
+
+    return {
+        "tabela": tabela_destino,
+        "registros_inseridos": sum(r["registros_inseridos"] for r in resultados),
+        "timestamp": time.time(),
+        "checksum": combinar_checksums(r.get("checksum") for r in resultados)
+    }
 
 # Fluxo ETL completo (produtos MySQL para Redshift)
 @flow(name="ETL Produtos MySQL para Redshift", 
-      description="Fluxo de ETL para carregar produtos do MySQL para o Redshift com transformações")
-def etl_produtos_mysql_para_redshift(limite=None):
+      description="Fluxo de ETL para carregar produtos do MySQL para o Redshift com transformações",
+      task_runner=ThreadPoolTaskRunner(max_workers=MAX_CONCORRENCIA_ETL))
+@instrumentar_fluxo
+def etl_produtos_mysql_para_redshift(limite=None, linhas_por_bloco=None, incremental=False, recarga_completa=False,
+                                     seed=None):
+    # `seed` torna os dados simulados reprodutíveis e, com isso, aproveitáveis pelo cache de resultados
+    if incremental:
+        return etl_produtos_incremental(limite, recarga_completa)
+    if linhas_por_bloco:
+        return etl_produtos_em_blocos(limite, linhas_por_bloco, seed)
+
     # Extração
-    df_produtos = extrair_dados_mysql("produtos", limite)
-    
-    # Transformação
-    df_enriquecido = transformar_dados(df_produtos, "enriquecimento")
-    df_agregado = transformar_dados(df_enriquecido, "agregacao")
+    df_produtos = extrair_dados_mysql("produtos", limite, seed=seed)
     
-    # Carga
-    resultado_carga = carregar_dados_redshift(df_enriquecido, "produtos_dw")
-    resultado_carga_agg = carregar_dados_redshift(df_agregado, "produtos_agg")
+    # Transformação - enriquecimento e agregação na mesma passada
+    resultado_transformacao = transformar_dados_pipeline(df_produtos, "enriquecimento+agregacao")
+    df_enriquecido = resultado_transformacao["dados"]
+    df_agregado = resultado_transformacao["agregado"]
     
-    # Validação
-    validacao_ok = validar_dados_redshift(resultado_carga)
-    validacao_agg_ok = validar_dados_redshift(resultado_carga_agg)
+    # Carga e validação - as duas tabelas são ramos independentes, submetidos em paralelo
+    resultado_carga = carregar_dados_redshift.submit(df_enriquecido, "produtos_dw", substituir=True)
+    resultado_carga_agg = carregar_dados_redshift.submit(df_agregado, "produtos_agg", substituir=True)
+    validacao_ok = validar_dados_redshift.submit(resultado_carga)
+    validacao_agg_ok = validar_dados_redshift.submit(resultado_carga_agg)
     
     return {
-        "validacao_produtos": validacao_ok,
-        "validacao_agregados": validacao_agg_ok,
+        "validacao_produtos": validacao_ok.result(),
+        "validacao_agregados": validacao_agg_ok.result(),
         "total_registros": len(df_enriquecido),
         "total_agregados": len(df_agregado)
     }
 
+def etl_produtos_em_blocos(limite, linhas_por_bloco, seed=None):
+    """
+    Modo streaming do ETL de produtos: cada bloco é transformado e carregado de forma independente
+    A agregação é acumulada em somas parciais por categoria e carregada uma única vez no final
+    """
+    from etl.agregacao_incremental import combinar_parciais, finalizar_agregacao
+
+    cargas = []
+    parciais = None
+    for bloco in extrair_em_blocos("produtos", limite, linhas_por_bloco, seed):
+        resultado_transformacao = transformar_dados_pipeline(bloco, "enriquecimento+agregacao_parcial")
+        bloco_enriquecido = resultado_transformacao["dados"]
+        parciais = combinar_parciais(parciais, resultado_transformacao["agregado"])
+        # O primeiro bloco substitui a tabela; os demais são acrescentados
+        cargas.append(carregar_dados_redshift(bloco_enriquecido, "produtos_dw", substituir=not cargas))
+
+    df_agregado = finalizar_agregacao(parciais)
+    resultado_carga = resumir_cargas("produtos_dw", cargas)
+    resultado_carga_agg = carregar_dados_redshift(df_agregado, "produtos_agg", substituir=True)
+
+    return {
+        "validacao_produtos": validar_dados_redshift(resultado_carga),
+        "validacao_agregados": validar_dados_redshift(resultado_carga_agg),
+        "total_registros": resultado_carga["registros_inseridos"],
+        "total_agregados": len(df_agregado),
+        "blocos": len(cargas)
+    }
+
+def etl_produtos_incremental(limite, recarga_completa):
+    """
+    Modo incremental do ETL de produtos: extrai só o que mudou desde a última marca d'água
+    e faz upsert em produtos_dw; `recarga_completa` ignora a marca e recarrega a tabela inteira
+    """
+    marca = None if recarga_completa else ler_marca_dagua("produtos")
+    df_alterados = extrair_alteracoes_mysql("produtos", marca, limite)
+    df_enriquecido = transformar_dados(df_alterados, "enriquecimento")
+
+    if marca is None:
+        resultado_carga = carregar_dados_redshift.submit(df_enriquecido, "produtos_dw", substituir=True)
+    else:
+        resultado_carga = carregar_dados_redshift.submit(df_enriquecido, "produtos_dw", chave="produto_id")
+    # O agregado é recalculado a partir de produtos_dw, então espera a carga; a validação de
+    # produtos_dw roda em paralelo com o recálculo
+    resultado_carga_agg = recalcular_agregado_redshift.submit("produtos_dw", "produtos_agg", wait_for=[resultado_carga])
+    validacao_ok = validar_dados_redshift.submit(resultado_carga)
+    validacao_agg_ok = validar_dados_redshift.submit(resultado_carga_agg)
+
+    # A marca só avança depois que as alterações chegaram ao destino
+    resultado_carga.result()
+    salvar_marca_dagua("produtos", df_alterados.attrs["marca_dagua"])
+
+    return {
+        "validacao_produtos": validacao_ok.result(),
+        "validacao_agregados": validacao_agg_ok.result(),
+        "total_registros": len(df_enriquecido),
+        "total_agregados": resultado_carga_agg.result()["registros_inseridos"],
+        "recarga_completa": marca is None
+    }
+
 # Fluxo ETL para pedidos (com transformações diferentes)
-@flow(name="ETL Pedidos MySQL para Redshift")
-def etl_pedidos_mysql_para_redshift(limite=None):
+@flow(name="ETL Pedidos MySQL para Redshift",
+      task_runner=ThreadPoolTaskRunner(max_workers=MAX_CONCORRENCIA_ETL))
+@instrumentar_fluxo
+def etl_pedidos_mysql_para_redshift(limite=None, linhas_por_bloco=None, incremental=False, recarga_completa=False,
+                                    seed=None):
+    if incremental:
+        return etl_pedidos_incremental(limite, recarga_completa)
+    if linhas_por_bloco:
+        return etl_pedidos_em_blocos(limite, linhas_por_bloco, seed)
+
     # Extração
-    df_pedidos = extrair_dados_mysql("pedidos", limite)
+    df_pedidos = extrair_dados_mysql("pedidos", limite, seed=seed)
     
     # Transformação - neste caso apenas limpeza
     df_limpo = transformar_dados(df_pedidos, "limpeza")
     
     # Carga
-    resultado_carga = carregar_dados_redshift(df_limpo, "pedidos_dw")
+    resultado_carga = carregar_dados_redshift(df_limpo, "pedidos_dw", substituir=True)
     
     # Validação
     validacao_ok = validar_dados_redshift(resultado_carga)
@@ -171,15 +539,65 @@ def etl_pedidos_mysql_para_redshift(limite=None):
         "total_registros": len(df_limpo)
     }
 
-# Fluxo para migração completa de dados (executa os dois ETLs em sequência)
+def etl_pedidos_em_blocos(limite, linhas_por_bloco, seed=None):
+    """Modo streaming do ETL de pedidos: limpeza e carga aplicadas bloco a bloco"""
+    cargas = []
+    for bloco in extrair_em_blocos("pedidos", limite, linhas_por_bloco, seed):
+        bloco_limpo = transformar_dados(bloco, "limpeza")
+        cargas.append(carregar_dados_redshift(bloco_limpo, "pedidos_dw", substituir=not cargas))
+
+    resultado_carga = resumir_cargas("pedidos_dw", cargas)
+    return {
+        "validacao_pedidos": validar_dados_redshift(resultado_carga),
+        "total_registros": resultado_carga["registros_inseridos"],
+        "blocos": len(cargas)
+    }
+
+def etl_pedidos_incremental(limite, recarga_completa):
+    """Modo incremental do ETL de pedidos: limpeza e upsert apenas dos pedidos alterados"""
+    marca = None if recarga_completa else ler_marca_dagua("pedidos")
+    df_alterados = extrair_alteracoes_mysql("pedidos", marca, limite)
+    df_limpo = transformar_dados(df_alterados, "limpeza")
+
+    if marca is None:
+        resultado_carga = carregar_dados_redshift(df_limpo, "pedidos_dw", substituir=True)
+    else:
+        resultado_carga = carregar_dados_redshift(df_limpo, "pedidos_dw", chave="pedido_id")
+    salvar_marca_dagua("pedidos", df_alterados.attrs["marca_dagua"])
+
+    return {
+        "validacao_pedidos": validar_dados_redshift(resultado_carga),
+        "total_registros": len(df_limpo),
+        "recarga_completa": marca is None
+    }
+
+ETLS_POR_TABELA = {
+    "produtos": etl_produtos_mysql_para_redshift,
+    "pedidos": etl_pedidos_mysql_para_redshift,
+}
+
+@task(name="executar_etl_tabela")
+@instrumentar_task
+def executar_etl_tabela(tabela, linhas_por_bloco=None, incremental=False, recarga_completa=False, seed=None):
+    """Executa o fluxo de ETL da tabela como subfluxo; como task, pode ser submetido em paralelo"""
+    return ETLS_POR_TABELA[tabela](
+        linhas_por_bloco=linhas_por_bloco, incremental=incremental, recarga_completa=recarga_completa, seed=seed)
+
+# Fluxo para migração completa de dados (executa os dois ETLs em paralelo)
 @flow(name="Migração Completa MySQL para Redshift", 
-      description="Fluxo principal que coordena todos os ETLs do MySQL para o Redshift")
-def migracao_completa_mysql_redshift():
-    # Executa ETL de produtos
-    resultado_produtos = etl_produtos_mysql_para_redshift()
-    
-    # Executa ETL de pedidos
-    resultado_pedidos = etl_pedidos_mysql_para_redshift()
+      description="Fluxo principal que coordena todos os ETLs do MySQL para o Redshift",
+      task_runner=ThreadPoolTaskRunner(max_workers=MAX_CONCORRENCIA_ETL))
+@instrumentar_fluxo
+def migracao_completa_mysql_redshift(linhas_por_bloco=None, incremental=False, recarga_completa=False, seed=None):
+    # Os ETLs de produtos e pedidos não dependem um do outro
+    execucoes = {
+        tabela: executar_etl_tabela.submit(
+            tabela, linhas_por_bloco=linhas_por_bloco, incremental=incremental, recarga_completa=recarga_completa,
+            seed=seed)
+        for tabela in ETLS_POR_TABELA
+    }
+    resultado_produtos = execucoes["produtos"].result()
+    resultado_pedidos = execucoes["pedidos"].result()
     
     # Retorna resumo da migração
     return {
@@ -188,33 +606,33 @@ def migracao_completa_mysql_redshift():
         "sucesso_geral": resultado_produtos["validacao_produtos"] and resultado_pedidos["validacao_pedidos"]
     }
 
-# Script para criar deployments
-if __name__ == "__main__":
-    # ETL de produtos (diário - meia-noite)
-    produtos_deployment = Deployment.build_from_flow(
-        flow=etl_produtos_mysql_para_redshift,
-        name="etl-produtos-diario",
-        work_queue_name="bigdata",
-        schedule=CronSchedule(cron="0 0 * * *"),  # Meia-noite todos os dias
-    )
-    produtos_deployment.apply()
-    
-    # ETL de pedidos (diário - 01:00)
-    pedidos_deployment = Deployment.build_from_flow(
-        flow=etl_pedidos_mysql_para_redshift,
-        name="etl-pedidos-diario",
-        work_queue_name="bigdata",
-        schedule=CronSchedule(cron="0 1 * * *"),  # 01:00 todos os dias
-    )
-    pedidos_deployment.apply()
-    
-    # Migração completa (semanal - domingo 03:00)
-    migracao_deployment = Deployment.build_from_flow(
-        flow=migracao_completa_mysql_redshift,
-        name="migracao-completa-semanal",
-        work_queue_name="bigdata",
-        schedule=CronSchedule(cron="0 3 * * 0"),  # Domingo 03:00
-    )
-    migracao_deployment.apply()
-    
+def registrar_deployments(armazenamento):
+    """Cria os deployments do cenário 3 a partir do código em `armazenamento` (ver deploy_all_flows.py)"""
+    entrypoint_path = "etl/deploy_bigdata_flows.py"
+    # Apenas alterações; use recarga_completa=True para recarregar tudo
+    parametros = {"incremental": True}
+    deployments = [
+        (etl_produtos_mysql_para_redshift, "etl-produtos-diario", "0 0 * * *"),  # Meia-noite todos os dias
+        (etl_pedidos_mysql_para_redshift, "etl-pedidos-diario", "0 1 * * *"),  # 01:00 todos os dias
+        (migracao_completa_mysql_redshift, "migracao-completa-semanal", "0 3 * * 0"),  # Domingo 03:00
+    ]
+    garantir_limite_global()
+    for fluxo, nome, cron in deployments:
+        fluxo.from_source(
+            source=armazenamento,
+            entrypoint=f"{entrypoint_path}:{fluxo.fn.__name__}"
+        ).deploy(
+            name=nome,
+            work_pool_name="bigdata-pool",
+            work_queue_name="bigdata",
+            parameters=parametros,
+            cron=cron,
+        )
+
     print("Cenário 3: Deployments de big data/ETL criados com sucesso!")
+
+# Script para criar deployments (todos os cenários de uma vez: deploy_all_flows.py)
+if __name__ == "__main__":
+    from deploy_all_flows import armazenamento_local
+
+    registrar_deployments(armazenamento_local())
@@ -0,0 +1,71 @@
+import json
+import os
+import re
+import tempfile
+from datetime import datetime
+
+# Armazena a marca d'água (high-water mark) de cada tabela entre execuções.
+# Um arquivo JSON por tabela e por fonte, gravado de forma atômica (arquivo temporário + rename),
+# para que ETLs de tabelas diferentes possam rodar ao mesmo tempo sem conflito.
+#
+# A fonte é a de ETL_FONTE_MYSQL (ou "simulado"): a marca do simulador só tem o id, e não pode
+# ser usada contra o MySQL real (nem a de um banco contra outro). Timestamps são gravados como
+# texto ISO e voltam como datetime na leitura.
+
+DIRETORIO_ESTADO_PADRAO = os.path.join(os.path.expanduser("~"), ".prefect", "etl_estado")
+
+
+def _diretorio_estado():
+    return os.environ.get("ETL_DIRETORIO_ESTADO", DIRETORIO_ESTADO_PADRAO)
+
+
+def _fonte_atual():
+    fonte = os.environ.get("ETL_FONTE_MYSQL") or "simulado"
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", fonte).strip("_")
+
+
+def _caminho_marca(tabela):
+    return os.path.join(_diretorio_estado(), f"{tabela}@{_fonte_atual()}.json")
+
+
+def _codificar(valor):
+    if isinstance(valor, datetime):
+        return {"datetime": valor.isoformat()}
+    raise TypeError(f"Valor de marca d'água não serializável: {valor!r}")
+
+
+def _decodificar(objeto):
+    if objeto.keys() == {"datetime"}:
+        return datetime.fromisoformat(objeto["datetime"])
+    return objeto
+
+
+def ler_marca_dagua(tabela):
+    """Retorna a marca d'água salva para a tabela na fonte atual, ou None se ainda não houve carga"""
+    try:
+        with open(_caminho_marca(tabela)) as arquivo:
+            return json.load(arquivo, object_hook=_decodificar)
+    except FileNotFoundError:
+        return None
+
+
+def salvar_marca_dagua(tabela, marca):
+    """Grava a nova marca d'água da tabela; só deve ser chamada após a carga ter sido concluída"""
+    diretorio = _diretorio_estado()
+    os.makedirs(diretorio, exist_ok=True)
+    descritor, temporario = tempfile.mkstemp(dir=diretorio, prefix=f".{tabela}-", suffix=".json")
+    try:
+        with os.fdopen(descritor, "w") as arquivo:
+            json.dump(marca, arquivo, default=_codificar)
+        os.replace(temporario, _caminho_marca(tabela))
+    except BaseException:
+        os.unlink(temporario)
+        raise
+
+
+def remover_marca_dagua(tabela):
+    """Descarta a marca d'água, forçando uma recarga completa na próxima execução"""
+    try:
+        os.remove(_caminho_marca(tabela))
+    except FileNotFoundError:
+        pass
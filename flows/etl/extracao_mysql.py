@@ -0,0 +1,323 @@
+import os
+import re
+import sqlite3
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from etl.geracao_dados import gerar_dados_sinteticos
+
+# Extração real do MySQL com paginação por chave (keyset) e cursor no servidor.
+#
+# Cada página é uma consulta "WHERE chave > ultimo_id ORDER BY chave LIMIT n",
+# que usa o índice da chave primária e tem custo constante mesmo no fim da tabela
+# (ao contrário de OFFSET). As linhas de cada página são lidas com fetchmany em
+# lotes, sem carregar o resultado inteiro no cliente.
+#
+# A fonte é escolhida pela variável ETL_FONTE_MYSQL:
+#   (não definida)       -> simulador (gerar_dados_sinteticos)
+#   mysql                -> MySQL real, configurado por MYSQL_HOST/PORT/USER/PASSWORD/DATABASE
+#   sqlite:/caminho.db   -> SQLite local, usado como substituto do MySQL em testes
+
+COLUNA_CHAVE_PADRAO = "id"
+COLUNA_MARCA_PADRAO = "atualizado_em"
+LINHAS_POR_PAGINA_PADRAO = 50_000
+TAMANHO_FETCH_PADRAO = int(os.environ.get("ETL_TAMANHO_FETCH", "5000"))
+
+_IDENTIFICADOR_VALIDO = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def fonte_configurada():
+    """Retorna a fonte configurada em ETL_FONTE_MYSQL, ou None para o simulador"""
+    return os.environ.get("ETL_FONTE_MYSQL") or None
+
+
+def conectar_mysql():
+    """Abre uma conexão pymysql com cursor não bufferizado (SSCursor)"""
+    import pymysql
+    import pymysql.cursors
+
+    return pymysql.connect(
+        host=os.environ.get("MYSQL_HOST", "mysql"),
+        port=int(os.environ.get("MYSQL_PORT", "3306")),
+        user=os.environ.get("MYSQL_USER", "root"),
+        password=os.environ.get("MYSQL_PASSWORD", ""),
+        database=os.environ.get("MYSQL_DATABASE", "loja"),
+        cursorclass=pymysql.cursors.SSCursor,
+    )
+
+
+def conectar_sqlite(caminho):
+    """Abre o banco SQLite usado como substituto local do MySQL"""
+    return sqlite3.connect(caminho)
+
+
+def conectar_fonte(fonte):
+    """Abre a conexão correspondente ao valor de ETL_FONTE_MYSQL"""
+    if fonte == "mysql":
+        return conectar_mysql()
+    if fonte.startswith("sqlite:"):
+        return conectar_sqlite(fonte[len("sqlite:"):])
+    raise ValueError(f"Fonte de dados desconhecida: {fonte}")
+
+
+def _placeholder(conexao):
+    return "?" if isinstance(conexao, sqlite3.Connection) else "%s"
+
+
+def _validar_identificador(nome):
+    if not _IDENTIFICADOR_VALIDO.match(nome):
+        raise ValueError(f"Identificador SQL inválido: {nome!r}")
+    return nome
+
+
+def _tamanho_linhas(linhas):
+    """Estimativa dos bytes recebidos: tamanho dos textos/binários e 8 bytes por valor numérico"""
+    total = 0
+    for linha in linhas:
+        for valor in linha:
+            if isinstance(valor, (str, bytes)):
+                total += len(valor)
+            elif valor is not None:
+                total += 8
+    return total
+
+
+def _ler_pagina(conexao, consulta, parametros, tamanho_fetch, estatisticas):
+    """Executa a consulta de uma página e lê o resultado em lotes de `tamanho_fetch` linhas"""
+    cursor = conexao.cursor()
+    try:
+        cursor.execute(consulta, parametros)
+        colunas = [descricao[0] for descricao in cursor.description]
+        linhas = []
+        while True:
+            lote = cursor.fetchmany(tamanho_fetch)
+            if not lote:
+                break
+            estatisticas["bytes"] += _tamanho_linhas(lote)
+            linhas.extend(lote)
+    finally:
+        cursor.close()
+    pagina = pd.DataFrame.from_records(linhas, columns=colunas)
+    estatisticas["linhas"] += len(pagina)
+    return pagina
+
+
+def _valor_nativo(valor):
+    """Converte escalares NumPy/pandas para o tipo Python equivalente, aceito por qualquer driver DB-API"""
+    if isinstance(valor, pd.Timestamp):
+        return valor.to_pydatetime()
+    return valor.item() if hasattr(valor, "item") else valor
+
+
+def _iniciar_estatisticas(estatisticas):
+    estatisticas = estatisticas if estatisticas is not None else {}
+    estatisticas.update({"linhas": 0, "bytes": 0, "segundos": 0.0, "linhas_por_segundo": 0.0})
+    return estatisticas
+
+
+def _finalizar_estatisticas(estatisticas, inicio):
+    estatisticas["segundos"] = time.perf_counter() - inicio
+    if estatisticas["segundos"] > 0:
+        estatisticas["linhas_por_segundo"] = estatisticas["linhas"] / estatisticas["segundos"]
+
+
+def ler_paginas_keyset(conexao, tabela, coluna_chave=COLUNA_CHAVE_PADRAO, apos_id=0, limite=None,
+                       linhas_por_pagina=LINHAS_POR_PAGINA_PADRAO, tamanho_fetch=TAMANHO_FETCH_PADRAO,
+                       estatisticas=None):
+    """
+    Lê a tabela em páginas ordenadas pela chave, começando após `apos_id`
+
+    Gera um DataFrame por página. Se `estatisticas` for um dict, ele é
+    atualizado com linhas, bytes, segundos e linhas_por_segundo.
+    """
+    tabela = _validar_identificador(tabela)
+    coluna_chave = _validar_identificador(coluna_chave)
+    marcador = _placeholder(conexao)
+    consulta = (f"SELECT * FROM {tabela} WHERE {coluna_chave} > {marcador} "
+                f"ORDER BY {coluna_chave} LIMIT {marcador}")
+
+    estatisticas = _iniciar_estatisticas(estatisticas)
+    inicio = time.perf_counter()
+    restante = limite
+
+    while restante is None or restante > 0:
+        tamanho_pagina = linhas_por_pagina if restante is None else min(linhas_por_pagina, restante)
+        pagina = _ler_pagina(conexao, consulta, (apos_id, tamanho_pagina), tamanho_fetch, estatisticas)
+        if pagina.empty:
+            break
+
+        apos_id = _valor_nativo(pagina[coluna_chave].iloc[-1])
+        pagina.attrs["ultimo_id"] = apos_id
+        if restante is not None:
+            restante -= len(pagina)
+
+        yield pagina
+
+        if len(pagina) < tamanho_pagina:
+            break
+
+    _finalizar_estatisticas(estatisticas, inicio)
+
+
+def ler_paginas_alteradas(conexao, tabela, marca=None, coluna_marca=COLUNA_MARCA_PADRAO,
+                          coluna_chave=COLUNA_CHAVE_PADRAO, linhas_por_pagina=LINHAS_POR_PAGINA_PADRAO,
+                          tamanho_fetch=TAMANHO_FETCH_PADRAO, estatisticas=None):
+    """
+    Lê apenas as linhas alteradas depois da marca d'água, em páginas ordenadas por (coluna_marca, chave)
+
+    A marca é um dict {coluna_marca: valor, coluna_chave: id}; a chave desempata linhas com o
+    mesmo timestamp, de modo que nenhuma alteração é perdida ou lida duas vezes entre páginas.
+    Cada página traz a marca atualizada em attrs["marca_dagua"]. Uma marca sem valor na
+    coluna_marca (como a do simulador) não serve de filtro e é tratada como ausente (leitura completa).
+    """
+    tabela = _validar_identificador(tabela)
+    coluna_marca = _validar_identificador(coluna_marca)
+    coluna_chave = _validar_identificador(coluna_chave)
+    m = _placeholder(conexao)
+    ordem = f"ORDER BY {coluna_marca}, {coluna_chave} LIMIT {m}"
+    consulta_inicial = f"SELECT * FROM {tabela} {ordem}"
+    consulta_seguinte = (f"SELECT * FROM {tabela} WHERE {coluna_marca} > {m} "
+                         f"OR ({coluna_marca} = {m} AND {coluna_chave} > {m}) {ordem}")
+
+    estatisticas = _iniciar_estatisticas(estatisticas)
+    inicio = time.perf_counter()
+    if marca is not None and marca.get(coluna_marca) is None:
+        marca = None
+
+    while True:
+        if marca is None:
+            consulta, parametros = consulta_inicial, (linhas_por_pagina,)
+        else:
+            valor, chave = marca[coluna_marca], marca[coluna_chave]
+            consulta, parametros = consulta_seguinte, (valor, valor, chave, linhas_por_pagina)
+        pagina = _ler_pagina(conexao, consulta, parametros, tamanho_fetch, estatisticas)
+        if pagina.empty:
+            break
+
+        ultima = pagina.iloc[-1]
+        marca = {coluna_marca: _valor_nativo(ultima[coluna_marca]),
+                 coluna_chave: _valor_nativo(ultima[coluna_chave])}
+        pagina.attrs["marca_dagua"] = marca
+
+        yield pagina
+
+        if len(pagina) < linhas_por_pagina:
+            break
+
+    _finalizar_estatisticas(estatisticas, inicio)
+
+
+def _juntar_paginas(paginas):
+    """
+    Concatena as páginas de um gerador em um único DataFrame, coluna a coluna
+    Com pd.concat sobre a lista de páginas, as páginas e a cópia concatenada ficam todas na memória
+    ao mesmo tempo; aqui as partes de cada coluna são liberadas assim que a coluna é montada, e o
+    pico fica em torno da tabela mais uma coluna. Retorna (df, última página) ou (None, None)
+    """
+    partes, ultima = {}, None
+    for ultima in paginas:
+        for nome in ultima.columns:
+            partes.setdefault(nome, []).append(ultima[nome])
+    if ultima is None:
+        return None, None
+    colunas = {}
+    for nome in list(partes):
+        colunas[nome] = pd.concat(partes.pop(nome), ignore_index=True)
+    return pd.DataFrame(colunas, copy=False), ultima
+
+
+def extrair_tabela(conexao, tabela, coluna_chave=COLUNA_CHAVE_PADRAO, apos_id=0, limite=None,
+                   tamanho_fetch=TAMANHO_FETCH_PADRAO):
+    """Lê a tabela (ou um bloco dela) e retorna um único DataFrame com as estatísticas em attrs["extracao"]"""
+    estatisticas = {}
+    df, ultima = _juntar_paginas(ler_paginas_keyset(conexao, tabela, coluna_chave, apos_id, limite,
+                                                    tamanho_fetch=tamanho_fetch, estatisticas=estatisticas))
+    if ultima is not None:
+        df.attrs["ultimo_id"] = ultima.attrs["ultimo_id"]
+    else:
+        df = pd.DataFrame()
+        df.attrs["ultimo_id"] = apos_id
+    df.attrs["extracao"] = estatisticas
+    return df
+
+
+def extrair_alteracoes(conexao, tabela, marca=None, tamanho_fetch=TAMANHO_FETCH_PADRAO):
+    """
+    Lê as linhas alteradas desde `marca` (ou a tabela inteira, se None) em um único DataFrame
+    A nova marca d'água fica em attrs["marca_dagua"] (igual à anterior se nada mudou)
+    """
+    estatisticas = {}
+    df, ultima = _juntar_paginas(ler_paginas_alteradas(conexao, tabela, marca, tamanho_fetch=tamanho_fetch,
+                                                       estatisticas=estatisticas))
+    if ultima is not None:
+        df.attrs["marca_dagua"] = ultima.attrs["marca_dagua"]
+    else:
+        df = pd.DataFrame()
+        df.attrs["marca_dagua"] = marca
+    df.attrs["extracao"] = estatisticas
+    return df
+
+
+def impressao_digital(conexao, tabela, coluna_chave=COLUNA_CHAVE_PADRAO, coluna_marca=COLUNA_MARCA_PADRAO):
+    """
+    Resumo barato do estado da tabela: contagem de linhas, maior id e maior timestamp de alteração
+    Usado como parte da chave do cache de resultados; tabelas sem a coluna de marca usam só contagem e id
+    """
+    for nome in (tabela, coluna_chave, coluna_marca):
+        _validar_identificador(nome)
+    cursor = conexao.cursor()
+    try:
+        try:
+            cursor.execute(f"SELECT COUNT(*), MAX({coluna_chave}), MAX({coluna_marca}) FROM {tabela}")
+        except Exception:
+            conexao.rollback()
+            cursor.execute(f"SELECT COUNT(*), MAX({coluna_chave}), NULL FROM {tabela}")
+        contagem, maior_id, maior_marca = cursor.fetchone()
+    finally:
+        cursor.close()
+    return {"linhas": contagem, "maior_id": _valor_nativo(maior_id), "maior_marca": str(maior_marca)}
+
+
+def _agora():
+    return datetime.now().isoformat(sep=" ", timespec="microseconds")
+
+
+def criar_base_sqlite(caminho, tabelas=("produtos", "pedidos"), num_registros=10_000, seed=42):
+    """
+    Cria (ou recria) um banco SQLite com dados sintéticos no formato das tabelas do MySQL
+    Cada tabela ganha uma chave inteira `id` e a coluna `atualizado_em`, ambas indexadas
+    """
+    conexao = conectar_sqlite(caminho)
+    try:
+        for tabela in tabelas:
+            df = gerar_dados_sinteticos(tabela, num_registros, seed=seed)
+            if "data" in df.columns:
+                df["data"] = df["data"].dt.strftime("%Y-%m-%d")
+            df[COLUNA_MARCA_PADRAO] = _agora()
+            df.index = pd.RangeIndex(1, num_registros + 1, name=COLUNA_CHAVE_PADRAO)
+            df.to_sql(tabela, conexao, if_exists="replace", index=True)
+            conexao.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS idx_{tabela}_id ON {tabela} ({COLUNA_CHAVE_PADRAO})")
+            conexao.execute(f"CREATE INDEX IF NOT EXISTS idx_{tabela}_marca "
+                            f"ON {tabela} ({COLUNA_MARCA_PADRAO}, {COLUNA_CHAVE_PADRAO})")
+        conexao.commit()
+    finally:
+        conexao.close()
+
+
+def simular_alteracoes_sqlite(caminho, tabela, num_alteracoes, seed=None):
+    """Marca `num_alteracoes` linhas aleatórias da base SQLite como alteradas agora"""
+    conexao = conectar_sqlite(caminho)
+    try:
+        tabela = _validar_identificador(tabela)
+        total = conexao.execute(f"SELECT MAX({COLUNA_CHAVE_PADRAO}) FROM {tabela}").fetchone()[0] or 0
+        ids = np.random.default_rng(seed).choice(np.arange(1, total + 1), size=min(num_alteracoes, total), replace=False)
+        conexao.executemany(
+            f"UPDATE {tabela} SET {COLUNA_MARCA_PADRAO} = ? WHERE {COLUNA_CHAVE_PADRAO} = ?",
+            [(_agora(), int(i)) for i in ids],
+        )
+        conexao.commit()
+    finally:
+        conexao.close()
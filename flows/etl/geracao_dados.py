@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+# Geração vetorizada de dados sintéticos para os fluxos de ETL.
+# Cada coluna é construída de uma vez com NumPy, em vez de uma chamada
+# a random.choice/random.uniform por linha.
+
+CATEGORIAS = ["Roupas", "Eletrônicos", "Alimentos", "Móveis"]
+STATUS_PEDIDO = ["Novo", "Processando", "Enviado", "Entregue", "Cancelado"]
+NUM_CLIENTES = 1000
+DATA_INICIAL = np.datetime64("2023-01-01")
+DIAS_NO_PERIODO = 365
+
+
+def _ids_com_prefixo(prefixo, ids):
+    """Monta identificadores textuais ("PROD-1", "PED-2", ...) para um vetor de inteiros"""
+    return prefixo + pd.Series(ids).astype(str)
+
+
+def _categorica(rng, categorias, num_registros):
+    """Sorteia valores de uma lista fixa e devolve uma coluna categórica"""
+    codigos = rng.integers(0, len(categorias), num_registros, dtype=np.int8)
+    return pd.Categorical.from_codes(codigos, categories=categorias)
+
+
+def gerar_dados_sinteticos(tabela, num_registros, seed=None, id_inicial=1):
+    """
+    Gera um DataFrame simulado para a tabela informada
+
+    Usa um gerador NumPy semeado (mesma seed -> mesmos dados), colunas
+    categóricas para `categoria`/`status`/`cliente_id` e datetime64 para `data`.
+    `id_inicial` permite gerar blocos consecutivos da mesma tabela; cada bloco
+    usa uma sequência própria derivada de (seed, id_inicial).
+    """
+    rng = np.random.default_rng(seed if seed is None or id_inicial == 1 else [seed, id_inicial])
+    ids = np.arange(id_inicial, id_inicial + num_registros, dtype=np.int64)
+
+    if tabela == "produtos":
+        return pd.DataFrame({
+            "produto_id": _ids_com_prefixo("PROD-", ids),
+            "nome": _ids_com_prefixo("Produto ", ids),
+            "categoria": _categorica(rng, CATEGORIAS, num_registros),
+            "preco": np.round(rng.uniform(10.0, 1000.0, num_registros), 2),
+            "estoque": rng.integers(0, 101, num_registros, dtype=np.int64),
+        })
+
+    if tabela == "pedidos":
+        clientes = [f"CLI-{i}" for i in range(1, NUM_CLIENTES + 1)]
+        codigos_cliente = rng.integers(0, NUM_CLIENTES, num_registros, dtype=np.int16)
+        dias = rng.integers(0, DIAS_NO_PERIODO, num_registros).astype("timedelta64[D]")
+        return pd.DataFrame({
+            "pedido_id": _ids_com_prefixo("PED-", ids),
+            "cliente_id": pd.Categorical.from_codes(codigos_cliente, categories=clientes),
+            "data": pd.to_datetime(DATA_INICIAL + dias),
+            "valor_total": np.round(rng.uniform(50.0, 5000.0, num_registros), 2),
+            "status": _categorica(rng, STATUS_PEDIDO, num_registros),
+        })
+
+    return pd.DataFrame({"dummy": ids - id_inicial})
@@ -0,0 +1,196 @@
+import atexit
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from etl.agregacao_incremental import combinar_parciais, finalizar_agregacao
+from etl.transformacoes import TRANSFORMACOES, executar_pipeline, normalizar_etapas
+
+# Execução das transformações em um pool de processos, com o DataFrame particionado por chave.
+#
+# Cada partição é serializada uma única vez no formato Arrow IPC direto em um bloco de
+# memória compartilhada; o processo filho lê o bloco, aplica as etapas e devolve o
+# resultado da mesma forma. Pelo pool trafegam apenas nomes e tamanhos
+# de blocos, nunca DataFrames serializados com pickle.
+#
+# A agregação é feita por partição com 'agregacao_parcial' e combinada no processo
+# principal, o que dá o mesmo resultado da execução em um único processo.
+
+PROCESSOS_PADRAO = int(os.environ.get("ETL_PROCESSOS_TRANSFORMACAO", "1"))
+
+# Etapas cujo resultado não depende de como as linhas são divididas
+ETAPAS_PARTICIONAVEIS = {"enriquecimento", "projecao_precos", "agregacao", "agregacao_parcial"}
+
+
+def atribuir_particoes(df, num_particoes, chave=None):
+    """
+    Retorna o número da partição de cada linha
+
+    Com `chave`, usa os códigos da coluna (se categórica) ou o hash dos valores.
+    Sem chave, pedidos são particionados por `cliente_id` e as demais tabelas em
+    faixas contíguas de linhas, que não exigem hash nem reordenação.
+    """
+    if chave is None and "cliente_id" in df.columns:
+        chave = "cliente_id"
+    if chave is None:
+        return (np.arange(len(df), dtype=np.int64) * num_particoes) // max(len(df), 1)
+    coluna = df[chave]
+    if isinstance(coluna.dtype, pd.CategoricalDtype):
+        return coluna.cat.codes.to_numpy().astype(np.int64) % num_particoes
+    return (pd.util.hash_pandas_object(coluna, index=False).to_numpy() % num_particoes).astype(np.int64)
+
+
+_pools = {}
+
+
+def _obter_pool(processos):
+    """
+    Reaproveita um pool por número de processos: iniciar processos com spawn custa
+    a importação do pandas/pyarrow em cada filho, o que pesaria em cada bloco do modo streaming
+    """
+    if processos not in _pools:
+        _pools[processos] = ProcessPoolExecutor(max_workers=processos, mp_context=multiprocessing.get_context("spawn"))
+    return _pools[processos]
+
+
+@atexit.register
+def _encerrar_pools():
+    for pool in _pools.values():
+        pool.shutdown(cancel_futures=True)
+    _pools.clear()
+
+
+def _escrever_arrow_compartilhado(df):
+    """Serializa o DataFrame em Arrow IPC dentro de um novo bloco de memória compartilhada"""
+    import pyarrow as pa
+
+    tabela = pa.Table.from_pandas(df, preserve_index=False)
+    medidor = pa.MockOutputStream()
+    with pa.ipc.new_stream(medidor, tabela.schema) as escritor:
+        escritor.write_table(tabela)
+    tamanho = medidor.size()
+
+    bloco = shared_memory.SharedMemory(create=True, size=max(tamanho, 1))
+    try:
+        with pa.ipc.new_stream(pa.FixedSizeBufferWriter(pa.py_buffer(bloco.buf)), tabela.schema) as escritor:
+            escritor.write_table(tabela)
+    except BaseException:
+        bloco.close()
+        bloco.unlink()
+        raise
+    return bloco, tamanho
+
+
+def _liberar_bloco(nome):
+    """Fecha e remove um bloco de saída publicado por um processo filho"""
+    bloco = shared_memory.SharedMemory(name=nome)
+    bloco.close()
+    bloco.unlink()
+
+
+def _ler_arrow_compartilhado(nome, tamanho):
+    """
+    Lê o DataFrame de um bloco de memória compartilhada
+    Os bytes são copiados antes de fechar o bloco, já que o pandas pode manter
+    referências diretas aos buffers Arrow lidos
+    """
+    import pyarrow as pa
+
+    bloco = shared_memory.SharedMemory(name=nome)
+    try:
+        conteudo = bytes(bloco.buf[:tamanho])
+    finally:
+        bloco.close()
+    return pa.ipc.open_stream(pa.py_buffer(conteudo)).read_all().to_pandas()
+
+
+def _transformar_particao(nome, tamanho, etapas):
+    """Executado no processo filho: lê a partição, aplica as etapas e publica o resultado"""
+    df = _ler_arrow_compartilhado(nome, tamanho)
+    resultado = executar_pipeline(df, etapas)
+    bloco, tamanho_saida = _escrever_arrow_compartilhado(resultado["dados"])
+    bloco.close()
+    return bloco.name, tamanho_saida, resultado["agregado"]
+
+
+def pode_particionar(tipo_transformacao):
+    """Indica se todas as etapas podem ser executadas por partição"""
+    return all(etapa in ETAPAS_PARTICIONAVEIS for etapa in normalizar_etapas(tipo_transformacao))
+
+
+def executar_pipeline_paralelo(df, tipo_transformacao, processos=None, chave=None):
+    """
+    Versão de executar_pipeline em um pool de processos, com o mesmo retorno
+    {"dados": ..., "agregado": ...}; as linhas voltam na ordem original
+    """
+    processos = processos or PROCESSOS_PADRAO
+    etapas = normalizar_etapas(tipo_transformacao)
+    nao_particionaveis = [etapa for etapa in etapas if etapa not in ETAPAS_PARTICIONAVEIS]
+    if nao_particionaveis:
+        raise ValueError(f"Etapas não podem ser executadas por partição: {nao_particionaveis}")
+    if processos <= 1 or len(df) < processos:
+        return executar_pipeline(df, etapas)
+
+    # Cada processo devolve somas parciais; o agregado final é montado aqui. O agregado é o da
+    # última etapa de agregação, como em executar_pipeline
+    agregacoes = [etapa for etapa in etapas if TRANSFORMACOES[etapa]["agregacao"]]
+    finaliza_agregacao = bool(agregacoes) and agregacoes[-1] == "agregacao"
+    etapas_particao = ["agregacao_parcial" if etapa == "agregacao" else etapa for etapa in etapas]
+    tem_agregacao = any(TRANSFORMACOES[etapa]["agregacao"] for etapa in etapas_particao)
+
+    particoes = atribuir_particoes(df, processos, chave)
+    ordem = np.argsort(particoes, kind="stable")
+    limites = np.searchsorted(particoes[ordem], np.arange(processos + 1))
+
+    pool = _obter_pool(processos)
+    blocos_entrada, futuros, liberados = [], [], set()
+    try:
+        for indice in range(processos):
+            posicoes = ordem[limites[indice]:limites[indice + 1]]
+            if len(posicoes) == 0:
+                continue
+            bloco, tamanho = _escrever_arrow_compartilhado(df.iloc[posicoes])
+            blocos_entrada.append(bloco)
+            futuros.append((posicoes, pool.submit(_transformar_particao, bloco.name, tamanho, etapas_particao)))
+
+        partes, posicoes_partes, parciais = [], [], None
+        for posicoes, futuro in futuros:
+            nome, tamanho, agregado = futuro.result()
+            try:
+                partes.append(_ler_arrow_compartilhado(nome, tamanho))
+            finally:
+                _liberar_bloco(nome)
+                liberados.add(futuro)
+            posicoes_partes.append(posicoes)
+            if tem_agregacao:
+                parciais = combinar_parciais(parciais, agregado)
+    finally:
+        # Após uma falha, as partições restantes ainda são aguardadas para liberar os blocos de saída
+        for _, futuro in futuros:
+            if futuro in liberados:
+                continue
+            try:
+                nome = futuro.result()[0]
+            except Exception:
+                continue
+            _liberar_bloco(nome)
+        for bloco in blocos_entrada:
+            bloco.close()
+            bloco.unlink()
+
+    # Reordena para a ordem original das linhas (desnecessário com faixas contíguas)
+    dados = pd.concat(partes, ignore_index=True)
+    posicao_original = np.concatenate(posicoes_partes)
+    if (np.diff(posicao_original) < 0).any():
+        dados = dados.take(np.argsort(posicao_original, kind="stable")).reset_index(drop=True)
+
+    agregado = None
+    if finaliza_agregacao and "categoria" not in df.columns:
+        agregado = dados  # Como em agregar(): sem categoria, o agregado é o próprio DataFrame
+    elif tem_agregacao:
+        agregado = finalizar_agregacao(parciais) if finaliza_agregacao else parciais
+    return {"dados": dados, "agregado": agregado}
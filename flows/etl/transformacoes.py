@@ -0,0 +1,148 @@
+import functools
+import hashlib
+import inspect
+import sys
+
+import numpy as np
+
+from etl.agregacao_incremental import agregar_parcial, finalizar_agregacao
+
+# Registro de transformações do ETL.
+#
+# Cada etapa é registrada pelo nome usado em transformar_dados ("enriquecimento",
+# "agregacao", "limpeza", ...). Uma lista de etapas é executada em uma única passada
+# sobre o mesmo DataFrame: etapas de coluna escrevem no próprio DataFrame, etapas de
+# filtro reduzem as linhas com um recorte (sem cópia com copy-on-write, padrão no
+# pandas 3) e etapas de agregação produzem o agregado a partir dos mesmos dados,
+# sem devolver um novo DataFrame para as etapas seguintes. Nomes não registrados são
+# ignorados com um aviso e os dados seguem sem alteração, como no transformar_dados original.
+
+TRANSFORMACOES = {}
+
+MAPA_CATEGORIAS = {
+    "Roupas": "CAT-001",
+    "Eletrônicos": "CAT-002",
+    "Alimentos": "CAT-003",
+    "Móveis": "CAT-004"
+}
+
+
+def registrar_transformacao(nome, agregacao=False):
+    """Registra uma etapa; etapas de agregação retornam o agregado em vez do DataFrame"""
+    def decorador(funcao):
+        TRANSFORMACOES[nome] = {"funcao": funcao, "agregacao": agregacao}
+        return funcao
+    return decorador
+
+
+@registrar_transformacao("enriquecimento")
+def enriquecer(df):
+    """Adiciona valor_estoque e categoria_id diretamente no DataFrame"""
+    print("Adicionando colunas calculadas...")
+    if "preco" in df.columns and "estoque" in df.columns:
+        df["valor_estoque"] = df["preco"] * df["estoque"]
+
+    if "categoria" in df.columns:
+        # Em colunas categóricas o map é aplicado só às categorias e os códigos são reaproveitados
+        df["categoria_id"] = df["categoria"].map(MAPA_CATEGORIAS)
+    return df
+
+
+@registrar_transformacao("limpeza")
+def limpar(df):
+    """Simula a remoção de 10% dos registros (duplicados) com um recorte das primeiras linhas"""
+    print("Limpando dados...")
+    registros_antes = len(df)
+    df = df.iloc[0:int(len(df) * 0.9)]
+    print(f"Limpeza: {registros_antes - len(df)} registros removidos")
+    return df
+
+
+@registrar_transformacao("projecao_precos")
+def projetar_precos(df, meses=36):
+    """
+    Simula uma transformação pesada de CPU: projeta o preço mês a mês, com reajuste
+    maior para itens de estoque baixo. Cada linha depende só dela mesma, então o
+    resultado não muda quando os dados são particionados
+    """
+    print("Projetando preços...")
+    if "preco" not in df.columns or "estoque" not in df.columns:
+        return df
+    preco = df["preco"].to_numpy(dtype=np.float64, copy=True)
+    reajuste = 0.004 + 0.006 / (1.0 + df["estoque"].to_numpy(dtype=np.float64))
+    for mes in range(meses):
+        preco *= 1.0 + reajuste
+        preco -= np.sqrt(preco) * 0.001 * np.sin(mes)
+    df["preco_projetado"] = np.round(preco, 2)
+    return df
+
+
+@registrar_transformacao("agregacao_parcial", agregacao=True)
+def agregar_em_partes(df):
+    """Somas parciais por categoria, para combinar entre blocos (ver agregacao_incremental.py)"""
+    return agregar_parcial(df)
+
+
+@registrar_transformacao("agregacao", agregacao=True)
+def agregar(df):
+    """Preço médio e estoque total por categoria"""
+    print("Agregando dados...")
+    if "categoria" not in df.columns:
+        return df
+    df_agregado = finalizar_agregacao(agregar_parcial(df))
+    print(f"Dados agregados: {len(df_agregado)} registros após agregação")
+    return df_agregado
+
+
+def normalizar_etapas(tipo_transformacao):
+    """Aceita um nome, uma lista de nomes ou nomes separados por '+' ("enriquecimento+agregacao")"""
+    if isinstance(tipo_transformacao, str):
+        return [etapa.strip() for etapa in tipo_transformacao.split("+") if etapa.strip()]
+    return list(tipo_transformacao)
+
+
+def versao_etapas(etapas):
+    """
+    Hash do código das etapas: o módulo de cada uma e os módulos etl.* das funções que ela chama
+    Entra na chave do cache de resultados, para que uma etapa alterada não reaproveite resultados antigos
+    """
+    modulos = set()
+    for nome in etapas:
+        if nome not in TRANSFORMACOES:
+            continue
+        funcao = TRANSFORMACOES[nome]["funcao"]
+        modulos.add(funcao.__module__)
+        for referencia in funcao.__code__.co_names:
+            modulo = getattr(funcao.__globals__.get(referencia), "__module__", None)
+            if modulo and modulo.startswith("etl."):
+                modulos.add(modulo)
+    return _hash_modulos(tuple(sorted(modulos)))
+
+
+@functools.lru_cache(maxsize=None)
+def _hash_modulos(modulos):
+    resumo = hashlib.sha256()
+    for modulo in modulos:
+        resumo.update(inspect.getsource(sys.modules[modulo]).encode("utf-8"))
+    return resumo.hexdigest()[:16]
+
+
+def executar_pipeline(df, tipo_transformacao):
+    """
+    Executa as etapas em sequência sobre o mesmo DataFrame
+
+    Retorna {"dados": DataFrame após as etapas de coluna/filtro,
+             "agregado": resultado da última etapa de agregação (ou None)}
+    """
+    agregado = None
+    for nome in normalizar_etapas(tipo_transformacao):
+        if nome not in TRANSFORMACOES:
+            print(f"Aviso: transformação desconhecida '{nome}', dados mantidos sem alteração")
+            continue
+        etapa = TRANSFORMACOES[nome]
+        if etapa["agregacao"]:
+            agregado = etapa["funcao"](df)
+        else:
+            df = etapa["funcao"](df)
+    return {"dados": df, "agregado": agregado}
+
@@ -0,0 +1,166 @@
+import hashlib
+import math
+
+import numpy as np
+import pandas as pd
+
+# Validação da carga por checksums que não dependem da ordem das linhas.
+#
+# Enquanto o DataFrame é carregado, calcula-se o checksum da carga: o número de linhas e, para
+# cada coluna, o número de valores não nulos e uma soma:
+#   - inteiro/real: a soma dos valores;
+#   - booleano: quantos são verdadeiros;
+#   - data: a soma dos segundos desde 1970 (truncados);
+#   - texto: a soma de um hash de 32 bits de cada valor (os 8 primeiros dígitos do md5).
+# Todas as parcelas são somas: o checksum não depende da ordem das linhas e o de uma tabela
+# carregada em vários blocos é a soma dos checksums dos blocos.
+# A validação calcula as mesmas somas no destino com uma única consulta de agregação
+# (SELECT COUNT(*), COUNT(col), SUM(...) ...), então custa uma ida ao banco, qualquer que
+# seja o número de linhas.
+
+# As somas de reais são exatas no pandas (math.fsum) e no PostgreSQL (NUMERIC). No SQLite e no
+# Redshift a soma é em DOUBLE, e no Redshift as fatias somam em paralelo, em ordem variável: o erro
+# relativo dessa soma cresce com o número de parcelas (até ~n x épsilon da máquina para valores
+# de mesmo sinal). A tolerância é TOLERANCIA_REAL ou esse limite, o que for maior: com 10 milhões
+# de linhas, ~2 x 10^-9 da soma.
+TOLERANCIA_REAL = 1e-12
+EPSILON_REAL = float(np.finfo(np.float64).eps)
+
+
+def dialeto(destino):
+    """Dialeto SQL do destino configurado em ETL_DESTINO_REDSHIFT"""
+    if destino.startswith("sqlite:"):
+        return "sqlite"
+    return "redshift" if destino.startswith("redshift://") else "postgres"
+
+
+def hash32(valor):
+    """Hash de 32 bits de um texto, igual ao calculado no destino a partir do md5"""
+    return int.from_bytes(hashlib.md5(str(valor).encode()).digest()[:4], "big")
+
+
+def _hash32_sqlite(valor):
+    return None if valor is None else hash32(valor)
+
+
+def _tipo_coluna(serie):
+    tipo = serie.dtype.kind
+    if tipo in "iu":
+        return "inteiro"
+    if tipo == "f":
+        return "real"
+    if tipo == "b":
+        return "booleano"
+    if tipo == "M":
+        return "data"
+    return "texto"
+
+
+def _soma_coluna(serie, tipo):
+    serie = serie.dropna()
+    if tipo == "inteiro":
+        return int(serie.sum())
+    if tipo == "real":
+        return math.fsum(serie.to_numpy())
+    if tipo == "booleano":
+        return int(serie.astype(bool).sum())
+    if tipo == "data":
+        return int(serie.to_numpy().astype("datetime64[s]").astype(np.int64).sum())
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        # Hash só das categorias, multiplicado pelas ocorrências
+        return sum(hash32(valor) * int(ocorrencias) for valor, ocorrencias in serie.value_counts(sort=False).items())
+    return sum(map(hash32, serie.to_numpy()))
+
+
+def calcular_checksum(df):
+    """Checksum da carga: {"linhas": n, "colunas": {coluna: {"tipo", "nao_nulos", "soma"}}}"""
+    colunas = {}
+    for coluna in df.columns:
+        tipo = _tipo_coluna(df[coluna])
+        colunas[coluna] = {"tipo": tipo, "nao_nulos": int(df[coluna].count()), "soma": _soma_coluna(df[coluna], tipo)}
+    return {"linhas": len(df), "colunas": colunas}
+
+
+def combinar_checksums(checksums):
+    """Checksum da tabela carregada em vários blocos (soma parcela a parcela)"""
+    checksums = [checksum for checksum in checksums if checksum is not None]
+    if not checksums:
+        return None
+    colunas = {coluna: dict(valores) for coluna, valores in checksums[0]["colunas"].items()}
+    for checksum in checksums[1:]:
+        for coluna, valores in checksum["colunas"].items():
+            colunas[coluna]["nao_nulos"] += valores["nao_nulos"]
+            colunas[coluna]["soma"] += valores["soma"]
+    return {"linhas": sum(checksum["linhas"] for checksum in checksums), "colunas": colunas}
+
+
+def _expressao_soma(coluna, tipo, dialeto_destino):
+    if tipo == "real" and dialeto_destino == "postgres":
+        return f"SUM({coluna}::NUMERIC)"
+    if tipo in ("inteiro", "real"):
+        return f"SUM({coluna})"
+    if tipo == "booleano":
+        return f"SUM(CASE WHEN {coluna} THEN 1 ELSE 0 END)"
+    if tipo == "data":
+        if dialeto_destino == "sqlite":
+            return f"SUM(CAST(strftime('%s', {coluna}) AS INTEGER))"
+        return f"SUM(FLOOR(EXTRACT(EPOCH FROM {coluna})))"
+    if dialeto_destino == "sqlite":
+        return f"SUM(hash32({coluna}))"  # Função registrada na conexão
+    if dialeto_destino == "redshift":
+        return f"SUM(STRTOL(LEFT(MD5({coluna}), 8), 16))"
+    return f"SUM(('x' || SUBSTR(MD5({coluna}::TEXT), 1, 8))::BIT(32)::BIGINT)"
+
+
+def consulta_checksum(tabela, esperado, dialeto_destino, filtro=None):
+    """SELECT com todas as parcelas do checksum das colunas de `esperado`"""
+    expressoes = ["COUNT(*)"]
+    for coluna, valores in esperado["colunas"].items():
+        expressoes += [f"COUNT({coluna})", _expressao_soma(coluna, valores["tipo"], dialeto_destino)]
+    return f"SELECT {', '.join(expressoes)} FROM {tabela}" + (f" WHERE {filtro}" if filtro else "")
+
+
+def checksum_destino(conexao, tabela, esperado, dialeto_destino, filtro=None):
+    """Calcula no destino, com uma única consulta, o checksum das colunas de `esperado`"""
+    if dialeto_destino == "sqlite":
+        conexao.create_function("hash32", 1, _hash32_sqlite, deterministic=True)
+    cursor = conexao.cursor()
+    try:
+        cursor.execute(consulta_checksum(tabela, esperado, dialeto_destino, filtro))
+        linha = cursor.fetchone()
+    finally:
+        cursor.close()
+
+    colunas = {}
+    for indice, (coluna, valores) in enumerate(esperado["colunas"].items()):
+        soma = linha[2 + 2 * indice] or 0  # SUM de nenhuma linha é NULL
+        if valores["tipo"] == "real":
+            soma = float(soma)
+        elif soma == int(soma):
+            soma = int(soma)  # Decimal/float inteiros (PostgreSQL); um valor fracionário fica e diverge
+        colunas[coluna] = {"tipo": valores["tipo"], "nao_nulos": int(linha[1 + 2 * indice]), "soma": soma}
+    return {"linhas": int(linha[0]), "colunas": colunas}
+
+
+def tolerancia_soma(nao_nulos, tolerancia=TOLERANCIA_REAL):
+    """Tolerância relativa da soma de `nao_nulos` reais feita em DOUBLE no destino"""
+    return max(tolerancia, nao_nulos * EPSILON_REAL)
+
+
+def comparar_checksums(esperado, obtido, tolerancia=TOLERANCIA_REAL):
+    """Lista das divergências entre o checksum da carga e o do destino (vazia quando conferem)"""
+    divergencias = []
+    if esperado["linhas"] != obtido["linhas"]:
+        divergencias.append(f"linhas: esperado {esperado['linhas']}, destino {obtido['linhas']}")
+    for coluna, valores in esperado["colunas"].items():
+        destino = obtido["colunas"][coluna]
+        if valores["nao_nulos"] != destino["nao_nulos"]:
+            divergencias.append(f"{coluna}: {valores['nao_nulos']} valores não nulos, destino {destino['nao_nulos']}")
+        if valores["tipo"] == "real":
+            tolerancia_coluna = tolerancia_soma(valores["nao_nulos"], tolerancia)
+            confere = math.isclose(valores["soma"], destino["soma"], rel_tol=tolerancia_coluna, abs_tol=tolerancia)
+        else:
+            confere = valores["soma"] == destino["soma"]
+        if not confere:
+            divergencias.append(f"{coluna}: soma {valores['soma']}, destino {destino['soma']}")
+    return divergencias
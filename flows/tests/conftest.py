@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Os testes importam os módulos como nos fluxos (etl.x, worker.x), a partir do diretório flows/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,47 @@
+import argparse
+
+import pytest
+
+from benchmarks.bench_autoescala import simular
+from worker.autoescala import ControladorAutoescala
+
+
+def test_aumenta_na_hora_e_reduz_depois_de_amostras_seguidas():
+    controlador = ControladorAutoescala(latencia_alvo=30, min_consumidores=1, max_consumidores=10,
+                                        vazao_por_consumidor=10, amostras_reducao=3)
+    controlador.observar(0, 0, 0)
+    assert controlador.observar(15, 3000, 150)["consumidores"] == 10  # Acúmulo: sobe de uma vez, até o máximo
+
+    consumidores = [controlador.observar(15 * amostra, 0, 0)["consumidores"] for amostra in range(2, 6)]
+    assert consumidores[:2] == [10, 10]  # Uma ou duas amostras ociosas ainda não reduzem
+    assert consumidores[2] < 10
+
+
+def test_lote_limitado_pela_latencia_alvo():
+    controlador = ControladorAutoescala(latencia_alvo=10, max_consumidores=2, vazao_por_consumidor=5, max_lote=100)
+    decisao = controlador.observar(0, 10_000, 0)
+    assert decisao["consumidores"] == 2
+    assert decisao["tamanho_lote"] == 5  # vazão de 5 msgs/s x 10% de 10 s
+
+    assert controlador.observar(15, 0, 0)["tamanho_lote"] == 1
+
+
+def _argumentos(**valores):
+    padrao = dict(latencia_alvo=30.0, intervalo=15, vazao_consumidor=20.0, custo_lote_ms=200.0, atraso_partida=10,
+                  max_consumidores=10, lote_fixo=25)
+    return argparse.Namespace(**dict(padrao, **valores))
+
+
+@pytest.mark.parametrize("curva", ["degrau", "rampa", "senoide"])
+def test_curvas_sinteticas_dentro_da_latencia_alvo(curva):
+    """Filas em memória com a chegada da curva; o controlador só vê a profundidade e as processadas"""
+    args = _argumentos()
+    controlador = ControladorAutoescala(latencia_alvo=args.latencia_alvo, max_consumidores=args.max_consumidores,
+                                        vazao_por_consumidor=args.vazao_consumidor)
+    autoescala = simular(curva, 1800, args, controlador=controlador)
+    fixo = simular(curva, 1800, args, fixos=5)
+
+    assert autoescala["dentro_do_alvo"] >= 0.95
+    assert autoescala["latencia_p99"] < fixo["latencia_p99"]
+    assert autoescala["restantes"] < 0.01 * autoescala["mensagens"]
+
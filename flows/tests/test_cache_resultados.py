@@ -0,0 +1,53 @@
+import threading
+
+import pandas as pd
+import pytest
+
+from etl.cache_resultados import METRICAS_CACHE, chave_cache, gravar_cache, ler_cache, metricas_cache
+from etl.transformacoes import TRANSFORMACOES, versao_etapas
+
+
+@pytest.fixture(autouse=True)
+def diretorio_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("ETL_DIRETORIO_CACHE", str(tmp_path))
+    return tmp_path
+
+
+def test_grava_e_le_com_attrs():
+    df = pd.DataFrame({"id": [1, 2], "preco": [1.5, 2.5]})
+    df.attrs["origem"] = "produtos"
+    gravar_cache("chave", {"dados": df, "agregado": None})
+
+    quadros = ler_cache("chave")
+    assert list(quadros) == ["dados"]
+    pd.testing.assert_frame_equal(quadros["dados"], df)
+    assert quadros["dados"].attrs == {"origem": "produtos"}
+
+
+def test_versao_inclui_os_modulos_usados_pela_etapa():
+    # agregar usa etl.agregacao_incremental; enriquecer e limpar só o próprio módulo
+    assert versao_etapas(["enriquecimento"]) == versao_etapas(["limpeza"])
+    assert versao_etapas(["agregacao"]) != versao_etapas(["enriquecimento"])
+    assert versao_etapas(["enriquecimento", "agregacao"]) == versao_etapas(["agregacao"])
+
+
+def test_versao_muda_com_o_codigo_da_etapa(monkeypatch):
+    # Mesmo nome de etapa, outra função (de outro módulo): outra versão
+    versao = versao_etapas(["enriquecimento"])
+    monkeypatch.setitem(TRANSFORMACOES, "enriquecimento", {"funcao": chave_cache, "agregacao": False})
+    assert versao_etapas(["enriquecimento"]) != versao
+
+
+def test_contadores_com_threads_paralelas():
+    antes = metricas_cache()["faltas"]
+
+    def consultar():
+        for _ in range(500):
+            ler_cache("inexistente")
+
+    threads = [threading.Thread(target=consultar) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert METRICAS_CACHE["faltas"] - antes == 8 * 500
@@ -0,0 +1,84 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from etl.carga_bulk import carregar_em_massa
+from etl.validacao_checksum import calcular_checksum, comparar_checksums
+
+
+@pytest.fixture
+def destino(tmp_path):
+    return f"sqlite:{tmp_path / 'destino.db'}"
+
+
+@pytest.fixture
+def staging(tmp_path):
+    return str(tmp_path / "staging")
+
+
+def _ler(destino, consulta):
+    conexao = sqlite3.connect(destino[len("sqlite:"):])
+    try:
+        return conexao.execute(consulta).fetchall()
+    finally:
+        conexao.close()
+
+
+def _produtos(ids, preco):
+    return pd.DataFrame({"produto_id": ids, "preco": [preco] * len(ids)})
+
+
+def test_insert_e_substituicao(destino, staging):
+    carregar_em_massa(_produtos([1, 2], 10.0), "produtos", destino, staging=staging, formato="csv")
+    carregar_em_massa(_produtos([3], 10.0), "produtos", destino, staging=staging, formato="csv")
+    assert _ler(destino, "SELECT produto_id FROM produtos ORDER BY produto_id") == [(1,), (2,), (3,)]
+
+    carregar_em_massa(_produtos([4], 20.0), "produtos", destino, staging=staging, substituir=True)
+    assert _ler(destino, "SELECT produto_id, preco FROM produtos") == [(4, 20.0)]
+
+    carregar_em_massa(_produtos([], 0.0), "produtos", destino, staging=staging, substituir=True)
+    assert _ler(destino, "SELECT COUNT(*) FROM produtos") == [(0,)]
+
+
+def test_upsert_com_checksum_das_chaves(destino, staging):
+    carregar_em_massa(_produtos([1, 2, 3], 10.0), "produtos", destino, staging=staging)
+    novos = _produtos([2, 3, 4], 30.0)
+
+    estatisticas = carregar_em_massa(novos, "produtos", destino, staging=staging, chave="produto_id",
+                                     checksum=calcular_checksum(novos))
+
+    assert _ler(destino, "SELECT produto_id, preco FROM produtos ORDER BY produto_id") == [
+        (1, 10.0), (2, 30.0), (3, 30.0), (4, 30.0)]
+    assert comparar_checksums(calcular_checksum(novos), estatisticas["checksum_destino"]) == []
+    assert _ler(destino, "SELECT name FROM sqlite_master WHERE name LIKE '%_staging_%'") == []
+
+
+def test_upsert_com_falha_nao_deixa_tabela_temporaria(destino, staging):
+    carregar_em_massa(_produtos([1], 10.0), "produtos", destino, staging=staging)
+
+    with pytest.raises(sqlite3.OperationalError):
+        carregar_em_massa(_produtos([1], 20.0), "produtos", destino, staging=staging, chave="coluna_inexistente")
+
+    assert _ler(destino, "SELECT produto_id, preco FROM produtos") == [(1, 10.0)]
+    assert _ler(destino, "SELECT name FROM sqlite_master WHERE name LIKE '%_staging_%'") == []
+
+
+def test_staging_no_s3_removido_depois_da_carga(destino, monkeypatch):
+    boto3 = pytest.importorskip("boto3")
+    moto = pytest.importorskip("moto")
+    for variavel, valor in {"AWS_ACCESS_KEY_ID": "test", "AWS_SECRET_ACCESS_KEY": "test",
+                            "AWS_DEFAULT_REGION": "us-east-1"}.items():
+        monkeypatch.setenv(variavel, valor)
+    monkeypatch.delenv("AWS_ENDPOINT_URL", raising=False)
+
+    with moto.mock_aws():
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket="etl")
+        s3.put_object(Bucket="etl", Key="staging/outro.txt", Body=b"fora do lote")
+
+        carregar_em_massa(_produtos([1, 2], 10.0), "produtos", destino, staging="s3://etl/staging", formato="csv")
+
+        chaves = [objeto["Key"] for objeto in s3.list_objects_v2(Bucket="etl").get("Contents", [])]
+    assert chaves == ["staging/outro.txt"]
+    assert _ler(destino, "SELECT COUNT(*) FROM produtos") == [(2,)]
@@ -0,0 +1,68 @@
+import json
+
+import pytest
+
+from worker.consumidor_rabbitmq import BROKER_MEMORIA, SUFIXO_DLQ, consumir_com_ack
+
+FILA = "teste-consumidor-fila"
+
+
+@pytest.fixture(autouse=True)
+def filas_limpas():
+    yield
+    for fila in (FILA, FILA + SUFIXO_DLQ):
+        BROKER_MEMORIA.filas.pop(fila, None)
+
+
+def _publicar(*corpos):
+    for corpo in corpos:
+        BROKER_MEMORIA.publicar(FILA, corpo)
+
+
+def _processar(mensagem):
+    if mensagem.get("falha"):
+        raise RuntimeError("falha simulada")
+    return {"mensagem_id": mensagem["id"], "status": "sucesso"}
+
+
+def test_falhas_e_corpos_invalidos_vao_para_a_dlq():
+    _publicar(json.dumps({"id": "PRODUTO-1"}), b"nao-e-json", json.dumps({"id": "PRODUTO-2", "falha": True}),
+              b"[1, 2]", json.dumps({"id": "PRODUTO-3"}))
+
+    resultados, estatisticas = consumir_com_ack(BROKER_MEMORIA.conexao(), [FILA], _processar, lote_ack=2,
+                                                tentativas=1, inatividade=0.05)
+
+    assert estatisticas["mensagens"] == 5
+    assert estatisticas["sucessos"] == 2
+    assert estatisticas["dlq"] == 3
+    assert [resultado["mensagem_id"] for resultado in resultados if resultado["status"] == "sucesso"] == [
+        "PRODUTO-1", "PRODUTO-3"]
+    assert not BROKER_MEMORIA.filas[FILA]  # Nada volta para a fila original
+    assert [corpo for corpo, _ in BROKER_MEMORIA.filas[FILA + SUFIXO_DLQ]] == [
+        b"nao-e-json", json.dumps({"id": "PRODUTO-2", "falha": True}), b"[1, 2]"]
+
+
+def test_limite_de_mensagens_devolve_as_restantes():
+    _publicar(*(json.dumps({"id": f"PRODUTO-{numero}"}) for numero in range(5)))
+
+    resultados, estatisticas = consumir_com_ack(BROKER_MEMORIA.conexao(), [FILA], _processar, max_mensagens=3,
+                                                prefetch=10, lote_ack=10, inatividade=0.05)
+
+    assert len(resultados) == 3
+    assert estatisticas["acks"] == 1
+    assert len(BROKER_MEMORIA.filas[FILA]) == 2
+
+
+def test_erro_no_consumo_confirma_as_processadas():
+    _publicar(*(json.dumps({"id": f"PRODUTO-{numero}"}) for numero in range(4)))
+
+    def processar(mensagem):
+        if mensagem["id"] == "PRODUTO-2":
+            raise KeyboardInterrupt  # Interrompe o consumo (não é tratado como falha da mensagem)
+        return _processar(mensagem)
+
+    with pytest.raises(KeyboardInterrupt):
+        consumir_com_ack(BROKER_MEMORIA.conexao(), [FILA], processar, lote_ack=10, inatividade=0.05)
+
+    # As duas processadas foram confirmadas; só as outras voltam para a fila
+    assert [json.loads(corpo)["id"] for corpo, _ in BROKER_MEMORIA.filas[FILA]] == ["PRODUTO-2", "PRODUTO-3"]
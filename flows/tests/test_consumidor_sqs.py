@@ -0,0 +1,81 @@
+import json
+
+import pytest
+
+boto3 = pytest.importorskip("boto3")
+moto = pytest.importorskip("moto")
+
+from worker.consumidor_sqs import apagar_mensagens, consumir_sqs  # noqa: E402
+
+FILA = "teste-fila"
+
+
+@pytest.fixture
+def cliente(monkeypatch):
+    """SQS simulado pelo moto no próprio processo"""
+    for variavel, valor in {"AWS_ACCESS_KEY_ID": "test", "AWS_SECRET_ACCESS_KEY": "test",
+                            "AWS_DEFAULT_REGION": "us-east-1"}.items():
+        monkeypatch.setenv(variavel, valor)
+    monkeypatch.delenv("AWS_ENDPOINT_URL", raising=False)
+    with moto.mock_aws():
+        yield boto3.client("sqs", region_name="us-east-1")
+
+
+def _criar_fila(cliente, max_recebimentos=None):
+    atributos = {}
+    url_dlq = None
+    if max_recebimentos:
+        url_dlq = cliente.create_queue(QueueName=FILA + "-dlq")["QueueUrl"]
+        arn_dlq = cliente.get_queue_attributes(QueueUrl=url_dlq, AttributeNames=["QueueArn"])["Attributes"]["QueueArn"]
+        atributos["RedrivePolicy"] = json.dumps({"deadLetterTargetArn": arn_dlq,
+                                                 "maxReceiveCount": str(max_recebimentos)})
+    url = cliente.create_queue(QueueName=FILA, Attributes=atributos)["QueueUrl"]
+    corpos = [json.dumps({"id": "PRODUTO-1"}), "nao-e-json",
+              json.dumps({"id": "PRODUTO-2"}), json.dumps({"id": "PRODUTO-3"})]
+    cliente.send_message_batch(QueueUrl=url, Entries=[
+        {"Id": str(indice), "MessageBody": corpo} for indice, corpo in enumerate(corpos)])
+    return url, url_dlq
+
+
+def _contagem(cliente, url):
+    atributos = cliente.get_queue_attributes(QueueUrl=url, AttributeNames=[
+        "ApproximateNumberOfMessages", "ApproximateNumberOfMessagesNotVisible"])["Attributes"]
+    return int(atributos["ApproximateNumberOfMessages"]) + int(atributos["ApproximateNumberOfMessagesNotVisible"])
+
+
+def _processar(mensagem):
+    return {"mensagem_id": mensagem["id"], "status": "sucesso"}
+
+
+def test_corpo_invalido_falha_sem_interromper_o_consumo(cliente):
+    url, _ = _criar_fila(cliente)
+
+    resultados, estatisticas = consumir_sqs(cliente, [FILA], _processar, espera_polling=0, visibilidade=30)
+
+    assert estatisticas["sucessos"] == 3
+    assert estatisticas["falhas"] == 1
+    assert estatisticas["falhas_exclusao"] == 0
+    assert sorted(resultado["mensagem_id"] or "" for resultado in resultados) == [
+        "", "PRODUTO-1", "PRODUTO-2", "PRODUTO-3"]
+    assert _contagem(cliente, url) == 1  # Só a inválida continua na fila, esperando o timeout
+
+
+def test_falha_vai_para_a_dlq_pela_redrive_policy(cliente):
+    url, url_dlq = _criar_fila(cliente, max_recebimentos=1)
+
+    # Com visibilidade 0, a mensagem que falhou fica visível de novo e o SQS a move para a DLQ
+    _, estatisticas = consumir_sqs(cliente, [FILA], _processar, espera_polling=0, visibilidade=0)
+
+    assert estatisticas["sucessos"] == 3
+    assert _contagem(cliente, url) == 0
+    mensagens_dlq = cliente.receive_message(QueueUrl=url_dlq, MaxNumberOfMessages=10)["Messages"]
+    assert [mensagem["Body"] for mensagem in mensagens_dlq] == ["nao-e-json"]
+
+
+def test_exclusao_recusada_e_contada(cliente):
+    url, _ = _criar_fila(cliente)
+    recebidas = cliente.receive_message(QueueUrl=url, MaxNumberOfMessages=10)["Messages"]
+    recibos = [mensagem["ReceiptHandle"] for mensagem in recebidas]
+
+    assert apagar_mensagens(cliente, url, recibos[:2] + ["recibo-invalido"]) == 1
+    assert _contagem(cliente, url) == len(recibos) - 2
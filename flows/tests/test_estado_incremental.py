@@ -0,0 +1,43 @@
+from datetime import datetime
+
+import pytest
+
+from etl.estado_incremental import ler_marca_dagua, remover_marca_dagua, salvar_marca_dagua
+
+
+@pytest.fixture(autouse=True)
+def diretorio_estado(tmp_path, monkeypatch):
+    monkeypatch.setenv("ETL_DIRETORIO_ESTADO", str(tmp_path))
+    monkeypatch.delenv("ETL_FONTE_MYSQL", raising=False)
+    return tmp_path
+
+
+def test_marca_com_datetime_volta_igual(diretorio_estado):
+    marca = {"id": 1500, "atualizado_em": datetime(2024, 5, 17, 13, 45, 12, 250000)}
+    salvar_marca_dagua("produtos", marca)
+
+    lida = ler_marca_dagua("produtos")
+    assert lida == marca
+    assert isinstance(lida["atualizado_em"], datetime)
+    assert [arquivo.name for arquivo in diretorio_estado.iterdir()] == ["produtos@simulado.json"]
+
+
+def test_marca_nao_serializavel_nao_deixa_temporario(diretorio_estado):
+    salvar_marca_dagua("produtos", {"id": 10})
+    with pytest.raises(TypeError):
+        salvar_marca_dagua("produtos", {"id": 20, "atualizado_em": object()})
+
+    assert ler_marca_dagua("produtos") == {"id": 10}
+    assert [arquivo.name for arquivo in diretorio_estado.iterdir()] == ["produtos@simulado.json"]
+
+
+def test_marca_separada_por_fonte(monkeypatch):
+    salvar_marca_dagua("pedidos", {"id": 99})
+    monkeypatch.setenv("ETL_FONTE_MYSQL", "sqlite:/tmp/origem.db")
+    assert ler_marca_dagua("pedidos") is None
+
+    salvar_marca_dagua("pedidos", {"id": 5})
+    remover_marca_dagua("pedidos")
+    assert ler_marca_dagua("pedidos") is None
+    monkeypatch.delenv("ETL_FONTE_MYSQL")
+    assert ler_marca_dagua("pedidos") == {"id": 99}
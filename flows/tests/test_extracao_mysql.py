@@ -0,0 +1,102 @@
+import pytest
+
+from etl.extracao_mysql import (conectar_sqlite, criar_base_sqlite, extrair_alteracoes, extrair_tabela,
+                                ler_paginas_alteradas, ler_paginas_keyset, simular_alteracoes_sqlite)
+
+NUM_REGISTROS = 100
+
+
+@pytest.fixture
+def base(tmp_path):
+    caminho = str(tmp_path / "origem.db")
+    criar_base_sqlite(caminho, tabelas=("pedidos",), num_registros=NUM_REGISTROS)
+    return caminho
+
+
+@pytest.fixture
+def conexao(base):
+    conexao = conectar_sqlite(base)
+    yield conexao
+    conexao.close()
+
+
+def _ids(paginas):
+    return [int(i) for pagina in paginas for i in pagina["id"]]
+
+
+@pytest.mark.parametrize("linhas_por_pagina", [7, 10, 100, 1000])
+def test_keyset_le_todas_as_linhas_uma_vez(conexao, linhas_por_pagina):
+    estatisticas = {}
+    paginas = list(ler_paginas_keyset(conexao, "pedidos", linhas_por_pagina=linhas_por_pagina,
+                                      tamanho_fetch=3, estatisticas=estatisticas))
+
+    assert _ids(paginas) == list(range(1, NUM_REGISTROS + 1))
+    assert all(len(pagina) <= linhas_por_pagina for pagina in paginas)
+    assert all(len(pagina) > 0 for pagina in paginas)
+    assert [pagina.attrs["ultimo_id"] for pagina in paginas] == [int(pagina["id"].iloc[-1]) for pagina in paginas]
+    assert estatisticas["linhas"] == NUM_REGISTROS
+
+
+def test_keyset_limite_da_pagina(conexao):
+    # 100 linhas em páginas de 10: a décima página vem cheia e a consulta seguinte volta vazia
+    paginas = list(ler_paginas_keyset(conexao, "pedidos", linhas_por_pagina=10))
+    assert [len(pagina) for pagina in paginas] == [10] * 10
+
+
+def test_keyset_apos_id_e_limite(conexao):
+    paginas = list(ler_paginas_keyset(conexao, "pedidos", apos_id=42, limite=25, linhas_por_pagina=10))
+    assert [len(pagina) for pagina in paginas] == [10, 10, 5]
+    assert _ids(paginas) == list(range(43, 68))
+
+    # Retomando do último id, o bloco seguinte começa exatamente depois dele
+    seguinte = extrair_tabela(conexao, "pedidos", apos_id=paginas[-1].attrs["ultimo_id"], limite=5)
+    assert seguinte["id"].tolist() == list(range(68, 73))
+    assert seguinte.attrs["ultimo_id"] == 72
+
+
+def test_extrair_tabela_igual_as_paginas(conexao):
+    df = extrair_tabela(conexao, "pedidos")
+    paginas = list(ler_paginas_keyset(conexao, "pedidos", linhas_por_pagina=13))
+
+    assert df["id"].tolist() == _ids(paginas)
+    assert list(df.columns) == list(paginas[0].columns)
+    assert df.attrs["ultimo_id"] == NUM_REGISTROS
+    assert df.attrs["extracao"]["linhas"] == NUM_REGISTROS
+
+    vazio = extrair_tabela(conexao, "pedidos", apos_id=NUM_REGISTROS)
+    assert vazio.empty
+    assert vazio.attrs["ultimo_id"] == NUM_REGISTROS
+
+
+def test_alteradas_desempata_pela_chave(conexao):
+    # criar_base_sqlite grava o mesmo atualizado_em em todas as linhas: só a chave separa as páginas
+    assert conexao.execute("SELECT COUNT(DISTINCT atualizado_em) FROM pedidos").fetchone()[0] == 1
+
+    paginas = list(ler_paginas_alteradas(conexao, "pedidos", linhas_por_pagina=7))
+    assert _ids(paginas) == list(range(1, NUM_REGISTROS + 1))
+    marca = paginas[0].attrs["marca_dagua"]
+    assert marca["id"] == 7
+
+    # Retomando de uma marca no meio do empate, nada é perdido nem lido de novo
+    retomadas = list(ler_paginas_alteradas(conexao, "pedidos", marca=marca, linhas_por_pagina=7))
+    assert _ids(retomadas) == list(range(8, NUM_REGISTROS + 1))
+    assert retomadas[-1].attrs["marca_dagua"] == paginas[-1].attrs["marca_dagua"]
+
+
+def test_alteradas_le_so_as_linhas_alteradas(base, conexao):
+    inicial = extrair_alteracoes(conexao, "pedidos")
+    assert len(inicial) == NUM_REGISTROS
+    marca = inicial.attrs["marca_dagua"]
+
+    simular_alteracoes_sqlite(base, "pedidos", 15, seed=1)
+    alteradas = conexao.execute("SELECT id FROM pedidos WHERE atualizado_em > ? ORDER BY id",
+                                (marca["atualizado_em"],)).fetchall()
+
+    paginas = list(ler_paginas_alteradas(conexao, "pedidos", marca=marca, linhas_por_pagina=4))
+    assert sorted(_ids(paginas)) == [i for (i,) in alteradas]
+    assert len(alteradas) == 15
+
+    # Sem novas alterações, a marca d'água se mantém
+    df = extrair_alteracoes(conexao, "pedidos", marca=paginas[-1].attrs["marca_dagua"])
+    assert df.empty
+    assert df.attrs["marca_dagua"] == paginas[-1].attrs["marca_dagua"]
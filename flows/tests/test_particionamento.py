@@ -0,0 +1,58 @@
+import pytest
+
+from worker.mensagens import LoteMensagens
+from worker.particionamento import coalescer, resumir_coalescencia
+from worker.processamento_lote import ResultadosAcumulados
+
+
+def _mensagem(id_mensagem, acao, prioridade="media"):
+    tipo = id_mensagem.split("-")[0].lower()
+    return {"tipo": tipo, "id": id_mensagem, "timestamp": 0.0,
+            "dados": {"acao": acao, "metadados": {"origem": "app", "prioridade": prioridade}}}
+
+
+MENSAGENS = [
+    _mensagem("PRODUTO-1", "atualizar"),
+    _mensagem("PEDIDO-7", "criar"),
+    _mensagem("PRODUTO-1", "atualizar"),
+    _mensagem("USUARIO-3", "criar"),
+    _mensagem("PEDIDO-7", "atualizar"),
+    _mensagem("USUARIO-3", "deletar"),
+    _mensagem("PRODUTO-1", "deletar"),
+    _mensagem("PEDIDO-7", "atualizar"),
+]
+
+# Última atualização de PEDIDO-7 substitui a anterior; USUARIO-3 é criado e deletado na janela;
+# o deletar de PRODUTO-1 descarta as duas atualizações anteriores
+ESPERADAS = [("PEDIDO-7", "criar"), ("PRODUTO-1", "deletar"), ("PEDIDO-7", "atualizar")]
+MOTIVOS = {"atualizacao_substituida": 3, "criada_e_deletada": 2}
+
+
+def _ids_acoes(mensagens):
+    return [(mensagem["id"], mensagem["dados"]["acao"]) for mensagem in mensagens]
+
+
+def test_coalescer_dicts():
+    restantes, descartadas = coalescer(MENSAGENS)
+
+    assert _ids_acoes(restantes) == ESPERADAS
+    assert all(resultado["status"] == "coalescida" for resultado in descartadas)
+    resumo = resumir_coalescencia(len(MENSAGENS), descartadas)
+    assert resumo["processadas"] == len(ESPERADAS)
+    assert resumo["atualizacoes_substituidas"] == MOTIVOS["atualizacao_substituida"]
+    assert resumo["criadas_e_deletadas"] == MOTIVOS["criada_e_deletada"]
+
+
+@pytest.mark.parametrize("acumular", [False, True])
+def test_coalescer_lote_compacto(acumular):
+    lote = LoteMensagens()
+    for mensagem in MENSAGENS:
+        lote.adicionar(mensagem)
+
+    restantes, descartadas = coalescer(lote, ResultadosAcumulados() if acumular else None)
+
+    assert isinstance(restantes, LoteMensagens)
+    assert _ids_acoes(restantes) == ESPERADAS
+    assert len(descartadas) == sum(MOTIVOS.values())
+    if acumular:
+        assert dict(descartadas.motivos) == MOTIVOS
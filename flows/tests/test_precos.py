@@ -0,0 +1,86 @@
+import sqlite3
+
+import pytest
+
+from cron.precos import TABELA_PRECOS, aplicar_precos, gerar_precos_fornecedor
+
+
+@pytest.fixture
+def conexao(tmp_path):
+    conexao = sqlite3.connect(tmp_path / "precos.db")
+    yield conexao
+    conexao.close()
+
+
+def _gravados(conexao):
+    return dict(conexao.execute(f"SELECT produto_id, preco FROM {TABELA_PRECOS}").fetchall())
+
+
+def _marcas(conexao):
+    return dict(conexao.execute(f"SELECT produto_id, atualizado_em FROM {TABELA_PRECOS}").fetchall())
+
+
+def test_novos_alterados_e_inalterados(conexao):
+    resumo = aplicar_precos(conexao, [{"produto_id": f"P{i}", "preco": 10.0 + i} for i in range(5)], tamanho_lote=2)
+    assert (resumo["recebidos"], resumo["novos"], resumo["alterados"], resumo["inalterados"]) == (5, 5, 0, 0)
+    assert resumo["lotes"] == 3
+    marcas = _marcas(conexao)
+
+    resumo = aplicar_precos(conexao, [
+        {"produto_id": "P0", "preco": 10.0},    # inalterado
+        {"produto_id": "P1", "preco": "11.00"},  # inalterado, como texto
+        {"produto_id": "P2", "preco": 99.9},     # alterado
+        {"produto_id": "P9", "preco": 5.5},      # novo
+    ], tamanho_lote=2)
+    assert (resumo["recebidos"], resumo["novos"], resumo["alterados"], resumo["inalterados"]) == (4, 1, 1, 2)
+    assert resumo["lotes"] == 1
+
+    gravados = _gravados(conexao)
+    assert gravados == {"P0": 10.0, "P1": 11.0, "P2": 99.9, "P3": 13.0, "P4": 14.0, "P9": 5.5}
+    novas_marcas = _marcas(conexao)
+    assert novas_marcas["P0"] == marcas["P0"] and novas_marcas["P1"] == marcas["P1"]
+    assert novas_marcas["P2"] > marcas["P2"]
+
+
+def test_arredondamento_em_centavos(conexao):
+    aplicar_precos(conexao, [{"produto_id": "P1", "preco": 19.99}, {"produto_id": "P2", "preco": 4.35}])
+
+    # Diferenças abaixo de meio centavo não geram escrita; a partir dele, o preço muda
+    resumo = aplicar_precos(conexao, [{"produto_id": "P1", "preco": 19.9949}, {"produto_id": "P2", "preco": 4.3500001}])
+    assert resumo["inalterados"] == 2
+    resumo = aplicar_precos(conexao, [{"produto_id": "P1", "preco": 19.996}])
+    assert resumo["alterados"] == 1
+    assert _gravados(conexao)["P1"] == 20.0
+
+
+def test_ids_repetidos_ficam_com_o_ultimo_preco(conexao):
+    resumo = aplicar_precos(conexao, [
+        {"produto_id": "P1", "preco": 1.0},
+        {"produto_id": "P1", "preco": 2.0},
+        {"produto_id": "P2", "preco": 3.0},
+    ])
+    assert (resumo["recebidos"], resumo["novos"]) == (2, 2)
+    assert _gravados(conexao) == {"P1": 2.0, "P2": 3.0}
+
+    # Repetido com o preço já gravado e um valor intermediário diferente: nada a escrever
+    resumo = aplicar_precos(conexao, [{"produto_id": "P1", "preco": 7.0}, {"produto_id": "P1", "preco": 2.0}])
+    assert resumo["inalterados"] == 1
+
+
+def test_lista_vazia_e_fornecedor_simulado(conexao):
+    assert aplicar_precos(conexao, [])["recebidos"] == 0
+
+    precos = gerar_precos_fornecedor(50, fracao_alterada=0.0)
+    assert aplicar_precos(conexao, precos)["novos"] == 50
+    assert gerar_precos_fornecedor(50, fracao_alterada=0.0) == precos
+    assert aplicar_precos(conexao, precos)["inalterados"] == 50
+
+
+def test_preco_gravado_nulo_e_reescrito(conexao):
+    aplicar_precos(conexao, [{"produto_id": "P1", "preco": 1.0}])
+    conexao.execute(f"INSERT INTO {TABELA_PRECOS} (produto_id, preco, atualizado_em) VALUES ('P2', NULL, 0)")
+    conexao.commit()
+
+    resumo = aplicar_precos(conexao, [{"produto_id": "P1", "preco": 1.0}, {"produto_id": "P2", "preco": 8.0}])
+    assert (resumo["novos"], resumo["alterados"], resumo["inalterados"]) == (0, 1, 1)
+    assert _gravados(conexao)["P2"] == 8.0
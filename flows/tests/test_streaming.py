@@ -0,0 +1,131 @@
+import json
+import threading
+import time
+
+import pytest
+
+from worker.consumidor_rabbitmq import BROKER_MEMORIA, SUFIXO_DLQ
+from worker.streaming import FonteRabbitMQ, WorkerStreaming
+
+FILA = "teste-streaming-fila"
+
+
+@pytest.fixture
+def abrir_fonte():
+    """Publica 5 mensagens no broker em memória e abre uma FonteRabbitMQ com o prefetch pedido"""
+    fontes = []
+
+    def abrir(prefetch=10):
+        for numero in range(1, 6):
+            BROKER_MEMORIA.publicar(FILA, json.dumps({"id": f"PRODUTO-{numero}"}))
+        fontes.append(FonteRabbitMQ("memoria", [FILA], prefetch=prefetch))
+        return fontes[-1]
+
+    yield abrir
+    for fonte in fontes:
+        fonte.fechar()
+    for fila in (FILA, FILA + SUFIXO_DLQ):
+        BROKER_MEMORIA.filas.pop(fila, None)
+
+
+def _recibos(fonte):
+    return [recibo for _, recibo in fonte.receber(10, 0)]
+
+
+def test_ack_so_cobre_o_prefixo_concluido(abrir_fonte):
+    fonte = abrir_fonte()
+    recibos = _recibos(fonte)
+    assert len(recibos) == 5
+
+    fonte.confirmar([recibos[1], recibos[2]])
+    assert sorted(fonte.canal.pendentes) == [1, 2, 3, 4, 5]  # A primeira ainda está em processamento
+
+    fonte.confirmar([recibos[0]])
+    assert sorted(fonte.canal.pendentes) == [4, 5]
+    assert list(fonte._entregues) == [4, 5]
+
+
+def test_rejeitadas_vao_para_a_dlq_sem_ack(abrir_fonte):
+    fonte = abrir_fonte()
+    recibos = _recibos(fonte)
+
+    fonte.rejeitar([recibos[1]])
+    assert sorted(fonte.canal.pendentes) == [1, 3, 4, 5]
+    assert len(BROKER_MEMORIA.filas[FILA + SUFIXO_DLQ]) == 1
+    assert not BROKER_MEMORIA.filas[FILA]
+
+    # O ack em lote passa pela rejeitada sem liquidá-la de novo (o broker recusaria a tag)
+    fonte.confirmar([recibos[0], recibos[2]])
+    assert sorted(fonte.canal.pendentes) == [4, 5]
+    fonte.confirmar([recibos[3], recibos[4]])
+    assert not fonte.canal.pendentes
+    assert not fonte._avulsas and not fonte._concluidas
+
+
+def test_concluidas_fora_do_prefixo_sao_confirmadas_uma_a_uma(abrir_fonte):
+    fonte = abrir_fonte(prefetch=4)  # Até 2 concluídas esperando o prefixo
+    recibos = _recibos(fonte)
+    assert len(recibos) == 4
+
+    fonte.confirmar([recibos[1], recibos[2]])
+    assert sorted(fonte.canal.pendentes) == [1, 4]
+
+    fonte.confirmar([recibos[0]])
+    assert sorted(fonte.canal.pendentes) == [4]
+    assert not fonte._avulsas
+
+
+def test_corpo_invalido_e_rejeitado_sem_parar_o_worker(abrir_fonte):
+    BROKER_MEMORIA.publicar(FILA, b"nao-e-json")
+    fonte = abrir_fonte()
+    processadas = []
+    worker = WorkerStreaming(fonte, processadas.append, num_processadores=2, tamanho_buffer=10,
+                             espera_recebimento=0.01).iniciar()
+    try:
+        prazo = time.monotonic() + 5
+        while worker.totais["processadas"] < 5 and time.monotonic() < prazo:
+            time.sleep(0.01)
+    finally:
+        worker.parar()
+
+    assert worker.erro is None
+    assert worker.totais == {"recebidas": 6, "processadas": 5, "falhas": 1}
+    assert len(processadas) == 5
+    assert [corpo for corpo, _ in BROKER_MEMORIA.filas[FILA + SUFIXO_DLQ]] == [b"nao-e-json"]
+    assert not BROKER_MEMORIA.filas[FILA]
+    assert not fonte.canal.pendentes
+
+
+def test_receber_respeita_o_maximo(abrir_fonte):
+    fonte = abrir_fonte()
+
+    assert len(fonte.receber(2, 0)) == 2
+    assert len(fonte.receber(10, 0)) == 3
+
+
+def _esperar(condicao, segundos=5):
+    prazo = time.monotonic() + segundos
+    while not condicao() and time.monotonic() < prazo:
+        time.sleep(0.01)
+    return condicao()
+
+
+def test_prefetch_acompanha_o_buffer_redimensionado(abrir_fonte):
+    fonte = abrir_fonte(prefetch=10)
+    liberar = threading.Event()
+    worker = WorkerStreaming(fonte, lambda mensagem: liberar.wait(5), num_processadores=1, tamanho_buffer=2,
+                             espera_recebimento=0.01).iniciar()
+    try:
+        assert _esperar(lambda: worker.em_aberto == 2)
+        time.sleep(0.05)
+        assert len(fonte.canal.pendentes) == 2  # O broker não entrega além do buffer
+
+        worker.redimensionar(1, 4)
+        assert _esperar(lambda: worker.em_aberto == 4)
+        time.sleep(0.05)
+        assert len(fonte.canal.pendentes) == 4
+    finally:
+        liberar.set()
+        worker.parar()
+    assert worker.totais["processadas"] == 4
+    assert len(BROKER_MEMORIA.filas[FILA]) == 1  # Não entregue antes da parada: continua na fila
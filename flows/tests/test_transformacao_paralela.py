@@ -0,0 +1,31 @@
+import pandas as pd
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from etl.geracao_dados import gerar_dados_sinteticos  # noqa: E402
+from etl.transformacao_paralela import executar_pipeline_paralelo  # noqa: E402
+from etl.transformacoes import executar_pipeline  # noqa: E402
+
+
+def _normalizar(agregado):
+    """Agregado com a categoria em coluna e linhas ordenadas por ela, para comparar os dois caminhos"""
+    if agregado.index.name == "categoria":
+        agregado = agregado.reset_index()
+    if "categoria" in agregado.columns and not agregado.empty:
+        agregado = agregado.astype({"categoria": str}).sort_values("categoria")
+    return agregado.reset_index(drop=True)
+
+
+@pytest.mark.parametrize("tabela", ["produtos", "pedidos"])
+@pytest.mark.parametrize("etapas", ["enriquecimento+agregacao", "projecao_precos+agregacao",
+                                    "agregacao+enriquecimento", "enriquecimento+agregacao_parcial"])
+def test_particionado_igual_a_um_processo(tabela, etapas):
+    df = gerar_dados_sinteticos(tabela, 2_000, seed=3)
+
+    esperado = executar_pipeline(df.copy(), etapas)
+    obtido = executar_pipeline_paralelo(df.copy(), etapas, processos=2)
+
+    pd.testing.assert_frame_equal(obtido["dados"], esperado["dados"], check_dtype=False, check_categorical=False)
+    pd.testing.assert_frame_equal(_normalizar(obtido["agregado"]), _normalizar(esperado["agregado"]),
+                                  check_dtype=False, check_categorical=False, check_index_type=False)
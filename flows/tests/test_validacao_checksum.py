@@ -0,0 +1,42 @@
+import sqlite3
+
+from etl.carga_bulk import carregar_em_massa
+from etl.geracao_dados import gerar_dados_sinteticos
+from etl.validacao_checksum import calcular_checksum, checksum_destino, combinar_checksums, comparar_checksums
+
+
+def _carregar(tmp_path, blocos):
+    destino = f"sqlite:{tmp_path / 'destino.db'}"
+    for df in blocos:
+        carregar_em_massa(df, "produtos", destino, staging=str(tmp_path / "staging"), formato="csv")
+    return sqlite3.connect(tmp_path / "destino.db")
+
+
+def test_checksum_confere_com_o_destino_sqlite(tmp_path):
+    blocos = [gerar_dados_sinteticos("produtos", 500, seed=7, id_inicial=inicio) for inicio in (1, 501)]
+    esperado = combinar_checksums([calcular_checksum(df) for df in blocos])
+    conexao = _carregar(tmp_path, blocos)
+    try:
+        obtido = checksum_destino(conexao, "produtos", esperado, "sqlite")
+    finally:
+        conexao.close()
+
+    assert set(esperado["colunas"]) == set(obtido["colunas"])
+    assert {valores["tipo"] for valores in esperado["colunas"].values()} >= {"inteiro", "real", "texto"}
+    assert comparar_checksums(esperado, obtido) == []
+
+
+def test_checksum_aponta_linha_alterada_no_destino(tmp_path):
+    df = gerar_dados_sinteticos("produtos", 200, seed=7)
+    esperado = calcular_checksum(df)
+    conexao = _carregar(tmp_path, [df])
+    try:
+        conexao.execute("UPDATE produtos SET preco = preco + 0.01 WHERE produto_id = 'PROD-10'")
+        conexao.execute("DELETE FROM produtos WHERE produto_id = 'PROD-20'")
+        obtido = checksum_destino(conexao, "produtos", esperado, "sqlite")
+    finally:
+        conexao.close()
+
+    divergencias = comparar_checksums(esperado, obtido)
+    assert any(divergencia.startswith("linhas:") for divergencia in divergencias)
+    assert any(divergencia.startswith("preco") for divergencia in divergencias)
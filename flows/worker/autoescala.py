@@ -0,0 +1,108 @@
+import math
+import os
+
+# Autoescala dos workers pela profundidade das filas.
+#
+# A cada amostra, o controlador recebe o total de mensagens esperando (nas filas produto-fila,
+# pedido-fila, usuario-fila e no buffer do worker) e quantas foram processadas desde a amostra
+# anterior; a taxa de chegada é a variação da profundidade mais as processadas. Pela lei de
+# Little, para que uma mensagem espere no máximo `latencia_alvo` segundos, a vazão precisa
+# cobrir a chegada e ainda drenar o acúmulo nesse prazo: vazao = chegada + profundidade / latencia_alvo.
+# O número de consumidores é essa vazão dividida pela vazão de um consumidor (com folga), que
+# é reestimada sempre que houve acúmulo durante todo o intervalo. O aumento é imediato; a
+# redução só acontece depois de `amostras_reducao` amostras seguidas pedindo menos
+# consumidores, para não oscilar com picos curtos.
+# O lote em voo por consumidor é limitado para que processar um lote leve uma fração da
+# latência alvo (lotes grandes só compensam quando há acúmulo para dividir).
+
+LATENCIA_ALVO_PADRAO = float(os.environ.get("WORKER_LATENCIA_ALVO", "30"))
+MIN_CONSUMIDORES_PADRAO = int(os.environ.get("WORKER_MIN_CONSUMIDORES", "1"))
+MAX_CONSUMIDORES_PADRAO = int(os.environ.get("WORKER_MAX_CONSUMIDORES", "10"))
+# Estimativa inicial (executar_processamento leva ~0,3 s por mensagem); depois vale a vazão observada
+VAZAO_POR_CONSUMIDOR_PADRAO = float(os.environ.get("WORKER_VAZAO_POR_CONSUMIDOR", "3"))
+
+
+def profundidade_rabbitmq(conexao, filas):
+    """Mensagens prontas em cada fila (queue_declare passivo não cria a fila)"""
+    canal = conexao.channel()
+    return {fila: canal.queue_declare(queue=fila, passive=True).method.message_count for fila in filas}
+
+
+def profundidade_sqs(cliente, filas):
+    """Mensagens visíveis em cada fila (as recebidas e em processamento não entram na conta)"""
+    profundidades = {}
+    for fila in filas:
+        url = cliente.get_queue_url(QueueName=fila)["QueueUrl"]
+        atributos = cliente.get_queue_attributes(QueueUrl=url, AttributeNames=["ApproximateNumberOfMessages"])
+        profundidades[fila] = int(atributos["Attributes"]["ApproximateNumberOfMessages"])
+    return profundidades
+
+
+class ControladorAutoescala:
+    """
+    Decide consumidores e tamanho de lote a partir das amostras de profundidade das filas
+    `vazao_por_consumidor` é a estimativa inicial da vazão de um consumidor em mensagens/s
+    """
+
+    def __init__(self, latencia_alvo=LATENCIA_ALVO_PADRAO, min_consumidores=MIN_CONSUMIDORES_PADRAO,
+                 max_consumidores=MAX_CONSUMIDORES_PADRAO, vazao_por_consumidor=VAZAO_POR_CONSUMIDOR_PADRAO,
+                 min_lote=1, max_lote=100, folga=1.2, suavizacao=0.5, amostras_reducao=3, consumidores_iniciais=None):
+        self.latencia_alvo = latencia_alvo
+        self.min_consumidores = min_consumidores
+        self.max_consumidores = max_consumidores
+        self.vazao_por_consumidor = vazao_por_consumidor
+        self.min_lote = min_lote
+        self.max_lote = max_lote
+        self.folga = folga
+        self.suavizacao = suavizacao
+        self.amostras_reducao = amostras_reducao
+        self.consumidores = min(max(consumidores_iniciais or min_consumidores, min_consumidores), max_consumidores)
+        self.chegada = 0.0  # Média móvel exponencial da taxa de chegada (mensagens/s)
+        self._anterior = None  # (instante, profundidade) da amostra anterior
+        self._pedidos_reducao = 0
+
+    def observar(self, instante, profundidade, processadas):
+        """
+        Registra uma amostra e retorna a decisão
+        `instante` em segundos, `profundidade` = mensagens esperando, `processadas` = desde a amostra anterior
+        """
+        if self._anterior is not None:
+            instante_anterior, profundidade_anterior = self._anterior
+            intervalo = max(instante - instante_anterior, 1e-9)
+            chegada = max(0.0, (profundidade - profundidade_anterior + processadas) / intervalo)
+            self.chegada += self.suavizacao * (chegada - self.chegada)
+            vazao = processadas / intervalo
+            por_consumidor = vazao / self.consumidores
+            if por_consumidor > self.vazao_por_consumidor:
+                self.vazao_por_consumidor = por_consumidor  # Os consumidores já provaram essa vazão
+            elif vazao and min(profundidade_anterior, profundidade) / vazao > self.latencia_alvo * 0.1:
+                # Mensagens esperando mais que 10% do alvo nas duas amostras: os consumidores não ficaram
+                # ociosos, então a vazão observada é a capacidade deles
+                self.vazao_por_consumidor += self.suavizacao * (por_consumidor - self.vazao_por_consumidor)
+        self._anterior = (instante, profundidade)
+
+        vazao_necessaria = (self.chegada + profundidade / self.latencia_alvo) * self.folga
+        desejados = math.ceil(vazao_necessaria / self.vazao_por_consumidor)
+        desejados = min(max(desejados, self.min_consumidores), self.max_consumidores)
+        if desejados >= self.consumidores:
+            self.consumidores = desejados
+            self._pedidos_reducao = 0
+        else:
+            self._pedidos_reducao += 1
+            if self._pedidos_reducao >= self.amostras_reducao:
+                self.consumidores = desejados
+                self._pedidos_reducao = 0
+
+        # Um lote não deve levar mais que 10% da latência alvo para ser processado
+        lote = min(self.vazao_por_consumidor * self.latencia_alvo * 0.1,
+                   math.ceil(profundidade / self.consumidores) or self.min_lote)
+        tamanho_lote = int(min(max(lote, self.min_lote), self.max_lote))
+
+        vazao = self.consumidores * self.vazao_por_consumidor
+        return {
+            "profundidade": profundidade,
+            "chegada": self.chegada,
+            "consumidores": self.consumidores,
+            "tamanho_lote": tamanho_lote,
+            "latencia_estimada": profundidade / vazao if vazao else math.inf,
+        }
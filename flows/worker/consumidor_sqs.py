@@ -0,0 +1,247 @@
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from worker.mensagens import decodificar_mensagem
+from worker.processamento_lote import TENTATIVAS_PADRAO, processar_com_tentativas
+
+# Consumidor real das filas SQS (produto-fila, pedido-fila, usuario-fila criadas no LocalStack).
+#
+# Cada fila tem uma thread que faz long polling (ReceiveMessage com até 10 mensagens e
+# WaitTimeSeconds), processa o lote recebido e apaga as mensagens processadas com um único
+# DeleteMessageBatch. Enquanto um lote está em processamento, uma thread de renovação estende
+# o visibility timeout das mensagens ainda não apagadas (ChangeMessageVisibilityBatch), para
+# que mensagens lentas não voltem a ficar visíveis para outro consumidor.
+# Mensagens que falham em todas as tentativas (ou cujo corpo não é um objeto JSON) não são
+# apagadas: ficam visíveis de novo quando o timeout expira e, pela redrive policy da fila, vão
+# para a DLQ '<fila>-dlq' após maxReceiveCount recebimentos (ver localstack-init-script.sh).
+# Sem a redrive policy, uma mensagem que sempre falha é entregue de novo indefinidamente.
+#
+# Habilitado com WORKER_SQS=1; o endpoint vem de AWS_ENDPOINT_URL (ex.: http://localstack:4566).
+
+FILAS_SQS_PADRAO = ["produto-fila", "pedido-fila", "usuario-fila"]
+MAX_MENSAGENS_POR_RECEBIMENTO = 10  # Limite da API do SQS para ReceiveMessage/DeleteMessageBatch
+ESPERA_POLLING_PADRAO = int(os.environ.get("WORKER_SQS_ESPERA", "20"))
+VISIBILIDADE_PADRAO = int(os.environ.get("WORKER_SQS_VISIBILIDADE", "30"))
+
+
+def sqs_configurado():
+    return os.environ.get("WORKER_SQS", "") not in ("", "0")
+
+
+def criar_cliente_sqs():
+    """Cliente boto3 do SQS; AWS_ENDPOINT_URL aponta para o LocalStack"""
+    import boto3
+
+    return boto3.client("sqs", endpoint_url=os.environ.get("AWS_ENDPOINT_URL"),
+                        region_name=os.environ.get("AWS_DEFAULT_REGION", "us-east-1"))
+
+
+def contar_chamadas(cliente):
+    """Conta as chamadas feitas pelo cliente, por operação (ReceiveMessage, DeleteMessageBatch, ...)"""
+    chamadas = Counter()
+    trava = threading.Lock()
+
+    def registrar(model, **_):
+        with trava:
+            chamadas[model.name] += 1
+
+    cliente.meta.events.register("before-call.sqs", registrar)
+    return chamadas
+
+
+class RenovadorVisibilidade:
+    """
+    Thread que estende o visibility timeout das mensagens em processamento
+    A cada `visibilidade / 2` segundos, as mensagens registradas há mais que esse intervalo
+    recebem um novo timeout de `visibilidade` segundos, em lotes de até 10 por chamada
+    """
+
+    def __init__(self, cliente, visibilidade):
+        self.cliente = cliente
+        self.visibilidade = visibilidade
+        self.intervalo = max(visibilidade / 2, 0.1)
+        self.em_processamento = {}  # receipt_handle -> (url_fila, renovada_em)
+        self.extensoes = 0
+        self.falhas = 0
+        self._trava = threading.Lock()
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._executar, name="renovador-visibilidade-sqs", daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *excecao):
+        self._parar.set()
+        self._thread.join()
+
+    def registrar(self, url_fila, recibos):
+        agora = time.monotonic()
+        with self._trava:
+            for recibo in recibos:
+                self.em_processamento[recibo] = (url_fila, agora)
+
+    def remover(self, recibos):
+        with self._trava:
+            for recibo in recibos:
+                self.em_processamento.pop(recibo, None)
+
+    def _executar(self):
+        while not self._parar.wait(self.intervalo / 2):
+            limite = time.monotonic() - self.intervalo
+            with self._trava:
+                vencendo = [(recibo, url) for recibo, (url, renovada_em) in self.em_processamento.items()
+                            if renovada_em <= limite]
+            por_fila = {}
+            for recibo, url in vencendo:
+                por_fila.setdefault(url, []).append(recibo)
+            for url, recibos in por_fila.items():
+                for inicio in range(0, len(recibos), MAX_MENSAGENS_POR_RECEBIMENTO):
+                    self._renovar_lote(url, recibos[inicio:inicio + MAX_MENSAGENS_POR_RECEBIMENTO])
+
+    def _renovar_lote(self, url, lote):
+        """
+        Estende o timeout de um lote; falhas são registradas sem interromper a thread
+        Entradas recusadas continuam registradas e são tentadas de novo no próximo ciclo, exceto
+        recibos inválidos (mensagem já apagada ou recebida de novo por outro consumidor)
+        """
+        try:
+            resposta = self.cliente.change_message_visibility_batch(QueueUrl=url, Entries=[
+                {"Id": str(indice), "ReceiptHandle": recibo, "VisibilityTimeout": self.visibilidade}
+                for indice, recibo in enumerate(lote)
+            ])
+        except Exception as excecao:
+            self.falhas += len(lote)
+            print(f"Falha ao estender a visibilidade de {len(lote)} mensagens em {url}: {excecao!r}")
+            return
+
+        recusadas = {int(entrada["Id"]): entrada for entrada in resposta.get("Failed", [])}
+        if recusadas:
+            self.falhas += len(recusadas)
+            codigos = Counter(entrada.get("Code", "?") for entrada in recusadas.values())
+            print(f"Extensão de visibilidade recusada para {len(recusadas)} mensagens em {url}: {dict(codigos)}")
+        renovada_em = time.monotonic()
+        with self._trava:
+            for indice, recibo in enumerate(lote):
+                if indice in recusadas:
+                    if recusadas[indice].get("Code") == "ReceiptHandleIsInvalid":
+                        self.em_processamento.pop(recibo, None)
+                elif recibo in self.em_processamento:
+                    self.em_processamento[recibo] = (url, renovada_em)
+                    self.extensoes += 1
+
+
+def apagar_mensagens(cliente, url_fila, recibos):
+    """
+    Apaga as mensagens com DeleteMessageBatch, em lotes de até 10
+    Entradas recusadas por erro do SQS são tentadas mais uma vez; as que continuam recusadas
+    (ou com recibo inválido) voltam a ficar visíveis e serão processadas de novo.
+    Retorna quantas mensagens não foram apagadas
+    """
+    nao_apagadas = 0
+    for inicio in range(0, len(recibos), MAX_MENSAGENS_POR_RECEBIMENTO):
+        lote = recibos[inicio:inicio + MAX_MENSAGENS_POR_RECEBIMENTO]
+        for tentativa in range(2):
+            resposta = cliente.delete_message_batch(QueueUrl=url_fila, Entries=[
+                {"Id": str(indice), "ReceiptHandle": recibo} for indice, recibo in enumerate(lote)])
+            recusadas = resposta.get("Failed", [])
+            repetir = [entrada for entrada in recusadas if not entrada.get("SenderFault") and not tentativa]
+            definitivas = [entrada for entrada in recusadas if entrada not in repetir]
+            if definitivas:
+                nao_apagadas += len(definitivas)
+                codigos = Counter(entrada.get("Code", "?") for entrada in definitivas)
+                print(f"Exclusão recusada para {len(definitivas)} mensagens em {url_fila}: {dict(codigos)}")
+            if not repetir:
+                break
+            lote = [lote[int(entrada["Id"])] for entrada in repetir]
+    return nao_apagadas
+
+
+def consumir_sqs(cliente, filas, processar, max_mensagens=None, espera_polling=ESPERA_POLLING_PADRAO,
+                 visibilidade=VISIBILIDADE_PADRAO, tentativas=TENTATIVAS_PADRAO):
+    """
+    Consome as filas até `max_mensagens` ou até um long polling voltar vazio em cada fila
+
+    `processar(mensagem)` recebe o corpo JSON já decodificado e é chamado até `tentativas` vezes.
+    Retorna (resultados, estatisticas), com as chamadas à API por operação e por 1.000 mensagens
+    """
+    chamadas = contar_chamadas(cliente)
+    resultados = []
+    trava = threading.Lock()
+    reservadas = [0]
+    contadores = Counter()
+    relogio = {"inicio": time.perf_counter(), "ultimo_lote": None}
+
+    def reservar():
+        """Quantas mensagens pedir no próximo ReceiveMessage sem passar de max_mensagens"""
+        with trava:
+            quantidade = MAX_MENSAGENS_POR_RECEBIMENTO
+            if max_mensagens is not None:
+                quantidade = min(quantidade, max_mensagens - reservadas[0])
+            reservadas[0] += max(quantidade, 0)
+            return quantidade
+
+    def devolver(quantidade):
+        with trava:
+            reservadas[0] -= quantidade
+
+    def consumir_fila(nome_fila, renovador):
+        url_fila = cliente.get_queue_url(QueueName=nome_fila)["QueueUrl"]
+        while True:
+            quantidade = reservar()
+            if quantidade <= 0:
+                return
+            resposta = cliente.receive_message(QueueUrl=url_fila, MaxNumberOfMessages=quantidade,
+                                               WaitTimeSeconds=espera_polling, VisibilityTimeout=visibilidade)
+            recebidas = resposta.get("Messages", [])
+            devolver(quantidade - len(recebidas))
+            if not recebidas:
+                return  # Long polling expirou sem mensagens: fila vazia
+
+            renovador.registrar(url_fila, [mensagem["ReceiptHandle"] for mensagem in recebidas])
+            processadas = []
+            for mensagem_sqs in recebidas:
+                mensagem, erro = decodificar_mensagem(mensagem_sqs["Body"])
+                if erro is None:
+                    resultado, erro = processar_com_tentativas(processar, mensagem, tentativas)
+                if erro is None:
+                    processadas.append(mensagem_sqs)
+                else:
+                    resultado = {"mensagem_id": mensagem.get("id") if mensagem else None, "status": "falha",
+                                 "erro": str(erro)}
+                    renovador.remover([mensagem_sqs["ReceiptHandle"]])  # Volta a ficar visível quando o timeout expirar
+                with trava:
+                    resultados.append(resultado)
+
+            recibos = [mensagem_sqs["ReceiptHandle"] for mensagem_sqs in processadas]
+            if recibos:
+                nao_apagadas = apagar_mensagens(cliente, url_fila, recibos)
+                with trava:
+                    contadores["nao_apagadas"] += nao_apagadas
+            renovador.remover(recibos)
+            relogio["ultimo_lote"] = time.perf_counter()
+
+    with RenovadorVisibilidade(cliente, visibilidade) as renovador:
+        with ThreadPoolExecutor(max_workers=len(filas), thread_name_prefix="consumidor-sqs") as pool:
+            for futuro in [pool.submit(consumir_fila, fila, renovador) for fila in filas]:
+                futuro.result()
+    # O último long polling vazio de cada fila não entra na vazão
+    segundos = (relogio["ultimo_lote"] or relogio["inicio"]) - relogio["inicio"]
+
+    total_chamadas = sum(chamadas.values())
+    falhas = sum(1 for resultado in resultados if resultado["status"] != "sucesso")
+    return resultados, {
+        "mensagens": len(resultados),
+        "sucessos": len(resultados) - falhas,
+        "falhas": falhas,
+        "segundos": segundos,
+        "mensagens_por_segundo": len(resultados) / segundos if segundos else 0.0,
+        "chamadas_api": dict(chamadas),
+        "chamadas_por_mil_mensagens": total_chamadas * 1000 / len(resultados) if resultados else 0.0,
+        "extensoes_visibilidade": renovador.extensoes,
+        "falhas_extensao_visibilidade": renovador.falhas,
+        "falhas_exclusao": contadores["nao_apagadas"],
+    }
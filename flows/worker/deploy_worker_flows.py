@@ -1,21 +1,69 @@
 from prefect import flow, task
-from prefect.deployments import Deployment
 from prefect.task_runners import ConcurrentTaskRunner
+import asyncio
 import time
 import random
 import json
+import math
+
+from comum.instrumentacao import instrumentar_fluxo, instrumentar_task
+from worker.autoescala import LATENCIA_ALVO_PADRAO, MAX_CONSUMIDORES_PADRAO, ControladorAutoescala
+from worker.consumidor_rabbitmq import (
+    FILAS_PADRAO,
+    LOTE_ACK_PADRAO,
+    PREFETCH_PADRAO,
+    conectar,
+    consumir_com_ack,
+    rabbitmq_configurado,
+)
+from worker.consumidor_sqs import (
+    ESPERA_POLLING_PADRAO,
+    FILAS_SQS_PADRAO,
+    VISIBILIDADE_PADRAO,
+    consumir_sqs,
+    criar_cliente_sqs,
+    sqs_configurado,
+)
+from worker.mensagens import LIMITE_LOTE_COMPACTO, LoteMensagens, gerar_lote, gerar_mensagem
+from worker.particionamento import agrupar_por_id, coalescer, particionar, resumir_coalescencia
+from worker.prioridade import RESERVA_ALTA_PADRAO, ordenar_por_prioridade
+from worker.processamento_async import MAX_EM_VOO_PADRAO, processar_concorrente
+from worker.processamento_lote import (
+    TAMANHO_LOTE_PADRAO,
+    TENTATIVAS_PADRAO,
+    ResultadosAcumulados,
+    processar_em_lote,
+)
+from worker.streaming import (
+    NUM_PROCESSADORES_PADRAO,
+    TAMANHO_BUFFER_PADRAO,
+    FonteRabbitMQ,
+    FonteSimulada,
+    FonteSQS,
+    WorkerStreaming,
+    encerramento_gracioso,
+)
 
 # Simulação de conexão com RabbitMQ e SQS
 @task(name="conectar_rabbitmq", log_prints=True)
+@instrumentar_task
 def conectar_rabbitmq():
     print("Conectando ao RabbitMQ...")
+    url = rabbitmq_configurado()
+    if url:
+        # A conexão pika não é thread-safe: cada task de consumo abre a sua a partir da URL
+        return {"connection": "rabbitmq", "url": url, "status": "configured"}
     time.sleep(1)
     # Em um caso real, usaríamos pika ou outra lib para conectar ao RabbitMQ
     return {"connection": "rabbitmq_simulado", "status": "connected"}
 
 @task(name="conectar_sqs", log_prints=True)
+@instrumentar_task
 def conectar_sqs():
     print("Conectando ao SQS...")
+    if sqs_configurado():
+        # O cliente boto3 é criado pela task de consumo
+        return {"connection": "sqs", "status": "configured"}
     time.sleep(1)
     # Em um caso real, usaríamos boto3 para conectar ao SQS
     return {"connection": "sqs_simulado", "status": "connected"}
@@ -24,34 +72,21 @@ def conectar_sqs():
       retries=3, 
       retry_delay_seconds=30, 
       log_prints=True)
+@instrumentar_task
 def consumir_mensagens_fila(conexao, num_mensagens=100):
     """
     Simula o consumo de mensagens de uma fila (RabbitMQ ou SQS)
     Em um cenário real, esse seria um worker escalável horizontalmente
+    Drenagens a partir de LIMITE_LOTE_COMPACTO mensagens vêm em colunas (ver LoteMensagens)
     """
     print(f"Consumindo mensagens da fila usando {conexao['connection']}...")
     
     # Simula obtenção de mensagens
-    mensagens = []
-    for i in range(num_mensagens):
-        # Simula diferentes tipos de mensagens
-        tipo = random.choice(["produto", "pedido", "usuario"])
-        id_entidade = random.randint(1000, 9999)
-        
-        mensagem = {
-            "tipo": tipo,
-            "id": f"{tipo.upper()}-{id_entidade}",
-            "timestamp": time.time(),
-            "dados": {
-                "acao": random.choice(["criar", "atualizar", "deletar"]),
-                "metadados": {
-                    "origem": random.choice(["app", "site", "api"]),
-                    "prioridade": random.choice(["alta", "media", "baixa"])
-                }
-            }
-        }
-        mensagens.append(mensagem)
-        
+    if num_mensagens >= LIMITE_LOTE_COMPACTO:
+        mensagens = gerar_lote(num_mensagens)
+    else:
+        mensagens = [gerar_mensagem() for _ in range(num_mensagens)]
+
     print(f"Consumidas {len(mensagens)} mensagens da fila.")
     return mensagens
 
@@ -59,13 +94,22 @@ def consumir_mensagens_fila(conexao, num_mensagens=100):
       retries=2, 
       retry_delay_seconds=10, 
       log_prints=True)
+@instrumentar_task
 def processar_mensagem(mensagem):
     """
     Processa uma mensagem individual
     Esta tarefa será executada de forma concorrente para cada mensagem
     """
     print(f"Processando mensagem {mensagem['id']} do tipo {mensagem['tipo']}...")
-    
+    resultado = executar_processamento(mensagem)
+    print(f"Mensagem {mensagem['id']} processada com sucesso em {resultado['duracao']:.2f}s")
+    return resultado
+
+def executar_processamento(mensagem):
+    """
+    Processamento de uma mensagem sem a task ao redor
+    Usado pelos lotes e pelos consumidores, que controlam as tentativas por mensagem
+    """
     # Simula falha aleatória (para demonstrar retries)
     if random.random() < 0.05:
         raise Exception(f"Erro ao processar mensagem {mensagem['id']}")
@@ -74,56 +118,162 @@ def processar_mensagem(mensagem):
     tempo_processamento = random.uniform(0.1, 0.5)
     time.sleep(tempo_processamento)
     
-    resultado = {
+    return {
         "mensagem_id": mensagem["id"],
         "processado_em": time.time(),
         "duracao": tempo_processamento,
         "status": "sucesso"
     }
-    
-    print(f"Mensagem {mensagem['id']} processada com sucesso em {tempo_processamento:.2f}s")
-    return resultado
+
+@task(name="processar_lote_mensagens", log_prints=True)
+@instrumentar_task
+def processar_lote_mensagens(mensagens, tentativas=TENTATIVAS_PADRAO, acumular=False):
+    """
+    Processa um lote de mensagens em uma única task run (ver worker/processamento_lote.py)
+    As tentativas valem por mensagem; uma falha definitiva entra nos resultados com status "falha"
+    Com `acumular`, retorna os contadores (ResultadosAcumulados) em vez da lista de resultados
+    """
+    resultados = processar_em_lote(mensagens, executar_processamento, tentativas)
+    falhas = sum(1 for resultado in resultados if resultado["status"] != "sucesso")
+    print(f"Lote de {len(mensagens)} mensagens processado: {len(resultados) - falhas} sucessos, {falhas} falhas")
+    return ResultadosAcumulados(resultados) if acumular else resultados
+
+@task(name="coalescer_mensagens", log_prints=True)
+@instrumentar_task
+def coalescer_mensagens(mensagens):
+    """
+    Descarta as atualizações substituídas e os pares criar/deletar de um mesmo id na janela
+    (ver worker/particionamento.py); retorna (mensagens a processar, resultados das descartadas)
+    """
+    # Em uma drenagem grande, as descartadas também viram contadores
+    acumular = isinstance(mensagens, LoteMensagens)
+    restantes, descartadas = coalescer(mensagens, ResultadosAcumulados() if acumular else None)
+    resumo = resumir_coalescencia(len(mensagens), descartadas)
+    print(f"Coalescência: {resumo['processadas']} de {resumo['recebidas']} mensagens a processar; "
+          f"{resumo['atualizacoes_substituidas']} atualizações substituídas, "
+          f"{resumo['criadas_e_deletadas']} mensagens de entidades criadas e deletadas na janela "
+          f"({resumo['trabalho_removido']:.1%} do trabalho removido)")
+    return restantes, descartadas
+
+def processar_mensagens(mensagens, tamanho_lote=TAMANHO_LOTE_PADRAO):
+    """
+    Processa as mensagens em lotes submetidos em paralelo ao task runner do fluxo
+    Com tamanho_lote=1, mantém uma task processar_mensagem por mensagem
+    Cada lote é uma partição por id: as mensagens de um mesmo id são processadas em ordem,
+    e os ids com mensagens de prioridade alta são submetidos primeiro (ver worker/prioridade.py)
+    Um LoteMensagens (drenagem grande) retorna os contadores em vez da lista de resultados
+    """
+    compacto = isinstance(mensagens, LoteMensagens)
+    mensagens, descartadas = coalescer_mensagens(mensagens)
+    if tamanho_lote <= 1:
+        # No Prefect 2.0, o map é implícito quando iteramos sobre uma coleção
+        resultados = [processar_mensagem(mensagem) for grupo in agrupar_por_id(mensagens) for mensagem in grupo]
+        return ResultadosAcumulados(resultados).mesclar(descartadas) if compacto else resultados + descartadas
+    lotes = [processar_lote_mensagens.submit(particao, acumular=compacto)
+             for particao in particionar(mensagens, tamanho_lote)]
+    if compacto:
+        for lote in lotes:
+            descartadas.mesclar(lote.result())
+        return descartadas
+    return [resultado for lote in lotes for resultado in lote.result()] + descartadas
+
+@task(name="consumir_rabbitmq", retries=3, retry_delay_seconds=30, log_prints=True)
+@instrumentar_task
+def consumir_rabbitmq(conexao, max_mensagens=None, prefetch=PREFETCH_PADRAO, lote_ack=LOTE_ACK_PADRAO,
+                      filas=FILAS_PADRAO):
+    """
+    Consome e processa as filas reais do RabbitMQ (ver worker/consumidor_rabbitmq.py)
+    Cada mensagem é confirmada só depois de processada, com acks em lote; as que falham
+    em todas as tentativas vão para a fila '<fila>.dlq'
+    """
+    print(f"Consumindo até {max_mensagens or 'todas as'} mensagens de {', '.join(filas)} "
+          f"(prefetch={prefetch}, lote de ack={lote_ack})...")
+    conexao_broker = conectar(conexao["url"])
+    try:
+        resultados, estatisticas = consumir_com_ack(
+            conexao_broker, filas, executar_processamento, max_mensagens, prefetch=prefetch, lote_ack=lote_ack)
+    finally:
+        if conexao_broker.is_open:
+            conexao_broker.close()
+
+    print(f"Consumidas {estatisticas['mensagens']} mensagens ({estatisticas['mensagens_por_segundo']:.1f} msgs/s, "
+          f"{estatisticas['acks']} acks, {estatisticas['dlq']} para a DLQ); latência até o ack: "
+          f"média {estatisticas['latencia_ack_media'] * 1000:.1f} ms, p99 {estatisticas['latencia_ack_p99'] * 1000:.1f} ms")
+    return resultados
+
+@task(name="consumir_sqs_lotes", retries=3, retry_delay_seconds=30, log_prints=True)
+@instrumentar_task
+def consumir_sqs_lotes(conexao, max_mensagens=None, espera_polling=ESPERA_POLLING_PADRAO,
+                       visibilidade=VISIBILIDADE_PADRAO, filas=FILAS_SQS_PADRAO):
+    """
+    Consome e processa as filas reais do SQS (ver worker/consumidor_sqs.py)
+    Long polling com até 10 mensagens por ReceiveMessage, DeleteMessageBatch após o
+    processamento e extensão automática do visibility timeout das mensagens lentas
+    """
+    print(f"Consumindo até {max_mensagens or 'todas as'} mensagens de {', '.join(filas)} "
+          f"(long polling de {espera_polling}s, visibilidade de {visibilidade}s)...")
+    resultados, estatisticas = consumir_sqs(criar_cliente_sqs(), filas, executar_processamento, max_mensagens,
+                                            espera_polling=espera_polling, visibilidade=visibilidade)
+    print(f"Consumidas {estatisticas['mensagens']} mensagens ({estatisticas['mensagens_por_segundo']:.1f} msgs/s); "
+          f"chamadas à API: {estatisticas['chamadas_api']} "
+          f"({estatisticas['chamadas_por_mil_mensagens']:.0f} por 1.000 mensagens), "
+          f"{estatisticas['extensoes_visibilidade']} extensões de visibilidade")
+    if estatisticas["falhas_exclusao"]:
+        print(f"{estatisticas['falhas_exclusao']} mensagens processadas não foram apagadas e serão entregues de novo")
+    return resultados
 
 @task(name="salvar_resultados", log_prints=True)
+@instrumentar_task
 def salvar_resultados(resultados):
     """
     Salva os resultados do processamento em um banco de dados
+    Aceita a lista de resultados ou os contadores de uma drenagem grande (ResultadosAcumulados)
     """
-    sucessos = len([r for r in resultados if r and r.get("status") == "sucesso"])
-    falhas = len(resultados) - sucessos
+    if not isinstance(resultados, ResultadosAcumulados):
+        resultados = ResultadosAcumulados(resultados)
+    sucessos = resultados.por_status["sucesso"]
+    # Coalescidas: descartadas por redundância (ver coalescer_mensagens), não contam como falha
+    coalescidas = resultados.por_status["coalescida"]
+    falhas = len(resultados) - sucessos - coalescidas
     
     print(f"Resultados do processamento: {sucessos} sucessos, {falhas} falhas")
-    print(f"Taxa de sucesso: {(sucessos / len(resultados) * 100):.2f}%")
+    if coalescidas:
+        print(f"Mensagens coalescidas (trabalho redundante evitado): {coalescidas}")
+    print(f"Taxa de sucesso: {(sucessos / max(len(resultados) - coalescidas, 1) * 100):.2f}%")
     
     # Em um caso real, salvaríamos em um banco de dados
     return {
         "total": len(resultados),
         "sucessos": sucessos,
-        "falhas": falhas
+        "falhas": falhas,
+        "coalescidas": coalescidas
     }
 
 @flow(name="Processamento de Fila RabbitMQ", 
       description="Consome e processa mensagens do RabbitMQ com escalabilidade horizontal",
       task_runner=ConcurrentTaskRunner())
-def processar_fila_rabbitmq():
+@instrumentar_fluxo
+def processar_fila_rabbitmq(max_mensagens=None, prefetch=PREFETCH_PADRAO, lote_ack=LOTE_ACK_PADRAO,
+                            tamanho_lote=TAMANHO_LOTE_PADRAO):
     """
     Fluxo para processar mensagens da fila RabbitMQ
     Usa ConcurrentTaskRunner para simular o processamento paralelo de mensagens
+    Com WORKER_RABBITMQ_URL definida, consome as filas reais com prefetch e acks em lote
+    As mensagens simuladas são processadas em lotes de `tamanho_lote` por task
     """
     conexao = conectar_rabbitmq()
-    
-    # Em cenário real, configuração dinâmica baseada na fila
-    num_mensagens = random.randint(50, 200)  # Simula carga variável
-    
+
+    # Filas reais: sem `max_mensagens`, drena até a fila ficar ociosa
+    if conexao["connection"] == "rabbitmq":
+        resultados = consumir_rabbitmq(conexao, max_mensagens, prefetch=prefetch, lote_ack=lote_ack)
+        return salvar_resultados(resultados)
+
+    num_mensagens = max_mensagens or random.randint(50, 200)  # Simula carga variável
     print(f"Iniciando processamento de {num_mensagens} mensagens...")
     mensagens = consumir_mensagens_fila(conexao, num_mensagens)
     
-    # Processa cada mensagem de forma concorrente
-    resultados = []
-    for mensagem in mensagens:
-        # No Prefect 2.0, o map é implícito quando iteramos sobre uma coleção
-        resultado = processar_mensagem(mensagem)
-        resultados.append(resultado)
+    # Processa os lotes de forma concorrente
+    resultados = processar_mensagens(mensagens, tamanho_lote)
     
     metricas = salvar_resultados(resultados)
     return metricas
@@ -131,46 +281,240 @@ def processar_fila_rabbitmq():
 @flow(name="Processamento de Fila SQS", 
       description="Consome e processa mensagens do SQS da AWS com escalabilidade horizontal",
       task_runner=ConcurrentTaskRunner())
-def processar_fila_sqs():
+@instrumentar_fluxo
+def processar_fila_sqs(max_mensagens=None, tamanho_lote=TAMANHO_LOTE_PADRAO):
     """
     Fluxo para processar mensagens da fila SQS
     Similar ao fluxo RabbitMQ, mas para ilustrar a possibilidade de fluxos diferentes
+    Com WORKER_SQS=1, consome as filas reais com long polling e operações em lote
+    As mensagens simuladas são processadas em lotes de `tamanho_lote` por task
     """
     conexao = conectar_sqs()
-    
-    # Em cenário real, configuração dinâmica baseada no tamanho da fila
-    num_mensagens = random.randint(100, 500)  # SQS com mais mensagens neste exemplo
-    
+
+    # Filas reais: sem `max_mensagens`, drena até o long polling voltar vazio em cada fila
+    if conexao["connection"] == "sqs":
+        resultados = consumir_sqs_lotes(conexao, max_mensagens)
+        return salvar_resultados(resultados)
+
+    num_mensagens = max_mensagens or random.randint(100, 500)  # SQS com mais mensagens neste exemplo
     print(f"Iniciando processamento de {num_mensagens} mensagens do SQS...")
     mensagens = consumir_mensagens_fila(conexao, num_mensagens)
     
-    # Processa cada mensagem de forma concorrente
-    resultados = []
-    for mensagem in mensagens:
-        resultado = processar_mensagem(mensagem)
-        resultados.append(resultado)
+    # Processa os lotes de forma concorrente
+    resultados = processar_mensagens(mensagens, tamanho_lote)
     
     metricas = salvar_resultados(resultados)
     return metricas
 
+# Worker contínuo: uma única execução mantém a conexão aberta em vez de uma execução por drenagem
+def criar_fonte_streaming(origem, prefetch=PREFETCH_PADRAO, taxa_simulada=50.0):
+    """Fonte de mensagens do worker contínuo conforme a origem e as variáveis de ambiente"""
+    if origem == "rabbitmq" and rabbitmq_configurado():
+        return FonteRabbitMQ(rabbitmq_configurado(), FILAS_PADRAO, prefetch)
+    if origem == "sqs" and sqs_configurado():
+        return FonteSQS(criar_cliente_sqs(), FILAS_SQS_PADRAO, VISIBILIDADE_PADRAO)
+    print(f"Fila {origem} não configurada; usando mensagens simuladas ({taxa_simulada:.0f} msgs/s)")
+    return FonteSimulada(taxa_simulada)
+
+@flow(name="Worker de Fila Contínuo",
+      description="Consome continuamente RabbitMQ ou SQS com backpressure e checkpoints periódicos")
+@instrumentar_fluxo
+def worker_streaming(origem="rabbitmq", num_processadores=NUM_PROCESSADORES_PADRAO,
+                     tamanho_buffer=TAMANHO_BUFFER_PADRAO, intervalo_checkpoint=60, duracao_maxima=None,
+                     autoescala=False, latencia_alvo=LATENCIA_ALVO_PADRAO, intervalo_amostragem=15,
+                     max_processadores=MAX_CONSUMIDORES_PADRAO, reserva_alta=RESERVA_ALTA_PADRAO):
+    """
+    Mantém a conexão aberta e processa as mensagens até receber SIGTERM (ou até `duracao_maxima`
+    segundos); a cada `intervalo_checkpoint` segundos as métricas são salvas com salvar_resultados.
+    Com `autoescala`, a profundidade das filas é amostrada a cada `intervalo_amostragem` segundos
+    e os processadores e o buffer são ajustados para a `latencia_alvo` (ver worker/autoescala.py).
+    `reserva_alta` é a fração dos processadores reservada às mensagens de prioridade alta.
+    Ver worker/streaming.py
+    """
+    conexao = conectar_sqs() if origem == "sqs" else conectar_rabbitmq()
+    print(f"Worker contínuo iniciado ({conexao['connection']}, {num_processadores} processadores, "
+          f"buffer de {tamanho_buffer} mensagens)")
+    # O prefetch acompanha o buffer, também quando a autoescala o redimensiona (ver WorkerStreaming)
+    fonte = criar_fonte_streaming(origem, prefetch=tamanho_buffer)
+    worker = WorkerStreaming(fonte, executar_processamento, num_processadores=num_processadores,
+                             tamanho_buffer=tamanho_buffer, reserva_alta=reserva_alta)
+    inicio = time.monotonic()
+    checkpoints = []
+    controlador = None
+    if autoescala:
+        controlador = ControladorAutoescala(latencia_alvo=latencia_alvo, max_consumidores=max_processadores,
+                                           consumidores_iniciais=num_processadores)
+    processadas_amostra = 0
+
+    def checkpoint():
+        resultados, latencias = worker.coletar()
+        metricas = salvar_resultados(resultados) if resultados else {"total": 0, "sucessos": 0, "falhas": 0, "coalescidas": 0}
+        por_prioridade = ", ".join(f"{nome} {latencia:.2f}s"
+                                   for nome, latencia in latencias["latencia_p99_por_prioridade"].items())
+        print(f"Checkpoint: {latencias['mensagens']} mensagens; latência da fila até o processamento "
+              f"p50 {latencias['latencia_p50']:.2f}s, p99 {latencias['latencia_p99']:.2f}s ({por_prioridade})")
+        checkpoints.append(dict(metricas, **latencias))
+
+    def autoescalar():
+        nonlocal processadas_amostra
+        processadas = worker.totais["processadas"]
+        try:
+            profundidade = fonte.profundidade()
+        except Exception as excecao:
+            # Uma falha ao consultar a fila não deve derrubar o worker; tenta de novo na próxima amostra
+            print(f"Autoescala: falha ao consultar a profundidade das filas ({excecao!r}); mantendo o ajuste atual")
+            return
+        decisao = controlador.observar(time.monotonic(), profundidade + worker.em_aberto,
+                                       processadas - processadas_amostra)
+        processadas_amostra = processadas
+        if decisao["consumidores"] != worker.num_processadores:
+            print(f"Autoescala: {decisao['profundidade']} mensagens esperando, chegada de "
+                  f"{decisao['chegada']:.1f} msgs/s -> {decisao['consumidores']} processadores, "
+                  f"lotes de {decisao['tamanho_lote']} mensagens")
+        worker.redimensionar(decisao["consumidores"], decisao["consumidores"] * decisao["tamanho_lote"])
+
+    with encerramento_gracioso(worker.solicitar_parada):
+        worker.iniciar()
+        try:
+            fim = inicio + duracao_maxima if duracao_maxima is not None else math.inf
+            proximo_checkpoint = inicio + intervalo_checkpoint
+            proxima_amostra = inicio + intervalo_amostragem if controlador else math.inf
+            while True:
+                espera = min(proximo_checkpoint, proxima_amostra, fim) - time.monotonic()
+                if worker.aguardar(max(espera, 0)) or time.monotonic() >= fim:
+                    break
+                if time.monotonic() >= proxima_amostra:
+                    autoescalar()
+                    proxima_amostra += intervalo_amostragem
+                if time.monotonic() >= proximo_checkpoint:
+                    checkpoint()
+                    proximo_checkpoint += intervalo_checkpoint
+            print("Parada solicitada: concluindo as mensagens já recebidas...")
+        finally:
+            # Também em caso de erro (ex.: falha ao salvar um checkpoint): as threads de recebimento
+            # e processamento concluem as mensagens em andamento em vez de ficarem órfãs
+            worker.parar()
+    checkpoint()
+    if worker.erro is not None:
+        raise worker.erro
+
+    print(f"Worker contínuo encerrado: {worker.totais['processadas']} de {worker.totais['recebidas']} "
+          f"mensagens recebidas processadas, {worker.totais['falhas']} falhas")
+    return {"totais": worker.totais, "checkpoints": checkpoints, "segundos": time.monotonic() - inicio}
+
+# Variantes assíncronas: cada mensagem em voo é uma corrotina no event loop, não uma thread
+@task(name="conectar_rabbitmq_async", log_prints=True)
+@instrumentar_task
+async def conectar_rabbitmq_async():
+    print("Conectando ao RabbitMQ (async)...")
+    await asyncio.sleep(1)
+    # Em um caso real, usaríamos aio-pika para conectar ao RabbitMQ
+    return {"connection": "rabbitmq_simulado", "status": "connected"}
+
+@task(name="conectar_sqs_async", log_prints=True)
+@instrumentar_task
+async def conectar_sqs_async():
+    print("Conectando ao SQS (async)...")
+    await asyncio.sleep(1)
+    # Em um caso real, usaríamos aiobotocore para conectar ao SQS
+    return {"connection": "sqs_simulado", "status": "connected"}
+
+@task(name="consumir_mensagens_fila_async", retries=3, retry_delay_seconds=30, log_prints=True)
+@instrumentar_task
+async def consumir_mensagens_fila_async(conexao, num_mensagens=100):
+    """Versão assíncrona de consumir_mensagens_fila"""
+    print(f"Consumindo mensagens da fila usando {conexao['connection']} (async)...")
+    await asyncio.sleep(0)  # Ponto de I/O da leitura da fila
+    mensagens = [gerar_mensagem() for _ in range(num_mensagens)]
+    print(f"Consumidas {len(mensagens)} mensagens da fila.")
+    return mensagens
+
+async def executar_processamento_async(mensagem):
+    """Versão assíncrona de executar_processamento: a espera não bloqueia o event loop"""
+    if random.random() < 0.05:
+        raise Exception(f"Erro ao processar mensagem {mensagem['id']}")
+
+    tempo_processamento = random.uniform(0.1, 0.5)
+    await asyncio.sleep(tempo_processamento)
+
+    return {
+        "mensagem_id": mensagem["id"],
+        "processado_em": time.time(),
+        "duracao": tempo_processamento,
+        "status": "sucesso"
+    }
+
+@task(name="processar_mensagem_async", retries=2, retry_delay_seconds=10, log_prints=True)
+@instrumentar_task
+async def processar_mensagem_async(mensagem):
+    """Versão assíncrona de processar_mensagem, para processar uma mensagem isolada como task"""
+    print(f"Processando mensagem {mensagem['id']} do tipo {mensagem['tipo']}...")
+    resultado = await executar_processamento_async(mensagem)
+    print(f"Mensagem {mensagem['id']} processada com sucesso em {resultado['duracao']:.2f}s")
+    return resultado
+
+@task(name="processar_mensagens_async", log_prints=True)
+@instrumentar_task
+async def processar_mensagens_async(mensagens, max_em_voo=MAX_EM_VOO_PADRAO):
+    """
+    Processa todas as mensagens no event loop, com no máximo `max_em_voo` ao mesmo tempo
+    (ver worker/processamento_async.py); as tentativas valem por mensagem
+    """
+    # Com o semáforo cheio, as corrotinas entram na ordem da lista: alta primeiro
+    resultados, estatisticas = await processar_concorrente(ordenar_por_prioridade(mensagens),
+                                                           executar_processamento_async, max_em_voo)
+    print(f"Processadas {estatisticas['mensagens']} mensagens com até {max_em_voo} em voo: "
+          f"{estatisticas['mensagens_por_segundo']:.1f} msgs/s, latência p50 {estatisticas['latencia_p50']:.2f}s, "
+          f"p99 {estatisticas['latencia_p99']:.2f}s")
+    return resultados
+
+@flow(name="Processamento de Fila Assíncrono",
+      description="Consome e processa milhares de mensagens em voo em um único event loop")
+@instrumentar_fluxo
+async def processar_fila_async(origem="rabbitmq", num_mensagens=None, max_em_voo=MAX_EM_VOO_PADRAO):
+    """
+    Variante assíncrona dos fluxos de fila: em vez de uma thread por mensagem em processamento,
+    as mensagens são corrotinas limitadas por um semáforo
+    """
+    conexao = await (conectar_sqs_async() if origem == "sqs" else conectar_rabbitmq_async())
+
+    num_mensagens = num_mensagens or random.randint(1000, 5000)
+    print(f"Iniciando processamento assíncrono de {num_mensagens} mensagens...")
+    mensagens = await consumir_mensagens_fila_async(conexao, num_mensagens)
+
+    resultados = await processar_mensagens_async(mensagens, max_em_voo)
+    return salvar_resultados(resultados)
+
 # Script para criar deployments
-if __name__ == "__main__":
-    # Deployment para processamento de fila RabbitMQ (sem agendamento, acionado por API)
-    rabbitmq_deployment = Deployment.build_from_flow(
-        flow=processar_fila_rabbitmq,
-        name="worker-rabbitmq",
-        work_queue_name="worker",
-        # Sem agendamento - acionado sob demanda ou por API
-    )
-    rabbitmq_deployment.apply()
-    
-    # Deployment para processamento de fila SQS (sem agendamento, acionado por API)
-    sqs_deployment = Deployment.build_from_flow(
-        flow=processar_fila_sqs,
-        name="worker-sqs",
-        work_queue_name="worker",
-        # Sem agendamento - acionado sob demanda ou por API
-    )
-    sqs_deployment.apply()
-    
+def registrar_deployments(armazenamento):
+    """Cria os deployments do cenário 2 a partir do código em `armazenamento` (ver deploy_all_flows.py)"""
+    entrypoint_path = "worker/deploy_worker_flows.py"
+    deployments = [
+        # Processamento das filas RabbitMQ e SQS (sem agendamento - acionados sob demanda ou por API)
+        (processar_fila_rabbitmq, "worker-rabbitmq", {}),
+        (processar_fila_sqs, "worker-sqs", {}),
+        # Worker contínuo (uma execução de longa duração, encerrada por SIGTERM)
+        (worker_streaming, "worker-streaming", {}),
+        # Worker contínuo com autoescala de processadores e buffer pela profundidade das filas
+        (worker_streaming, "worker-autoescala", {"autoescala": True}),
+        # Variante assíncrona (sem agendamento, acionada por API)
+        (processar_fila_async, "worker-async", {}),
+    ]
+    for fluxo, nome, parametros in deployments:
+        fluxo.from_source(
+            source=armazenamento,
+            entrypoint=f"{entrypoint_path}:{fluxo.fn.__name__}"
+        ).deploy(
+            name=nome,
+            work_pool_name="worker-pool",
+            work_queue_name="worker",
+            parameters=parametros,
+        )
+
     print("Cenário 2: Deployments de workers criados com sucesso!")
+
+# Script que cria deployments para os fluxos (todos os cenários de uma vez: deploy_all_flows.py)
+if __name__ == "__main__":
+    from deploy_all_flows import armazenamento_local
+
+    registrar_deployments(armazenamento_local())
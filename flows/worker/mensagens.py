@@ -0,0 +1,129 @@
+import json
+import os
+import random
+import time
+from array import array
+
+# Formato das mensagens trocadas pelas filas do cenário de workers
+# (o mesmo publicado por localstack-init/rabbitmq-init-script.py)
+
+TIPOS_MENSAGENS = ["produto", "pedido", "usuario"]
+ACOES = ["criar", "atualizar", "deletar"]
+ORIGENS = ["app", "site", "api"]
+PRIORIDADES = ["alta", "media", "baixa"]
+
+FILAS_POR_TIPO = {tipo: f"{tipo}-fila" for tipo in TIPOS_MENSAGENS}
+
+# A partir deste tamanho, a drenagem simulada usa LoteMensagens e os resultados viram contadores
+LIMITE_LOTE_COMPACTO = int(os.environ.get("WORKER_LIMITE_COMPACTO", "10000"))
+
+
+def gerar_mensagem(gerador=random):
+    """Gera uma mensagem aleatória; `gerador` permite usar um random.Random com seed"""
+    tipo = gerador.choice(TIPOS_MENSAGENS)
+    id_entidade = gerador.randint(1000, 9999)
+    return {
+        "tipo": tipo,
+        "id": f"{tipo.upper()}-{id_entidade}",
+        "timestamp": time.time(),
+        "dados": {
+            "acao": gerador.choice(ACOES),
+            "metadados": {
+                "origem": gerador.choice(ORIGENS),
+                "prioridade": gerador.choice(PRIORIDADES)
+            }
+        }
+    }
+
+
+def decodificar_mensagem(corpo):
+    """
+    Decodifica o corpo recebido da fila; retorna (mensagem, None) ou (None, erro)
+    Um corpo que não é um objeto JSON é uma falha da mensagem, não do consumidor
+    """
+    try:
+        mensagem = json.loads(corpo)
+    except ValueError as erro:  # JSONDecodeError e UnicodeDecodeError
+        return None, erro
+    if not isinstance(mensagem, dict):
+        return None, ValueError(f"Mensagem não é um objeto JSON: {type(mensagem).__name__}")
+    return mensagem, None
+
+
+class LoteMensagens:
+    """
+    Mensagens de uma drenagem em colunas compactas, para drenagens de 100 mil+ mensagens
+    Os campos categóricos (tipo, acao, origem, prioridade) guardam o índice na lista de valores
+    (1 byte) e o id guarda só o número da entidade; cada mensagem ocupa 16 bytes em vez dos três
+    dicts aninhados. lote[i] e a iteração montam o dict no formato de gerar_mensagem sob demanda,
+    reutilizando as strings das listas de valores.
+    """
+
+    def __init__(self):
+        self.tipos = array("B")
+        self.numeros = array("I")
+        self.timestamps = array("d")
+        self.acoes = array("B")
+        self.origens = array("B")
+        self.prioridades = array("B")
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def adicionar(self, mensagem):
+        tipo, numero = mensagem["id"].split("-", 1)
+        metadados = mensagem["dados"]["metadados"]
+        self.tipos.append(TIPOS_MENSAGENS.index(tipo.lower()))
+        self.numeros.append(int(numero))
+        self.timestamps.append(mensagem["timestamp"])
+        self.acoes.append(ACOES.index(mensagem["dados"]["acao"]))
+        self.origens.append(ORIGENS.index(metadados["origem"]))
+        self.prioridades.append(PRIORIDADES.index(metadados["prioridade"]))
+
+    def id(self, indice):
+        return f"{TIPOS_MENSAGENS[self.tipos[indice]].upper()}-{self.numeros[indice]}"
+
+    def __getitem__(self, indice):
+        return {
+            "tipo": TIPOS_MENSAGENS[self.tipos[indice]],
+            "id": self.id(indice),
+            "timestamp": self.timestamps[indice],
+            "dados": {
+                "acao": ACOES[self.acoes[indice]],
+                "metadados": {
+                    "origem": ORIGENS[self.origens[indice]],
+                    "prioridade": PRIORIDADES[self.prioridades[indice]]
+                }
+            }
+        }
+
+    def __iter__(self):
+        return (self[indice] for indice in range(len(self)))
+
+    def campos_agendamento(self):
+        """(id, acao, índice da prioridade) de cada mensagem, lidos direto das colunas"""
+        tipos = [tipo.upper() for tipo in TIPOS_MENSAGENS]
+        for tipo, numero, acao, prioridade in zip(self.tipos, self.numeros, self.acoes, self.prioridades):
+            yield f"{tipos[tipo]}-{numero}", ACOES[acao], prioridade
+
+    def selecionar(self, indices):
+        """Novo lote com as mensagens nas posições `indices`, na ordem dada"""
+        lote = LoteMensagens()
+        for coluna in ("tipos", "numeros", "timestamps", "acoes", "origens", "prioridades"):
+            origem = getattr(self, coluna)
+            getattr(lote, coluna).extend(origem[indice] for indice in indices)
+        return lote
+
+
+def gerar_lote(num_mensagens, gerador=random):
+    """Equivalente compacto de [gerar_mensagem() for _ in range(num_mensagens)], sem criar os dicts"""
+    lote = LoteMensagens()
+    for _ in range(num_mensagens):
+        tipo = gerador.randrange(len(TIPOS_MENSAGENS))
+        lote.tipos.append(tipo)
+        lote.numeros.append(gerador.randint(1000, 9999))
+        lote.timestamps.append(time.time())
+        lote.acoes.append(gerador.randrange(len(ACOES)))
+        lote.origens.append(gerador.randrange(len(ORIGENS)))
+        lote.prioridades.append(gerador.randrange(len(PRIORIDADES)))
+    return lote
@@ -0,0 +1,116 @@
+import math
+import zlib
+from collections import Counter
+
+from worker.mensagens import PRIORIDADES, LoteMensagens
+from worker.prioridade import prioridade
+from worker.processamento_lote import ResultadosAcumulados
+
+# Ordenação por entidade e coalescência das mensagens de uma mesma drenagem.
+#
+# As mensagens de um mesmo id (ex.: PRODUTO-1234) precisam ser aplicadas na ordem em que
+# chegaram; ids diferentes podem ser processados em paralelo. Antes do processamento, a
+# janela (a lista drenada da fila) é reduzida por id, mantendo a ordem:
+#   - atualizar seguido de atualizar ou deletar: a atualização anterior é substituída
+#     (as mensagens não carregam estado parcial, então a última atualização vence);
+#   - criar seguido de deletar na mesma janela: a entidade nunca chega a existir fora da
+#     janela e as duas mensagens são descartadas.
+# Depois, cada id vai inteiro para uma partição (crc32 do id) e cada partição é processada
+# em sequência, em uma única task, preservando a ordem por id.
+
+
+def acao(mensagem):
+    return mensagem.get("dados", {}).get("acao")
+
+
+def _campos(mensagens):
+    """(id, acao, índice da prioridade) de cada mensagem; um LoteMensagens lê direto das colunas"""
+    if isinstance(mensagens, LoteMensagens):
+        return mensagens.campos_agendamento()
+    return ((mensagem["id"], acao(mensagem), PRIORIDADES.index(prioridade(mensagem))) for mensagem in mensagens)
+
+
+def _selecionar(mensagens, indices):
+    """Subconjunto no mesmo formato da entrada (lista de dicts ou LoteMensagens)"""
+    if isinstance(mensagens, LoteMensagens):
+        return mensagens.selecionar(indices)
+    return [mensagens[indice] for indice in indices]
+
+
+def coalescer(mensagens, descartadas=None):
+    """
+    Reduz as mensagens de cada id na janela
+    Retorna (mensagens a processar, na ordem original; resultados das descartadas, com o motivo).
+    `descartadas` pode ser um ResultadosAcumulados, para não guardar um dict por descartada
+    """
+    descartadas = [] if descartadas is None else descartadas
+    registrar = descartadas.append if isinstance(descartadas, list) else descartadas.adicionar
+    mantidas = {}  # id -> (índice, ação) das mensagens mantidas, em ordem
+
+    for indice, (id_mensagem, acao_mensagem, _) in enumerate(_campos(mensagens)):
+        pilha = mantidas.setdefault(id_mensagem, [])
+
+        def descartar(entrada, motivo):
+            registrar({"mensagem_id": id_mensagem, "acao": entrada[1], "status": "coalescida", "motivo": motivo})
+
+        if acao_mensagem == "atualizar" and pilha and pilha[-1][1] == "atualizar":
+            descartar(pilha.pop(), "atualizacao_substituida")
+        elif acao_mensagem == "deletar":
+            while pilha and pilha[-1][1] == "atualizar":
+                descartar(pilha.pop(), "atualizacao_substituida")
+            if pilha and pilha[-1][1] == "criar":
+                descartar(pilha.pop(), "criada_e_deletada")
+                descartar((indice, acao_mensagem), "criada_e_deletada")
+                continue
+        pilha.append((indice, acao_mensagem))
+
+    restantes = sorted(indice for pilha in mantidas.values() for indice, _ in pilha)
+    return _selecionar(mensagens, restantes), descartadas
+
+
+def resumir_coalescencia(recebidas, descartadas):
+    """Quanto trabalho redundante foi removido da janela"""
+    if isinstance(descartadas, ResultadosAcumulados):
+        motivos = descartadas.motivos
+    else:
+        motivos = Counter(resultado["motivo"] for resultado in descartadas)
+    return {
+        "recebidas": recebidas,
+        "processadas": recebidas - len(descartadas),
+        "atualizacoes_substituidas": motivos["atualizacao_substituida"],
+        "criadas_e_deletadas": motivos["criada_e_deletada"],
+        "trabalho_removido": len(descartadas) / recebidas if recebidas else 0.0,
+    }
+
+
+def _indices_por_id(mensagens):
+    """
+    [melhor prioridade, id, índices das mensagens do id na ordem de chegada] de cada id
+    Os ids com alguma mensagem de prioridade mais alta vêm primeiro (ver worker/prioridade.py)
+    """
+    grupos = {}
+    for indice, (id_mensagem, _, nivel) in enumerate(_campos(mensagens)):
+        grupo = grupos.setdefault(id_mensagem, [nivel, id_mensagem, []])
+        grupo[0] = min(grupo[0], nivel)
+        grupo[2].append(indice)
+    return sorted(grupos.values(), key=lambda grupo: grupo[0])
+
+
+def agrupar_por_id(mensagens):
+    """Grupos de mensagens de um mesmo id, na ordem de chegada dentro de cada grupo"""
+    return [_selecionar(mensagens, indices) for _, _, indices in _indices_por_id(mensagens)]
+
+
+def particionar(mensagens, tamanho_particao):
+    """
+    Distribui os ids em partições de ~`tamanho_particao` mensagens pelo crc32 do id
+    Todas as mensagens de um id ficam na mesma partição, na ordem original
+    """
+    num_particoes = max(1, math.ceil(len(mensagens) / max(1, tamanho_particao)))
+    particoes = [[len(PRIORIDADES), []] for _ in range(num_particoes)]
+    for melhor, id_mensagem, indices in _indices_por_id(mensagens):
+        particao = particoes[zlib.crc32(id_mensagem.encode()) % num_particoes]
+        particao[0] = min(particao[0], melhor)
+        particao[1].extend(indices)
+    particoes.sort(key=lambda particao: particao[0])
+    return [_selecionar(mensagens, indices) for _, indices in particoes if indices]
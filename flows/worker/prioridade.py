@@ -0,0 +1,133 @@
+import math
+import os
+import threading
+import time
+from collections import Counter, deque
+
+from worker.mensagens import PRIORIDADES
+
+# Agendamento das mensagens pela prioridade em dados.metadados.prioridade (alta/media/baixa).
+#
+# As filas do broker são FIFO; a prioridade vale entre as mensagens já recebidas pelo worker.
+# Uma parte dos processadores (`reserva_alta`) fica reservada: mensagens media/baixa nunca
+# ocupam mais que os processadores restantes, então sempre há processador livre para alta,
+# por maior que seja o acúmulo de baixa. Nos processadores gerais, a próxima mensagem é a de
+# maior espera ponderada (segundos no buffer x peso da prioridade): alta passa na frente, mas
+# uma baixa que espera há muito tempo acaba vencendo, e nenhuma prioridade fica sem atendimento.
+# Com pesos iguais e sem reserva, a ordem é a FIFO original.
+#
+# A prioridade não pode reordenar mensagens de um mesmo id (ex.: PRODUTO-1234): enquanto uma
+# mensagem do id está em processamento, ou uma anterior dele ainda espera no buffer, as demais
+# ficam retidas e os processadores pegam mensagens de outros ids. Assim a ordem por id é a de
+# chegada, mesmo com vários processadores e prioridades diferentes para o mesmo id.
+
+PESOS_PADRAO = {"alta": 4, "media": 2, "baixa": 1}
+RESERVA_ALTA_PADRAO = float(os.environ.get("WORKER_RESERVA_ALTA", "0.25"))
+
+
+def prioridade(mensagem):
+    """Prioridade da mensagem; mensagens sem prioridade conhecida são tratadas como media"""
+    valor = mensagem.get("dados", {}).get("metadados", {}).get("prioridade")
+    return valor if valor in PRIORIDADES else "media"
+
+
+def ordenar_por_prioridade(mensagens):
+    """Ordena alta, media, baixa, mantendo a ordem de chegada dentro de cada prioridade"""
+    return sorted(mensagens, key=lambda mensagem: PRIORIDADES.index(prioridade(mensagem)))
+
+
+class FilaPrioridades:
+    """
+    Buffer do worker contínuo com a interface de queue.Queue usada pelos processadores
+    put((mensagem, recibo)) / put(None) para encerrar um processador, get() e, ao fim do
+    processamento de cada mensagem, concluir(mensagem) para liberar o processador e o id
+    """
+
+    def __init__(self, num_processadores, reserva_alta=RESERVA_ALTA_PADRAO, pesos=PESOS_PADRAO):
+        self.reserva_alta = reserva_alta
+        self.pesos = pesos
+        self._filas = {nome: deque() for nome in PRIORIDADES}  # (entrada no buffer, sequência, item)
+        self._em_processamento = Counter()
+        self._sequencia = 0
+        self._esperando_por_id = {}  # id -> sequências das mensagens do id no buffer, em ordem
+        self._ids_em_processamento = set()
+        self._encerramentos = 0
+        self._condicao = threading.Condition()
+        self.redimensionar(num_processadores)
+
+    def redimensionar(self, num_processadores):
+        """Recalcula os processadores reservados para alta (sempre sobra ao menos um geral)"""
+        with self._condicao:
+            reservados = math.ceil(num_processadores * self.reserva_alta) if self.reserva_alta else 0
+            self.processadores_gerais = max(num_processadores - reservados, 1)
+            self._condicao.notify_all()
+
+    def tamanhos(self):
+        """Mensagens esperando no buffer, por prioridade"""
+        with self._condicao:
+            return {nome: len(fila) for nome, fila in self._filas.items()}
+
+    def put(self, item):
+        with self._condicao:
+            if item is None:
+                self._encerramentos += 1
+            else:
+                self._sequencia += 1
+                id_mensagem = item[0].get("id")
+                if id_mensagem is not None:
+                    self._esperando_por_id.setdefault(id_mensagem, deque()).append(self._sequencia)
+                self._filas[prioridade(item[0])].append((time.monotonic(), self._sequencia, item))
+            self._condicao.notify()
+
+    def _liberada(self, sequencia, item):
+        """A mensagem pode ser processada: o id está livre e ela é a mais antiga do id no buffer"""
+        id_mensagem = item[0].get("id")
+        if id_mensagem is None:
+            return True
+        return id_mensagem not in self._ids_em_processamento and self._esperando_por_id[id_mensagem][0] == sequencia
+
+    def _escolher(self):
+        """(prioridade, posição na fila) da próxima mensagem, ou None se nenhuma puder sair agora"""
+        ocupados = self._em_processamento["media"] + self._em_processamento["baixa"]
+        agora = time.monotonic()
+        escolhida, maior_espera = None, -1.0
+        for nome, fila in self._filas.items():
+            if not fila or (nome != "alta" and ocupados >= self.processadores_gerais):
+                continue
+            # A mais antiga da prioridade que não está retida pelo id
+            for posicao, (entrada, sequencia, item) in enumerate(fila):
+                if self._liberada(sequencia, item):
+                    espera = (agora - entrada) * self.pesos[nome]
+                    if espera > maior_espera:
+                        escolhida, maior_espera = (nome, posicao), espera
+                    break
+        return escolhida
+
+    def get(self):
+        with self._condicao:
+            while True:
+                if self._encerramentos:
+                    self._encerramentos -= 1
+                    return None
+                escolhida = self._escolher()
+                if escolhida is not None:
+                    nome, posicao = escolhida
+                    fila = self._filas[nome]
+                    _, _, item = fila[posicao]
+                    del fila[posicao]
+                    self._em_processamento[nome] += 1
+                    id_mensagem = item[0].get("id")
+                    if id_mensagem is not None:
+                        esperando = self._esperando_por_id[id_mensagem]
+                        esperando.popleft()
+                        if not esperando:
+                            del self._esperando_por_id[id_mensagem]
+                        self._ids_em_processamento.add(id_mensagem)
+                    return item
+                self._condicao.wait()
+
+    def concluir(self, mensagem):
+        with self._condicao:
+            self._em_processamento[prioridade(mensagem)] -= 1
+            self._ids_em_processamento.discard(mensagem.get("id"))
+            self._condicao.notify_all()
@@ -0,0 +1,56 @@
+import asyncio
+import os
+import time
+
+from worker.processamento_lote import TENTATIVAS_PADRAO, percentil
+
+# Processamento assíncrono de mensagens.
+#
+# Todas as mensagens ficam em voo no mesmo event loop, cada uma como uma corrotina, e um
+# asyncio.Semaphore limita quantas processam ao mesmo tempo. Diferente do ConcurrentTaskRunner,
+# uma mensagem esperando I/O não ocupa uma thread, então o limite pode chegar a milhares.
+
+MAX_EM_VOO_PADRAO = int(os.environ.get("WORKER_MAX_EM_VOO", "1000"))
+
+
+def resumir_latencias(latencias, segundos):
+    """Mensagens/s e percentis da latência (do início do processamento até a conclusão de cada mensagem)"""
+    return {
+        "mensagens": len(latencias),
+        "segundos": segundos,
+        "mensagens_por_segundo": len(latencias) / segundos if segundos else 0.0,
+        "latencia_p50": percentil(latencias, 0.50),
+        "latencia_p99": percentil(latencias, 0.99),
+    }
+
+
+async def processar_com_tentativas_async(processar, mensagem, tentativas=TENTATIVAS_PADRAO):
+    """Versão assíncrona de processamento_lote.processar_com_tentativas"""
+    erro = None
+    for _ in range(tentativas):
+        try:
+            return await processar(mensagem), None
+        except Exception as excecao:
+            erro = excecao
+    return None, erro
+
+
+async def processar_concorrente(mensagens, processar, max_em_voo=MAX_EM_VOO_PADRAO, tentativas=TENTATIVAS_PADRAO):
+    """
+    Processa as mensagens com a corrotina `processar`, com no máximo `max_em_voo` ao mesmo tempo
+    Retorna (resultados na ordem das mensagens, estatísticas com mensagens/s e latência p50/p99)
+    """
+    semaforo = asyncio.Semaphore(max(1, max_em_voo))
+    latencias = []
+    inicio = time.perf_counter()
+
+    async def processar_uma(mensagem):
+        async with semaforo:
+            resultado, erro = await processar_com_tentativas_async(processar, mensagem, tentativas)
+        latencias.append(time.perf_counter() - inicio)
+        if erro is not None:
+            return {"mensagem_id": mensagem.get("id"), "status": "falha", "erro": str(erro), "tentativas": tentativas}
+        return resultado
+
+    resultados = await asyncio.gather(*(processar_uma(mensagem) for mensagem in mensagens))
+    return list(resultados), resumir_latencias(latencias, time.perf_counter() - inicio)
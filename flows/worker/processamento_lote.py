@@ -0,0 +1,88 @@
+import os
+import time
+from collections import Counter
+
+# Processamento de mensagens em lotes.
+#
+# Uma task do Prefect por mensagem paga a cada mensagem as transições de estado, as
+# chamadas à API e o log da task run. Aqui uma task processa um lote inteiro: cada
+# mensagem tem as próprias tentativas dentro do lote, e uma falha definitiva vira um
+# resultado com status "falha" em vez de derrubar as demais mensagens do lote.
+
+TAMANHO_LOTE_PADRAO = int(os.environ.get("WORKER_TAMANHO_LOTE", "25"))
+TENTATIVAS_PADRAO = 3  # Equivale a retries=2 da task processar_mensagem
+
+
+def dividir_em_lotes(mensagens, tamanho_lote):
+    """Divide a lista em lotes consecutivos de até `tamanho_lote` mensagens"""
+    tamanho_lote = max(1, tamanho_lote)
+    return [mensagens[inicio:inicio + tamanho_lote] for inicio in range(0, len(mensagens), tamanho_lote)]
+
+
+def percentil(valores, fracao):
+    """Percentil por posição na lista ordenada (0.0 para lista vazia)"""
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(int(len(ordenados) * fracao), len(ordenados) - 1)]
+
+
+def processar_com_tentativas(processar, mensagem, tentativas=TENTATIVAS_PADRAO, espera=0.0):
+    """Chama processar(mensagem) até `tentativas` vezes; retorna (resultado, None) ou (None, último erro)"""
+    erro = None
+    for tentativa in range(tentativas):
+        if tentativa and espera:
+            time.sleep(espera)
+        try:
+            return processar(mensagem), None
+        except Exception as excecao:
+            erro = excecao
+    return None, erro
+
+
+def processar_em_lote(mensagens, processar, tentativas=TENTATIVAS_PADRAO, espera=0.0):
+    """Processa as mensagens em sequência; retorna um resultado por mensagem, na mesma ordem"""
+    resultados = []
+    for mensagem in mensagens:
+        resultado, erro = processar_com_tentativas(processar, mensagem, tentativas, espera)
+        if erro is not None:
+            resultado = {"mensagem_id": mensagem.get("id"), "status": "falha", "erro": str(erro), "tentativas": tentativas}
+        resultados.append(resultado)
+    return resultados
+
+
+class ResultadosAcumulados:
+    """
+    Contadores dos resultados em vez da lista de dicts, para drenagens grandes
+    Guarda o total por status, a soma das durações, os motivos das coalescências e os
+    primeiros erros; acumuladores de tasks diferentes são combinados com mesclar()
+    """
+
+    MAX_ERROS = 20
+
+    def __init__(self, resultados=()):
+        self.por_status = Counter()
+        self.motivos = Counter()
+        self.duracao_total = 0.0
+        self.erros = []
+        for resultado in resultados:
+            self.adicionar(resultado)
+
+    def __len__(self):
+        return sum(self.por_status.values())
+
+    def adicionar(self, resultado):
+        status = resultado.get("status") if resultado else None
+        self.por_status[status] += 1
+        self.duracao_total += resultado.get("duracao", 0.0) if resultado else 0.0
+        if status == "coalescida":
+            self.motivos[resultado["motivo"]] += 1
+        elif status == "falha" and len(self.erros) < self.MAX_ERROS:
+            self.erros.append(resultado.get("erro"))
+
+    def mesclar(self, outro):
+        self.por_status.update(outro.por_status)
+        self.motivos.update(outro.motivos)
+        self.duracao_total += outro.duracao_total
+        self.erros.extend(outro.erros[:self.MAX_ERROS - len(self.erros)])
+        return self
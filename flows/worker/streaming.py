@@ -0,0 +1,389 @@
+import itertools
+import os
+import queue
+import signal
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from worker.autoescala import profundidade_rabbitmq, profundidade_sqs
+from worker.consumidor_rabbitmq import SUFIXO_DLQ, _propriedades_dlq, conectar
+from worker.consumidor_sqs import MAX_MENSAGENS_POR_RECEBIMENTO, RenovadorVisibilidade, apagar_mensagens
+from worker.mensagens import PRIORIDADES, decodificar_mensagem, gerar_mensagem
+from worker.prioridade import PESOS_PADRAO, RESERVA_ALTA_PADRAO, FilaPrioridades, prioridade
+from worker.processamento_lote import TENTATIVAS_PADRAO, percentil, processar_com_tentativas
+
+# Worker contínuo: uma única execução de fluxo mantém a conexão aberta e consome sem parar.
+#
+# Uma thread de recebimento é a única a usar a conexão com a fila (a conexão pika não é
+# thread-safe): ela recebe mensagens enquanto o buffer tem espaço (backpressure) e aplica os
+# acks/rejeições devolvidos pelas threads de processamento. Na parada (SIGTERM ou fim da
+# duração), o recebimento para primeiro; o que já estava no buffer ou em processamento é
+# concluído e confirmado antes de a conexão ser fechada, então nenhuma mensagem recebida se perde.
+# O buffer entrega as mensagens pela prioridade (ver worker/prioridade.py). Mensagens cujo corpo
+# não é um objeto JSON são rejeitadas pela thread de recebimento sem passar pelo buffer.
+
+NUM_PROCESSADORES_PADRAO = int(os.environ.get("WORKER_PROCESSADORES", "8"))
+TAMANHO_BUFFER_PADRAO = int(os.environ.get("WORKER_TAMANHO_BUFFER", "100"))
+
+
+def _decodificar(corpo):
+    """Mensagem decodificada, ou None para um corpo inválido (rejeitado pelo worker, sem processar)"""
+    mensagem, erro = decodificar_mensagem(corpo)
+    if erro is not None:
+        print(f"Mensagem com corpo inválido descartada para a DLQ: {erro}")
+    return mensagem
+
+
+class FonteRabbitMQ:
+    """Recebe das filas do RabbitMQ com basic_consume; acks em lote sobre o prefixo já concluído"""
+
+    def __init__(self, url, filas, prefetch):
+        self.url = url
+        self.filas = filas
+        self.conexao = conectar(url)
+        self.canal = self.conexao.channel()
+        self.canal.basic_qos(prefetch_count=prefetch)
+        self._recebidas = []
+        self._entregues = deque()  # delivery tags na ordem de entrega, ainda sem ack
+        self._concluidas = set()
+        self._avulsas = set()  # Concluídas fora do prefixo e já liquidadas uma a uma
+        self._limite_avulsas = max(prefetch // 2, 1)
+        self._consumidores = []
+        for fila in filas:
+            self.canal.queue_declare(queue=fila, durable=True)
+            self.canal.queue_declare(queue=fila + SUFIXO_DLQ, durable=True)
+            self._consumidores.append(self.canal.basic_consume(queue=fila, on_message_callback=self._ao_receber))
+
+    def _ao_receber(self, canal, metodo, propriedades, corpo):
+        self._entregues.append(metodo.delivery_tag)
+        self._recebidas.append((_decodificar(corpo), (metodo.delivery_tag, metodo.routing_key, corpo)))
+
+    def receber(self, maximo, espera):
+        # Entregues além de `maximo` (o prefetch acabou de ser reduzido) ficam para as próximas chamadas
+        self.conexao.process_data_events(time_limit=0 if self._recebidas else espera)
+        recebidas, self._recebidas = self._recebidas[:maximo], self._recebidas[maximo:]
+        return recebidas
+
+    def ajustar_prefetch(self, prefetch):
+        """Novo limite de mensagens sem ack; só a thread de recebimento usa o canal"""
+        self.canal.basic_qos(prefetch_count=prefetch)
+        self._limite_avulsas = max(prefetch // 2, 1)
+
+    def _liquidar(self, tags):
+        """
+        As mensagens terminam fora de ordem entre as threads: basic_ack(multiple=True) só cobre o
+        maior prefixo de tags já concluído, para não confirmar uma mensagem ainda em processamento.
+        Se uma mensagem fica muito tempo no buffer (ex.: baixa prioridade), as concluídas depois
+        dela são confirmadas uma a uma, para não esgotarem o prefetch esperando o prefixo
+        """
+        self._concluidas.update(tags)
+        ultima = None
+        while self._entregues and self._entregues[0] in self._concluidas:
+            tag = self._entregues.popleft()
+            self._concluidas.discard(tag)
+            if tag in self._avulsas:
+                self._avulsas.discard(tag)
+            else:
+                ultima = tag
+        if ultima is not None:
+            self.canal.basic_ack(delivery_tag=ultima, multiple=True)
+        if len(self._concluidas) - len(self._avulsas) >= self._limite_avulsas:
+            for tag in sorted(self._concluidas - self._avulsas):
+                self.canal.basic_ack(delivery_tag=tag)
+                self._avulsas.add(tag)
+
+    def confirmar(self, recibos):
+        self._liquidar([tag for tag, _, _ in recibos])
+
+    def rejeitar(self, recibos):
+        for tag, fila, corpo in recibos:
+            self.canal.basic_publish(exchange="", routing_key=fila + SUFIXO_DLQ, body=corpo,
+                                     properties=_propriedades_dlq(self.canal, "falha no worker contínuo"))
+            self.canal.basic_nack(delivery_tag=tag, requeue=False)
+        tags = [tag for tag, _, _ in recibos]
+        self._avulsas.update(tags)
+        self._liquidar(tags)
+
+    def profundidade(self):
+        """Mensagens prontas nas filas; usa outra conexão, pois a do recebimento é de outra thread"""
+        conexao = conectar(self.url)
+        try:
+            return sum(profundidade_rabbitmq(conexao, self.filas).values())
+        finally:
+            conexao.close()
+
+    def fechar(self):
+        """Mensagens entregues pelo broker que não chegaram ao buffer voltam para a fila no close"""
+        for consumidor in self._consumidores:
+            self.canal.basic_cancel(consumidor)
+        self.conexao.close()
+
+
+class FonteSQS:
+    """Long polling nas filas SQS em rodízio; DeleteMessageBatch para confirmar"""
+
+    def __init__(self, cliente, filas, visibilidade):
+        self.cliente = cliente
+        self.filas = filas
+        self._urls = itertools.cycle([cliente.get_queue_url(QueueName=fila)["QueueUrl"] for fila in filas])
+        self.renovador = RenovadorVisibilidade(cliente, visibilidade).__enter__()
+
+    def receber(self, maximo, espera):
+        url = next(self._urls)
+        resposta = self.cliente.receive_message(
+            QueueUrl=url, MaxNumberOfMessages=min(maximo, MAX_MENSAGENS_POR_RECEBIMENTO),
+            WaitTimeSeconds=int(espera), VisibilityTimeout=self.renovador.visibilidade)
+        recebidas = resposta.get("Messages", [])
+        self.renovador.registrar(url, [mensagem["ReceiptHandle"] for mensagem in recebidas])
+        return [(_decodificar(mensagem["Body"]), (url, mensagem["ReceiptHandle"])) for mensagem in recebidas]
+
+    def confirmar(self, recibos):
+        por_fila = {}
+        for url, recibo in recibos:
+            por_fila.setdefault(url, []).append(recibo)
+        for url, recibos_fila in por_fila.items():
+            apagar_mensagens(self.cliente, url, recibos_fila)
+        self.renovador.remover(recibo for _, recibo in recibos)
+
+    def ajustar_prefetch(self, prefetch):
+        pass  # Cada ReceiveMessage já pede no máximo o espaço livre no buffer
+
+    def rejeitar(self, recibos):
+        # Sem renovação, a mensagem volta a ficar visível e, pela redrive policy da fila, vai para a
+        # DLQ após maxReceiveCount recebimentos (ver localstack-init-script.sh); sem a policy, volta
+        # a ser entregue indefinidamente
+        self.renovador.remover(recibo for _, recibo in recibos)
+
+    def profundidade(self):
+        return sum(profundidade_sqs(self.cliente, self.filas).values())
+
+    def fechar(self):
+        self.renovador.__exit__(None, None, None)
+
+
+class FonteSimulada:
+    """Gera mensagens a `taxa` mensagens/s, para executar o worker sem broker"""
+
+    def __init__(self, taxa=50.0):
+        self.taxa = taxa
+        self._proxima = time.monotonic()
+
+    def receber(self, maximo, espera):
+        agora = time.monotonic()
+        if self._proxima > agora:
+            time.sleep(min(espera, self._proxima - agora))
+        quantidade = min(maximo, int((time.monotonic() - self._proxima) * self.taxa) + 1)
+        self._proxima += quantidade / self.taxa
+        return [(gerar_mensagem(), None) for _ in range(quantidade)]
+
+    def profundidade(self):
+        """Mensagens que já deveriam ter sido geradas e ainda não foram recebidas"""
+        return max(0, int((time.monotonic() - self._proxima) * self.taxa))
+
+    def ajustar_prefetch(self, prefetch):
+        pass
+
+    def confirmar(self, recibos):
+        pass
+
+    def rejeitar(self, recibos):
+        pass
+
+    def fechar(self):
+        pass
+
+
+class WorkerStreaming:
+    """
+    Consome `fonte` continuamente e processa as mensagens em `num_processadores` threads
+
+    No máximo `tamanho_buffer` mensagens ficam recebidas e ainda não concluídas; com o buffer
+    cheio a thread de recebimento para de buscar mensagens até as threads de processamento
+    liberarem espaço. O buffer entrega as mensagens pela prioridade, com `reserva_alta` dos
+    processadores reservada para alta. coletar() devolve o que foi processado desde a última coleta.
+    """
+
+    def __init__(self, fonte, processar, num_processadores=NUM_PROCESSADORES_PADRAO,
+                 tamanho_buffer=TAMANHO_BUFFER_PADRAO, tentativas=TENTATIVAS_PADRAO, espera_recebimento=1.0,
+                 reserva_alta=RESERVA_ALTA_PADRAO, pesos=PESOS_PADRAO):
+        self.fonte = fonte
+        self.processar = processar
+        self.num_processadores = num_processadores
+        self.tamanho_buffer = tamanho_buffer
+        self.tentativas = tentativas
+        self.espera_recebimento = espera_recebimento
+        self.parando = threading.Event()
+        self._buffer = FilaPrioridades(num_processadores, reserva_alta, pesos)
+        self._liquidacoes = queue.Queue()  # (recibo, sucesso) devolvidos à thread de recebimento
+        self._em_aberto = 0  # recebidas e ainda não liquidadas
+        self._trava = threading.Lock()
+        self._resultados = []
+        self._latencias = []
+        self.totais = {"recebidas": 0, "processadas": 0, "falhas": 0}
+        self.erro = None  # Erro da thread de recebimento (ex.: conexão perdida), que encerra o worker
+        self._threads = []
+
+    def iniciar(self):
+        self._threads.append(threading.Thread(target=self._receber, name="worker-recebimento"))
+        self._threads.extend(threading.Thread(target=self._processar, name=f"worker-processamento-{indice}")
+                             for indice in range(self.num_processadores))
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    @property
+    def em_aberto(self):
+        """Mensagens recebidas da fila e ainda não concluídas (no buffer ou em processamento)"""
+        return self._em_aberto
+
+    def redimensionar(self, num_processadores, tamanho_buffer):
+        """
+        Ajusta processadores e buffer com o worker em execução (ver worker/autoescala.py)
+        O prefetch da fonte passa a ser o novo buffer na próxima volta da thread de recebimento
+        """
+        with self._trava:
+            if self.parando.is_set():
+                return
+            diferenca = num_processadores - self.num_processadores
+            self.num_processadores = num_processadores
+            self.tamanho_buffer = tamanho_buffer
+        self._buffer.redimensionar(num_processadores)
+        for _ in range(diferenca):
+            thread = threading.Thread(target=self._processar, name=f"worker-processamento-{len(self._threads) - 1}")
+            self._threads.append(thread)
+            thread.start()
+        for _ in range(-diferenca):
+            self._buffer.put(None)  # Cada processador a menos termina ao retirar um None do buffer
+
+    def solicitar_parada(self, *_):
+        self.parando.set()
+
+    def aguardar(self, segundos):
+        """Espera até `segundos` ou até a parada ser solicitada; True se deve parar"""
+        return self.parando.wait(segundos)
+
+    def _aplicar_liquidacoes(self):
+        confirmadas, rejeitadas = [], []
+        while True:
+            try:
+                recibo, sucesso = self._liquidacoes.get_nowait()
+            except queue.Empty:
+                break
+            (confirmadas if sucesso else rejeitadas).append(recibo)
+        if rejeitadas:
+            self.fonte.rejeitar(rejeitadas)
+        if confirmadas:
+            self.fonte.confirmar(confirmadas)
+        with self._trava:
+            self._em_aberto -= len(confirmadas) + len(rejeitadas)
+
+    def _receber(self):
+        prefetch = None
+        try:
+            while not self.parando.is_set():
+                self._aplicar_liquidacoes()
+                with self._trava:
+                    tamanho_buffer = self.tamanho_buffer
+                    espaco = tamanho_buffer - self._em_aberto
+                if tamanho_buffer != prefetch:
+                    # O broker não deve entregar mais que o buffer comporta (nem menos, ou o buffer não enche)
+                    self.fonte.ajustar_prefetch(tamanho_buffer)
+                    prefetch = tamanho_buffer
+                if espaco <= 0:
+                    time.sleep(0.01)  # Backpressure: espera o processamento liberar o buffer
+                    continue
+                recebidas = self.fonte.receber(espaco, self.espera_recebimento)
+                invalidas = [recibo for mensagem, recibo in recebidas if mensagem is None]
+                if invalidas:
+                    self.fonte.rejeitar(invalidas)
+                    recebidas = [recebida for recebida in recebidas if recebida[0] is not None]
+                with self._trava:
+                    self._em_aberto += len(recebidas)
+                    self.totais["recebidas"] += len(recebidas) + len(invalidas)
+                    self.totais["falhas"] += len(invalidas)
+                    self._resultados.extend({"mensagem_id": None, "status": "falha", "erro": "corpo inválido"}
+                                            for _ in invalidas)
+                for recebida in recebidas:
+                    self._buffer.put(recebida)
+
+            # Parada: conclui e confirma tudo o que já foi recebido antes de fechar a conexão
+            while True:
+                self._aplicar_liquidacoes()
+                with self._trava:
+                    if self._em_aberto == 0:
+                        break
+                time.sleep(0.01)
+        except Exception as excecao:
+            self.erro = excecao
+            self.parando.set()
+        finally:
+            with self._trava:
+                num_processadores = self.num_processadores  # redimensionar() não altera mais após a parada
+            for _ in range(num_processadores):
+                self._buffer.put(None)
+            self.fonte.fechar()
+
+    def _processar(self):
+        while True:
+            item = self._buffer.get()
+            if item is None:
+                return
+            mensagem, recibo = item
+            resultado, erro = processar_com_tentativas(self.processar, mensagem, self.tentativas)
+            if erro is not None:
+                resultado = {"mensagem_id": mensagem.get("id"), "status": "falha", "erro": str(erro)}
+            self._buffer.concluir(mensagem)
+            latencia = time.time() - mensagem.get("timestamp", time.time())
+            with self._trava:
+                self._resultados.append(resultado)
+                self._latencias.append((prioridade(mensagem), latencia))
+                self.totais["processadas"] += 1
+                self.totais["falhas"] += erro is not None
+            self._liquidacoes.put((recibo, erro is None))
+
+    def aguardando(self):
+        """Mensagens no buffer esperando um processador, por prioridade"""
+        return self._buffer.tamanhos()
+
+    def coletar(self):
+        """Resultados e latências (enfileiramento -> processamento) desde a última coleta"""
+        with self._trava:
+            resultados, self._resultados = self._resultados, []
+            latencias_prioridade, self._latencias = self._latencias, []
+        latencias = [latencia for _, latencia in latencias_prioridade]
+        return resultados, {
+            "mensagens": len(resultados),
+            "latencia_p50": percentil(latencias, 0.50),
+            "latencia_p99": percentil(latencias, 0.99),
+            "latencia_maxima": max(latencias, default=0.0),
+            "latencia_p99_por_prioridade": {
+                nome: percentil([latencia for prioridade_mensagem, latencia in latencias_prioridade
+                                 if prioridade_mensagem == nome], 0.99)
+                for nome in PRIORIDADES
+            },
+        }
+
+    def parar(self):
+        """Solicita a parada e espera a conclusão das mensagens já recebidas"""
+        self.parando.set()
+        for thread in self._threads:
+            thread.join()
+
+
+@contextmanager
+def encerramento_gracioso(ao_receber_sinal):
+    """
+    Instala `ao_receber_sinal` para SIGTERM/SIGINT enquanto o bloco executa
+    Sinais só podem ser tratados na thread principal; fora dela o bloco executa sem tratadores
+    """
+    if threading.current_thread() is not threading.main_thread():
+        yield
+        return
+    anteriores = {sinal: signal.signal(sinal, ao_receber_sinal) for sinal in (signal.SIGTERM, signal.SIGINT)}
+    try:
+        yield
+    finally:
+        for sinal, anterior in anteriores.items():
+            signal.signal(sinal, anterior)
@@ -10,11 +10,20 @@ export AWS_SECRET_ACCESS_KEY=test
 export AWS_DEFAULT_REGION=us-east-1
 export AWS_ENDPOINT_URL=http://localhost:4566
 
-# Criar filas SQS
+# Mensagens recebidas mais vezes que isso sem serem apagadas (falharam no worker) vão para a DLQ
+MAX_RECEBIMENTOS=${SQS_MAX_RECEBIMENTOS:-5}
+
+# Criar filas SQS, cada uma com a sua DLQ (<fila>-dlq) e redrive policy
 echo "Criando filas SQS..."
-aws --endpoint-url=http://localhost:4566 sqs create-queue --queue-name produto-fila
-aws --endpoint-url=http://localhost:4566 sqs create-queue --queue-name pedido-fila
-aws --endpoint-url=http://localhost:4566 sqs create-queue --queue-name usuario-fila
+for fila in produto-fila pedido-fila usuario-fila; do
+    url_dlq=$(aws --endpoint-url=http://localhost:4566 sqs create-queue --queue-name "$fila-dlq" \
+        --query QueueUrl --output text)
+    arn_dlq=$(aws --endpoint-url=http://localhost:4566 sqs get-queue-attributes --queue-url "$url_dlq" \
+        --attribute-names QueueArn --query Attributes.QueueArn --output text)
+    politica="{\"deadLetterTargetArn\":\"$arn_dlq\",\"maxReceiveCount\":\"$MAX_RECEBIMENTOS\"}"
+    atributos=$(printf '{"RedrivePolicy": "%s"}' "${politica//\"/\\\"}")
+    aws --endpoint-url=http://localhost:4566 sqs create-queue --queue-name "$fila" --attributes "$atributos"
+done
 
 # Verificar filas criadas
 echo "Filas SQS criadas:"